@@ -61,6 +61,31 @@ class GroqClient:
         
         return result
 
+    def resume_ementa_disciplina(self, ementa):
+        """Resumo curto para ementas de disciplinas (sem dados de aluno)"""
+        prompt = f'''
+            Resuma em Markdown a ementa de componentes curriculares abaixo, seguindo exatamente o modelo. Não adicione outras seções.
+
+            {ementa}
+
+            ```markdown
+            ## Disciplinas Cursadas
+            disciplina - carga horária - principais conteúdos
+
+            ## Formação Acadêmica
+            curso e instituição
+            ```
+        '''
+
+        result_raw = self.generate_response(prompt)
+
+        try:
+            result = result_raw.split('```markdown')[1]
+        except IndexError:
+            result = result_raw
+
+        return result
+
     def generate_score(self, ementa, curso, max_attempts=10):
         prompt = f'''
             **Objetivo:** Avaliar uma ementa acadêmica de um aluno em relação ao curso específico do professor e calcular a pontuação final. A nota máxima é 10.0.
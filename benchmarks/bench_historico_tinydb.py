@@ -0,0 +1,89 @@
+"""
+Benchmark de regressão: get_analises_by_curso, get_professor_history e get_ementa_history
+
+Compara a versão por linha (professor e cursos buscados para cada análise;
+get_analise_complete para cada linha do histórico) com a versão por conjuntos
+do AnalyseDatabaseSeparado, e confere que os resultados são iguais.
+
+Uso:
+    python benchmarks/bench_historico_tinydb.py             # 10k, 100k e 1M análises
+    python benchmarks/bench_historico_tinydb.py 10000 50000 # tamanhos escolhidos
+"""
+import sys
+import tempfile
+import time
+
+from dados_sinteticos import gerar_dados
+
+from core.database.database_separado import AnalyseDatabaseSeparado
+
+TAMANHOS_PADRAO = [10_000, 100_000, 1_000_000]
+
+
+# ==================== VERSÕES POR LINHA (REFERÊNCIA) ====================
+
+def analises_by_curso_por_linha(database: AnalyseDatabaseSeparado, codigo_curso: str):
+    curso_analyses = []
+    for analysis in database.analise.all():
+        if analysis.get('prontuario_professor'):
+            if database.get_professor(analysis['prontuario_professor']):
+                professor_cursos = database.get_professor_courses(analysis['prontuario_professor'])
+                if any(curso['codigo_curso'] == codigo_curso for curso in professor_cursos):
+                    curso_analyses.append(analysis)
+        else:
+            curso_analyses.append(analysis)
+    return curso_analyses
+
+
+def historico_por_linha(database: AnalyseDatabaseSeparado, analises):
+    historico = [database.get_analise_complete(analise['analise_id']) for analise in analises]
+    return sorted([a for a in historico if a], key=lambda x: x.get('data_analise', ''), reverse=True)
+
+
+# ==================== EXECUÇÃO ====================
+
+def medir(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return (time.perf_counter() - inicio) * 1000, resultado
+
+
+def executar(total_analises: int):
+    with tempfile.TemporaryDirectory() as dados_dir:
+        print(f"\n📊 {total_analises:,} análises")
+        chaves = gerar_dados(dados_dir, total_analises)
+        database = AnalyseDatabaseSeparado(dados_dir)
+        # Carrega os índices antes de medir
+        database.get_analises_by_ementa(chaves['id_ementa'])
+        database.get_professor_courses(chaves['prontuario'])
+
+        casos = {
+            'get_analises_by_curso': (
+                lambda: analises_by_curso_por_linha(database, chaves['codigo_curso']),
+                lambda: database.get_analises_by_curso(chaves['codigo_curso'])
+            ),
+            'get_professor_history': (
+                lambda: historico_por_linha(database, database.get_analises_by_professor(chaves['prontuario'])),
+                lambda: database.get_professor_history(chaves['prontuario'])
+            ),
+            'get_ementa_history': (
+                lambda: historico_por_linha(database, database.get_analises_by_ementa(chaves['id_ementa'])),
+                lambda: database.get_ementa_history(chaves['id_ementa'])
+            ),
+        }
+
+        print(f"   {'consulta':<26}{'por linha (ms)':>16}{'conjuntos (ms)':>16}{'ganho':>9}{'linhas':>9}")
+        for nome, (por_linha, por_conjunto) in casos.items():
+            tempo_linha, esperado = medir(por_linha)
+            tempo_conjunto, obtido = medir(por_conjunto)
+            if [dict(a) for a in esperado] != [dict(a) for a in obtido]:
+                print(f"   ❌ {nome}: resultados diferentes")
+                continue
+            ganho = tempo_linha / tempo_conjunto if tempo_conjunto else float('inf')
+            print(f"   {nome:<26}{tempo_linha:>16.1f}{tempo_conjunto:>16.1f}{ganho:>8.1f}x{len(obtido):>9}")
+
+
+if __name__ == '__main__':
+    tamanhos = [int(arg) for arg in sys.argv[1:]] or TAMANHOS_PADRAO
+    for tamanho in tamanhos:
+        executar(tamanho)
@@ -0,0 +1,102 @@
+"""
+Benchmark: consultas por Query() (varredura) x índices hash do AnalyseDatabaseSeparado
+
+Uso:
+    python benchmarks/bench_indices_tinydb.py             # 10k, 100k e 1M análises
+    python benchmarks/bench_indices_tinydb.py 10000 50000 # tamanhos escolhidos
+"""
+import os
+import sys
+import tempfile
+import time
+
+from dados_sinteticos import gerar_dados
+
+from tinydb import Query, TinyDB
+from core.database.database_separado import AnalyseDatabaseSeparado
+
+TAMANHOS_PADRAO = [10_000, 100_000, 1_000_000]
+
+
+def medir(funcao, repeticoes: int) -> float:
+    """Tempo médio (ms) de `repeticoes` chamadas"""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) * 1000 / repeticoes
+
+
+def consultas_varredura(dados_dir: str, chaves: dict) -> dict:
+    """Mesmas consultas com TinyDB puro (Query() a cada chamada, sem cache de consulta)"""
+    professores = TinyDB(os.path.join(dados_dir, 'professores.json'))
+    analises = TinyDB(os.path.join(dados_dir, 'analises.json'))
+    cursos_disciplina = TinyDB(os.path.join(dados_dir, 'cursos_disciplina.json'))
+    disciplinas = TinyDB(os.path.join(dados_dir, 'disciplinas.json'))
+    ementa_disciplina = TinyDB(os.path.join(dados_dir, 'ementa_disciplina.json'))
+    q = Query()
+
+    def get_curso_disciplines():
+        rels = cursos_disciplina.search(q.curso_fk == chaves['codigo_curso'])
+        return [disciplinas.search(q.id_disciplina == rel['disciplina_fk']) for rel in rels]
+
+    def sem_cache(funcao):
+        def executar():
+            for db in (professores, analises, cursos_disciplina, disciplinas, ementa_disciplina):
+                db.clear_cache()
+            return funcao()
+        return executar
+
+    return {
+        'get_professor': sem_cache(lambda: professores.search(q.prontuario == chaves['prontuario'])),
+        'get_analise_by_id': sem_cache(lambda: analises.search(q.analise_id == chaves['analise_id'])),
+        'get_analises_by_ementa': sem_cache(lambda: analises.search(q.ementa_fk == chaves['id_ementa'])),
+        'get_curso_disciplines': sem_cache(get_curso_disciplines),
+        'filter_ementas_by_disciplina': sem_cache(
+            lambda: ementa_disciplina.search(q.disciplina_fk == chaves['id_disciplina'])
+        ),
+    }
+
+
+def consultas_indexadas(database: AnalyseDatabaseSeparado, chaves: dict) -> dict:
+    return {
+        'get_professor': lambda: database.get_professor(chaves['prontuario']),
+        'get_analise_by_id': lambda: database.get_analise_by_id(chaves['analise_id']),
+        'get_analises_by_ementa': lambda: database.get_analises_by_ementa(chaves['id_ementa']),
+        'get_curso_disciplines': lambda: database.get_curso_disciplines(chaves['codigo_curso']),
+        'filter_ementas_by_disciplina': lambda: database.ementa_disciplina.search_by(
+            'disciplina_fk', chaves['id_disciplina']
+        ),
+    }
+
+
+def executar(total_analises: int):
+    with tempfile.TemporaryDirectory() as dados_dir:
+        print(f"\n📊 {total_analises:,} análises")
+        inicio = time.perf_counter()
+        chaves = gerar_dados(dados_dir, total_analises)
+        print(f"   dados gerados em {time.perf_counter() - inicio:.1f}s")
+
+        database = AnalyseDatabaseSeparado(dados_dir)
+        inicio = time.perf_counter()
+        for tabela in (database.professor, database.analise, database.cursos_disciplina,
+                       database.disciplinas, database.ementa_disciplina):
+            tabela.values_of(tabela.indexed_fields[0])
+        print(f"   carga dos índices: {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+        # Varreduras relêem o JSON inteiro: poucas repetições nos tamanhos grandes
+        repeticoes_varredura = max(1, 200_000 // total_analises)
+        varredura = consultas_varredura(dados_dir, chaves)
+        indexada = consultas_indexadas(database, chaves)
+
+        print(f"   {'consulta':<30}{'Query() (ms)':>14}{'índice (ms)':>14}{'ganho':>10}")
+        for nome in varredura:
+            tempo_varredura = medir(varredura[nome], repeticoes_varredura)
+            tempo_indice = medir(indexada[nome], 1000)
+            ganho = tempo_varredura / tempo_indice if tempo_indice else float('inf')
+            print(f"   {nome:<30}{tempo_varredura:>14.3f}{tempo_indice:>14.4f}{ganho:>9.0f}x")
+
+
+if __name__ == '__main__':
+    tamanhos = [int(arg) for arg in sys.argv[1:]] or TAMANHOS_PADRAO
+    for tamanho in tamanhos:
+        executar(tamanho)
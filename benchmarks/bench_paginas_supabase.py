@@ -0,0 +1,240 @@
+"""
+Benchmark das páginas do app sobre o SupabaseDatabase, sem rede
+
+Reproduz as chamadas ao banco de cada carregamento de página (login, página do
+curso, dashboard, busca, gravação de um lote de PDFs) contra o PostgREST falso
+(postgrest_falso.py), com latência simulada por requisição, e mede idas ao banco
+e tempo de parede de cada operação.
+
+Cada cenário roda em duas escalas: mais análises no banco e lote maior na
+segunda. Idas que crescem com a escala além do previsto (por arquivo do lote,
+por exemplo) indicam uma consulta N+1. Com --verificar o script termina com
+código 1 nesse caso, para uso em CI.
+
+Uso:
+    python benchmarks/bench_paginas_supabase.py
+    python benchmarks/bench_paginas_supabase.py --latencia 0.05 --analises 2000 50000
+    python benchmarks/bench_paginas_supabase.py --sem-rpc --verificar
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'src'))
+
+from postgrest_falso import ClienteSupabaseFalso  # noqa: E402
+
+from core.database.cache import create_reference_cache  # noqa: E402
+from core.database.supabase_database import SupabaseDatabase  # noqa: E402
+
+TOTAL_CURSOS = 20
+DISCIPLINAS_POR_CURSO = 10
+SENHA = 'senha-benchmark'
+
+
+# ==================== DADOS ====================
+
+def popular(cliente: ClienteSupabaseFalso, total_analises: int, seed: int = 42) -> dict:
+    """
+    Carrega no PostgREST falso um banco com as proporções do uso real
+
+    Returns:
+        dict: chaves usadas pelos cenários (professor, curso, ementas)
+    """
+    rng = random.Random(seed)
+    inicio = datetime(2024, 1, 1)
+    total_professores = max(5, total_analises // 200)
+    total_ementas = max(10, total_analises // 2)
+
+    cursos = [{'codigo_curso': f'CUR{i:03d}', 'nome': f'Curso {i}', 'descricao_curso': ''} for i in range(TOTAL_CURSOS)]
+    disciplinas = [
+        {'id_disciplina': f'DIS{i:05d}', 'nome': f'Disciplina {i}', 'carga_horaria': 60}
+        for i in range(TOTAL_CURSOS * DISCIPLINAS_POR_CURSO)
+    ]
+    professores = [
+        {'prontuario': f'{i:09d}', 'nome': f'Professor {i}', 'email_educacional': f'prof{i}@ifsp.edu.br',
+         'senha': hashlib.sha256(SENHA.encode()).hexdigest()}
+        for i in range(total_professores)
+    ]
+    professor_curso = [
+        {'prontuario_professor': professor['prontuario'], 'curso_fk': curso['codigo_curso']}
+        for professor in professores for curso in rng.sample(cursos, 2)
+    ]
+    cursos_por_professor = {}
+    for vinculo in professor_curso:
+        cursos_por_professor.setdefault(vinculo['prontuario_professor'], []).append(vinculo['curso_fk'])
+
+    ementas = [
+        {'id_ementa': i + 1, 'file_name': f'ementa_{i}.pdf', 'hash_conteudo': f'{i:064x}',
+         'professor_id': professores[i % total_professores]['prontuario'],
+         'data_upload': (inicio + timedelta(minutes=i)).isoformat()}
+        for i in range(total_ementas)
+    ]
+    analises, analise_curso = [], []
+    for i in range(total_analises):
+        prontuario = professores[rng.randrange(total_professores)]['prontuario']
+        score = rng.randint(0, 100)
+        analises.append({
+            'analise_id': i + 1, 'nome_aluno': f'Aluno {i}', 'ementa_fk': rng.randint(1, total_ementas),
+            'adequado': score >= 70, 'score': score, 'texto_analise': 'Análise de equivalência',
+            'professor_id': prontuario, 'created_at': (inicio + timedelta(seconds=i)).isoformat()
+        })
+        analise_curso.append({'analise_fk': i + 1, 'curso_fk': rng.choice(cursos_por_professor[prontuario])})
+
+    for tabela, linhas in (
+        ('cursos', cursos), ('disciplinas', disciplinas), ('professores', professores),
+        ('professor_curso', professor_curso),
+        ('cursos_disciplina', [
+            {'curso_fk': cursos[i // DISCIPLINAS_POR_CURSO]['codigo_curso'], 'disciplina_fk': d['id_disciplina']}
+            for i, d in enumerate(disciplinas)
+        ]),
+        ('ementas', ementas),
+        ('ementa_disciplina', [
+            {'ementa_fk': e['id_ementa'], 'disciplina_fk': rng.choice(disciplinas)['id_disciplina']} for e in ementas
+        ]),
+        ('analises', analises), ('analise_curso', analise_curso),
+    ):
+        cliente.carregar(tabela, linhas)
+
+    professor = professores[0]
+    return {
+        'prontuario': professor['prontuario'],
+        'email': professor['email_educacional'],
+        'codigo_curso': cursos_por_professor[professor['prontuario']][0],
+        'ementas_existentes': [e['id_ementa'] for e in ementas if e['professor_id'] == professor['prontuario']][:3],
+    }
+
+
+# ==================== CENÁRIOS ====================
+# Cada cenário recebe (database, chaves, tamanho do lote) e repete as chamadas ao banco da página
+
+def login(database: SupabaseDatabase, chaves: dict, _):
+    senha_hash = hashlib.sha256(SENHA.encode()).hexdigest()
+    professor = database.authenticate_professor(chaves['email'], senha_hash)
+    database.get_professor_courses(professor['prontuario'])
+
+
+def pagina_curso(database: SupabaseDatabase, chaves: dict, _):
+    visao = database.load_course_overview(chaves['codigo_curso'], chaves['prontuario'])
+    # Segunda página do histórico e abertura de uma análise
+    cursor = visao['historico']['proximo_cursor']
+    if cursor:
+        database.list_analises_curso_professor(chaves['codigo_curso'], chaves['prontuario'], cursor=cursor)
+    if visao['historico']['analises']:
+        database.get_analise_by_id(visao['historico']['analises'][0]['analise_id'])
+
+
+def dashboard(database: SupabaseDatabase, chaves: dict, _):
+    for curso in database.get_cursos_com_analises_do_professor(chaves['prontuario']):
+        database.get_course_dashboard_stats(curso['codigo_curso'], chaves['prontuario'])
+
+
+def busca(database: SupabaseDatabase, chaves: dict, _):
+    database.search_analises(chaves['prontuario'], 'Aluno 1', chaves['codigo_curso'])
+
+
+def gravacao_lote(database: SupabaseDatabase, chaves: dict, tamanho: int):
+    """Upload de `tamanho` PDFs novos + verificação de análises existentes + gravação em lote"""
+    ementas = []
+    for _ in range(tamanho):
+        hash_conteudo = uuid.uuid4().hex * 2
+        if database.get_ementa_by_hash(hash_conteudo, chaves['prontuario']) is None:
+            ementas.append(database.create_ementa({
+                'file_name': f'{hash_conteudo[:8]}.pdf', 'hash_conteudo': hash_conteudo,
+                'professor_id': chaves['prontuario']
+            }))
+    ementa_ids = [ementa['id_ementa'] for ementa in ementas] + chaves['ementas_existentes']
+    existentes = database.find_existing_analises(ementa_ids, chaves['codigo_curso'])
+    database.create_analises_bulk([
+        {'nome_aluno': f'Aluno {ementa_id}', 'ementa_fk': ementa_id, 'adequado': True, 'score': 80,
+         'texto_analise': 'Análise de equivalência', 'professor_id': chaves['prontuario']}
+        for ementa_id in ementa_ids if ementa_id not in existentes
+    ], chaves['codigo_curso'])
+
+
+# nome -> (função, idas previstas por PDF do lote)
+CENARIOS = {
+    'login': (login, 0),
+    'pagina_curso': (pagina_curso, 0),
+    'dashboard': (dashboard, 0),
+    'busca': (busca, 0),
+    # Por PDF: busca por hash e insert da ementa (process_uploaded_files trata um arquivo por vez)
+    'gravacao_lote': (gravacao_lote, 2),
+}
+
+
+# ==================== EXECUÇÃO ====================
+
+def executar(total_analises: int, tamanho_lote: int, latencia: float, com_funcoes: bool, repeticoes: int) -> dict:
+    """Roda todos os cenários em um banco novo; devolve nome -> (idas, tempo mediano em ms, idas por requisição)"""
+    cliente = ClienteSupabaseFalso(latencia=latencia, com_funcoes=com_funcoes)
+    chaves = popular(cliente, total_analises)
+    resultados = {}
+    for nome, (cenario, _) in CENARIOS.items():
+        tempos = []
+        for _ in range(repeticoes):
+            # Cache novo a cada repetição: mede o carregamento frio da página
+            database = SupabaseDatabase(client=cliente, cache=create_reference_cache())
+            cliente.zerar_contadores()
+            inicio = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                cenario(database, chaves, tamanho_lote)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        resultados[nome] = (cliente.idas, statistics.median(tempos), dict(cliente.idas_por_operacao))
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Idas ao banco e tempo por página do app (PostgREST falso)")
+    parser.add_argument('--analises', type=int, nargs=2, default=[1_000, 10_000], help="análises no banco em cada escala")
+    parser.add_argument('--lotes', type=int, nargs=2, default=[1, 5], help="PDFs por lote em cada escala")
+    parser.add_argument('--latencia', type=float, default=0.02, help="segundos por requisição")
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--sem-rpc', action='store_true', help="banco sem as funções RPC (caminhos alternativos)")
+    parser.add_argument('--detalhar', action='store_true', help="mostra as requisições de cada cenário")
+    parser.add_argument('--verificar', action='store_true', help="código de saída 1 se as idas crescerem com a escala")
+    args = parser.parse_args()
+
+    escalas = list(zip(args.analises, args.lotes))
+    resultados = [
+        executar(total, lote, args.latencia, not args.sem_rpc, args.repeticoes) for total, lote in escalas
+    ]
+
+    print(f"\n📊 latência {args.latencia * 1000:.0f} ms por requisição"
+          f"{' | sem funções RPC' if args.sem_rpc else ''}")
+    cabecalho = ''.join(f"{f'{total:,} an. / lote {lote}':>28}" for total, lote in escalas)
+    print(f"   {'cenário':<16}{cabecalho}")
+    regressoes = []
+    for nome, (_, idas_por_pdf) in CENARIOS.items():
+        colunas = ''.join(f"{f'{idas} idas, {tempo:.0f} ms':>28}" for idas, tempo, _ in (r[nome] for r in resultados))
+        print(f"   {nome:<16}{colunas}")
+        if args.detalhar:
+            for operacao, total in sorted(resultados[-1][nome][2].items()):
+                print(f"      {total:>4}x {operacao}")
+
+        idas = [r[nome][0] for r in resultados]
+        previsto = idas[0] + idas_por_pdf * (args.lotes[1] - args.lotes[0])
+        if idas[1] > previsto:
+            regressoes.append(f"{nome}: {idas[0]} -> {idas[1]} idas (previsto até {previsto})")
+
+    if regressoes:
+        print("\n❌ Idas crescendo com a escala (possível N+1):")
+        for regressao in regressoes:
+            print(f"   - {regressao}")
+    else:
+        print("\n✅ Nenhum cenário cresce com a escala além do previsto")
+    if args.verificar and regressoes:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Geração de dados sintéticos para os benchmarks do banco TinyDB (AnalyseDatabaseSeparado)
+
+As proporções imitam o uso real: poucos cursos, muitas ementas e análises,
+cada professor associado a dois cursos.
+"""
+import os
+import random
+import sys
+from collections import Counter
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'src'))
+
+from tinydb import TinyDB  # noqa: E402
+
+TOTAL_CURSOS = 50
+DISCIPLINAS_POR_CURSO = 10
+
+
+def gerar_dados(dados_dir: str, total_analises: int, seed: int = 42) -> dict:
+    """
+    Popula `dados_dir` com os arquivos JSON de todas as tabelas
+
+    Cada tabela é gravada com um único insert_multiple (uma escrita por arquivo).
+
+    Returns:
+        dict: chaves de amostra para as consultas dos benchmarks
+    """
+    rng = random.Random(seed)
+    os.makedirs(dados_dir, exist_ok=True)
+
+    total_professores = max(10, total_analises // 100)
+    total_ementas = max(10, total_analises // 2)
+    inicio = datetime(2024, 1, 1)
+
+    cursos = [
+        {'codigo_curso': f'CUR{i:03d}', 'nome': f'Curso {i}', 'descricao_curso': ''}
+        for i in range(TOTAL_CURSOS)
+    ]
+    disciplinas = [
+        {'id_disciplina': f'DIS{i:05d}', 'nome': f'Disciplina {i}', 'carga_horaria': 60}
+        for i in range(TOTAL_CURSOS * DISCIPLINAS_POR_CURSO)
+    ]
+    cursos_disciplina = [
+        {'curso_fk': cursos[i // DISCIPLINAS_POR_CURSO]['codigo_curso'], 'disciplina_fk': d['id_disciplina']}
+        for i, d in enumerate(disciplinas)
+    ]
+    professores = [
+        {'prontuario': f'SP{i:07d}', 'nome': f'Professor {i}',
+         'email_educacional': f'prof{i}@ifsp.edu.br', 'senha': 'x'}
+        for i in range(total_professores)
+    ]
+    professor_curso = []
+    for professor in professores:
+        for curso in rng.sample(cursos, 2):
+            professor_curso.append({'prontuario_professor': professor['prontuario'], 'curso_fk': curso['codigo_curso']})
+    cursos_por_professor = {}
+    for rel in professor_curso:
+        cursos_por_professor.setdefault(rel['prontuario_professor'], []).append(rel['curso_fk'])
+
+    ementas = [
+        {'id_ementa': i + 1, 'drive_id': f'drive-{i}', 'data_upload': (inicio + timedelta(minutes=i)).isoformat()}
+        for i in range(total_ementas)
+    ]
+    ementa_disciplina = [
+        {'ementa_fk': e['id_ementa'], 'disciplina_fk': rng.choice(disciplinas)['id_disciplina']}
+        for e in ementas
+    ]
+    analises = []
+    for i in range(total_analises):
+        prontuario = professores[rng.randrange(total_professores)]['prontuario']
+        score = rng.randint(0, 100)
+        analises.append({
+            'analise_id': i + 1,
+            'nome_aluno': f'Aluno {i}',
+            'ementa_fk': rng.randint(1, total_ementas),
+            'prontuario_professor': prontuario,
+            'curso_fk': rng.choice(cursos_por_professor[prontuario]),
+            'adequado': score >= 70,
+            'score': score,
+            'texto_analise': 'ok',
+            'created_at': (inicio + timedelta(seconds=i)).isoformat()
+        })
+
+    tabelas = {
+        'cursos.json': cursos,
+        'disciplinas.json': disciplinas,
+        'cursos_disciplina.json': cursos_disciplina,
+        'professores.json': professores,
+        'professor_curso.json': professor_curso,
+        'ementas.json': ementas,
+        'ementa_disciplina.json': ementa_disciplina,
+        'analises.json': analises,
+        'tags.json': [],
+        'curso_tags.json': [],
+    }
+    for arquivo, linhas in tabelas.items():
+        db = TinyDB(os.path.join(dados_dir, arquivo))
+        db.truncate()
+        if linhas:
+            db.insert_multiple(linhas)
+        db.close()
+
+    return {
+        'prontuario': professores[0]['prontuario'],
+        'codigo_curso': cursos[0]['codigo_curso'],
+        # Ementa com mais análises, para os históricos não saírem vazios
+        'id_ementa': Counter(a['ementa_fk'] for a in analises).most_common(1)[0][0] if analises else 1,
+        'id_disciplina': disciplinas[0]['id_disciplina'],
+        'analise_id': analises[-1]['analise_id'] if analises else None,
+    }
@@ -0,0 +1,619 @@
+"""
+PostgREST falso, em memória, para medir o SupabaseDatabase sem rede
+
+Implementa o subconjunto do construtor de consultas do supabase-py usado por
+SupabaseDatabase:
+- table().select/insert/update/upsert/delete
+- filtros eq/neq/gt/gte/lt/lte/in_/like/ilike/is_, not_ e or_ (sintaxe do PostgREST)
+- order/limit/range/single
+- recursos embutidos como `analise_curso!inner(curso_fk)`, com filtros no recurso
+  embutido (`analise_curso.curso_fk`)
+- rpc() com as funções registradas. As demais respondem PGRST202, como um banco
+  sem a migração correspondente, e o SupabaseDatabase cai no caminho alternativo.
+
+Cada execute() conta uma ida ao banco e espera `latencia` segundos, então o
+número de idas e o tempo de parede de uma operação refletem o que ela custaria
+contra o Supabase (consultas N+1 aparecem como idas a mais).
+
+Chaves primárias seriais, restrições únicas e ON DELETE CASCADE seguem o
+SUPABASE_SCHEMA.md. Chaves estrangeiras não são validadas na escrita.
+"""
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# tabela -> (chave primária, serial?, restrições únicas além da chave)
+ESQUEMA = {
+    'professores': ('prontuario', False, [('email_educacional',)]),
+    'cursos': ('codigo_curso', False, []),
+    'disciplinas': ('id_disciplina', False, []),
+    'tags': ('id_tag', True, [('nome',)]),
+    'ementas': ('id_ementa', True, [('chave_idempotencia',)]),
+    'analises': ('analise_id', True, [('chave_idempotencia',)]),
+    'artefatos_analise': ('hash_conteudo', False, []),
+    'professor_curso': ('pc_id', True, [('prontuario_professor', 'curso_fk')]),
+    'curso_tags': ('ct_id', True, [('curso_fk', 'tag_fk')]),
+    'cursos_disciplina': ('cd_id', True, [('curso_fk', 'disciplina_fk')]),
+    'ementa_disciplina': ('ed_id', True, [('ementa_fk', 'disciplina_fk')]),
+    'analise_curso': ('ac_id', True, [('analise_fk', 'curso_fk')]),
+}
+
+# (tabela, coluna) -> (tabela referenciada, coluna referenciada); todas ON DELETE CASCADE
+CHAVES_ESTRANGEIRAS = {
+    ('ementas', 'professor_id'): ('professores', 'prontuario'),
+    ('analises', 'ementa_fk'): ('ementas', 'id_ementa'),
+    ('analises', 'professor_id'): ('professores', 'prontuario'),
+    ('professor_curso', 'prontuario_professor'): ('professores', 'prontuario'),
+    ('professor_curso', 'curso_fk'): ('cursos', 'codigo_curso'),
+    ('curso_tags', 'curso_fk'): ('cursos', 'codigo_curso'),
+    ('curso_tags', 'tag_fk'): ('tags', 'id_tag'),
+    ('cursos_disciplina', 'curso_fk'): ('cursos', 'codigo_curso'),
+    ('cursos_disciplina', 'disciplina_fk'): ('disciplinas', 'id_disciplina'),
+    ('ementa_disciplina', 'ementa_fk'): ('ementas', 'id_ementa'),
+    ('ementa_disciplina', 'disciplina_fk'): ('disciplinas', 'id_disciplina'),
+    ('analise_curso', 'analise_fk'): ('analises', 'analise_id'),
+    ('analise_curso', 'curso_fk'): ('cursos', 'codigo_curso'),
+}
+
+FAIXAS_HISTOGRAMA = 10
+
+
+class ErroPostgrest(Exception):
+    """Erro no formato das respostas do PostgREST (código + mensagem)"""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(f"{{'code': '{code}', 'message': '{message}'}}")
+        self.code = code
+        self.message = message
+
+
+class Resposta:
+    def __init__(self, data, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+def _agora() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _dividir(texto: str, separador: str = ',') -> List[str]:
+    """Divide no separador fora de parênteses e aspas"""
+    partes, atual, nivel, aspas = [], '', 0, False
+    for caractere in texto:
+        if caractere == '"':
+            aspas = not aspas
+        elif not aspas and caractere == '(':
+            nivel += 1
+        elif not aspas and caractere == ')':
+            nivel -= 1
+        if caractere == separador and nivel == 0 and not aspas:
+            partes.append(atual.strip())
+            atual = ''
+        else:
+            atual += caractere
+    if atual.strip():
+        partes.append(atual.strip())
+    return partes
+
+
+def _parse_colunas(texto: str) -> Tuple[List[str], Dict[str, Tuple[bool, Any]]]:
+    """`*, analise_curso!inner(curso_fk)` -> (colunas, {recurso: (inner, (subcolunas, subrecursos))})"""
+    colunas, recursos = [], {}
+    for item in _dividir(' '.join(texto.split())):
+        correspondencia = re.fullmatch(r'(\w+)(?:!(\w+))?\s*\((.*)\)', item, re.S)
+        if correspondencia:
+            nome, dica, interno = correspondencia.groups()
+            recursos[nome] = (dica == 'inner', _parse_colunas(interno))
+        else:
+            colunas.append(item)
+    return colunas, recursos
+
+
+def _converter(valor_linha, valor_filtro):
+    """Converte o valor do filtro (texto na URL do PostgREST) para o tipo da coluna"""
+    if isinstance(valor_filtro, str):
+        valor_filtro = valor_filtro.strip('"')
+        if isinstance(valor_linha, bool):
+            return valor_filtro.lower() == 'true'
+        if isinstance(valor_linha, int):
+            try:
+                return int(valor_filtro)
+            except ValueError:
+                return valor_filtro
+        if isinstance(valor_linha, float):
+            try:
+                return float(valor_filtro)
+            except ValueError:
+                return valor_filtro
+    return valor_filtro
+
+
+def _padrao_like(padrao: str, ignorar_caixa: bool):
+    partes = [re.escape(parte) for parte in re.split(r'[%*]', padrao)]
+    return re.compile('^' + '.*'.join(partes) + '$', re.S | (re.I if ignorar_caixa else 0))
+
+
+def _predicado(operador: str, valor) -> Callable[[Any], bool]:
+    """Função valor_da_coluna -> bool para um operador do PostgREST"""
+    if operador == 'is':
+        esperado = None if str(valor).lower() == 'null' else str(valor).lower() == 'true'
+        return lambda atual: atual is esperado if esperado is None else atual == esperado
+    if operador in ('like', 'ilike'):
+        regex = _padrao_like(str(valor), operador == 'ilike')
+        return lambda atual: atual is not None and bool(regex.match(str(atual)))
+    if operador == 'in':
+        if isinstance(valor, str):
+            valor = _dividir(valor.strip('()'))
+        valores = list(valor)
+        return lambda atual: atual is not None and any(atual == _converter(atual, v) for v in valores)
+
+    comparacoes = {
+        'eq': lambda a, b: a == b,
+        'neq': lambda a, b: a != b,
+        'gt': lambda a, b: a > b,
+        'gte': lambda a, b: a >= b,
+        'lt': lambda a, b: a < b,
+        'lte': lambda a, b: a <= b,
+    }
+    comparar = comparacoes[operador]
+    return lambda atual: atual is not None and comparar(atual, _converter(atual, valor))
+
+
+def _parse_or(expressao: str, conjuncao: bool = False) -> Callable[[Dict], bool]:
+    """Filtro de or_()/and() do PostgREST: `a.eq.1,and(b.lt.2,c.is.null)`"""
+    condicoes = []
+    for termo in _dividir(expressao):
+        grupo = re.fullmatch(r'(and|or)\((.*)\)', termo, re.S)
+        if grupo:
+            condicoes.append(_parse_or(grupo.group(2), grupo.group(1) == 'and'))
+            continue
+        coluna, operador, valor = termo.split('.', 2)
+        negar = operador == 'not'
+        if negar:
+            operador, valor = valor.split('.', 1)
+        predicado = _predicado(operador, valor)
+        condicoes.append(
+            lambda linha, c=coluna, p=predicado, n=negar: p(linha.get(c)) != n
+        )
+    combinar = all if conjuncao else any
+    return lambda linha: combinar(condicao(linha) for condicao in condicoes)
+
+
+class ConsultaFalsa:
+    """Construtor de consulta de uma tabela (select/insert/update/upsert/delete + filtros)"""
+
+    def __init__(self, cliente: 'ClienteSupabaseFalso', tabela: str):
+        self.cliente = cliente
+        self.tabela = tabela
+        self.operacao = 'select'
+        self.colunas = (['*'], {})
+        self.dados = None
+        self.on_conflict = None
+        self.ignore_duplicates = False
+        self.count = None
+        # (recurso embutido ou None, coluna, predicado)
+        self.filtros: List[Tuple[Optional[str], Optional[str], Callable]] = []
+        self.ordem: List[Tuple[str, bool]] = []
+        self.inicio = 0
+        self.limite = None
+        self.unica = False
+        self._negar = False
+
+    # ==================== OPERAÇÕES ====================
+
+    def select(self, *colunas: str, count: Optional[str] = None) -> 'ConsultaFalsa':
+        self.colunas = _parse_colunas(','.join(colunas) or '*')
+        self.count = count
+        return self
+
+    def insert(self, dados, **_) -> 'ConsultaFalsa':
+        self.operacao, self.dados = 'insert', dados
+        return self
+
+    def upsert(self, dados, on_conflict: str = '', ignore_duplicates: bool = False, **_) -> 'ConsultaFalsa':
+        self.operacao, self.dados = 'upsert', dados
+        self.on_conflict = tuple(coluna.strip() for coluna in on_conflict.split(',') if coluna.strip())
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, dados: Dict, **_) -> 'ConsultaFalsa':
+        self.operacao, self.dados = 'update', dados
+        return self
+
+    def delete(self, **_) -> 'ConsultaFalsa':
+        self.operacao = 'delete'
+        return self
+
+    # ==================== FILTROS ====================
+
+    @property
+    def not_(self) -> 'ConsultaFalsa':
+        self._negar = True
+        return self
+
+    def _filtro(self, coluna: str, operador: str, valor) -> 'ConsultaFalsa':
+        recurso = None
+        if '.' in coluna:
+            recurso, coluna = coluna.split('.', 1)
+        predicado, negar = _predicado(operador, valor), self._negar
+        self._negar = False
+        self.filtros.append((recurso, coluna, (lambda atual: predicado(atual) != negar)))
+        return self
+
+    def eq(self, coluna, valor): return self._filtro(coluna, 'eq', valor)
+    def neq(self, coluna, valor): return self._filtro(coluna, 'neq', valor)
+    def gt(self, coluna, valor): return self._filtro(coluna, 'gt', valor)
+    def gte(self, coluna, valor): return self._filtro(coluna, 'gte', valor)
+    def lt(self, coluna, valor): return self._filtro(coluna, 'lt', valor)
+    def lte(self, coluna, valor): return self._filtro(coluna, 'lte', valor)
+    def in_(self, coluna, valores): return self._filtro(coluna, 'in', list(valores))
+    def like(self, coluna, padrao): return self._filtro(coluna, 'like', padrao)
+    def ilike(self, coluna, padrao): return self._filtro(coluna, 'ilike', padrao)
+    def is_(self, coluna, valor): return self._filtro(coluna, 'is', valor)
+
+    def or_(self, expressao: str, reference_table: Optional[str] = None) -> 'ConsultaFalsa':
+        condicao = _parse_or(expressao)
+        self.filtros.append((reference_table, None, condicao))
+        return self
+
+    def order(self, coluna: str, desc: bool = False, **_) -> 'ConsultaFalsa':
+        self.ordem.append((coluna, desc))
+        return self
+
+    def limit(self, quantidade: int, **_) -> 'ConsultaFalsa':
+        self.limite = quantidade
+        return self
+
+    def range(self, inicio: int, fim: int, **_) -> 'ConsultaFalsa':
+        self.inicio, self.limite = inicio, fim - inicio + 1
+        return self
+
+    def single(self) -> 'ConsultaFalsa':
+        self.unica = True
+        return self
+
+    maybe_single = single
+
+    # ==================== EXECUÇÃO ====================
+
+    def execute(self) -> Resposta:
+        self.cliente._ida(f"{self.operacao} {self.tabela}")
+        with self.cliente.lock:
+            if self.operacao == 'select':
+                linhas = self.cliente._selecionar(self)
+                total = len(linhas)
+                linhas = linhas[self.inicio:self.inicio + self.limite if self.limite is not None else None]
+                if self.unica:
+                    return Resposta(linhas[0] if linhas else None, total if self.count else None)
+                return Resposta(linhas, total if self.count else None)
+            if self.operacao in ('insert', 'upsert'):
+                return Resposta(self.cliente._gravar(self))
+            alvo = self.cliente._filtrar(self.tabela, self.filtros)
+            if self.operacao == 'update':
+                for linha in alvo:
+                    linha.update(self.dados)
+                self.cliente._indices.pop(self.tabela, None)
+                return Resposta([dict(linha) for linha in alvo])
+            return Resposta(self.cliente._remover(self.tabela, alvo))
+
+
+class RpcFalsa:
+    def __init__(self, cliente: 'ClienteSupabaseFalso', funcao: str, parametros: Dict):
+        self.cliente = cliente
+        self.funcao = funcao
+        self.parametros = parametros or {}
+
+    def execute(self) -> Resposta:
+        self.cliente._ida(f"rpc {self.funcao}")
+        implementacao = self.cliente.funcoes.get(self.funcao)
+        if implementacao is None:
+            raise ErroPostgrest(
+                'PGRST202', f"Could not find the function public.{self.funcao} in the schema cache"
+            )
+        with self.cliente.lock:
+            return Resposta(implementacao(self.cliente, self.parametros))
+
+
+class ClienteSupabaseFalso:
+    """
+    Substituto em memória do supabase.Client
+
+    Args:
+        latencia: Espera por ida ao banco, em segundos (simula a rede até o Supabase)
+        com_funcoes: Registra as funções RPC implementadas aqui
+            (estatisticas_cursos_professor, criar_analises_em_lote, buscar_analises). Sem elas,
+            o SupabaseDatabase usa os caminhos alternativos de bancos sem migração.
+    """
+
+    def __init__(self, latencia: float = 0.0, com_funcoes: bool = True):
+        self.latencia = latencia
+        self.lock = threading.RLock()
+        self.tabelas: Dict[str, Dict[Any, Dict]] = {tabela: {} for tabela in ESQUEMA}
+        self._sequencias = Counter()
+        # tabela -> coluna -> valor -> [linhas]; descartado a cada escrita na tabela
+        self._indices: Dict[str, Dict[str, Dict[Any, List[Dict]]]] = {}
+        self.idas = 0
+        self.idas_por_operacao = Counter()
+        self.funcoes: Dict[str, Callable] = {}
+        if com_funcoes:
+            self.funcoes.update({
+                'estatisticas_cursos_professor': _rpc_estatisticas_cursos_professor,
+                'criar_analises_em_lote': _rpc_criar_analises_em_lote,
+                'buscar_analises': _rpc_buscar_analises,
+            })
+
+    def table(self, tabela: str) -> ConsultaFalsa:
+        return ConsultaFalsa(self, tabela)
+
+    from_ = table
+
+    def rpc(self, funcao: str, parametros: Dict = None) -> RpcFalsa:
+        return RpcFalsa(self, funcao, parametros)
+
+    def zerar_contadores(self):
+        with self.lock:
+            self.idas = 0
+            self.idas_por_operacao.clear()
+
+    def carregar(self, tabela: str, linhas: List[Dict]):
+        """Popula uma tabela diretamente, sem contar idas (dados iniciais dos benchmarks)"""
+        with self.lock:
+            for linha in linhas:
+                self._inserir_linha(tabela, dict(linha))
+
+    def _ida(self, descricao: str):
+        with self.lock:
+            self.idas += 1
+            self.idas_por_operacao[descricao] += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+
+    # ==================== LEITURA ====================
+
+    def _linhas(self, tabela: str) -> List[Dict]:
+        if tabela == 'estatisticas_curso_professor':
+            return _visao_estatisticas(self)
+        if tabela not in self.tabelas:
+            raise ErroPostgrest('42P01', f'relation "public.{tabela}" does not exist')
+        return list(self.tabelas[tabela].values())
+
+    def _indice(self, tabela: str, coluna: str) -> Dict[Any, List[Dict]]:
+        por_coluna = self._indices.setdefault(tabela, {})
+        if coluna not in por_coluna:
+            indice = {}
+            for linha in self.tabelas[tabela].values():
+                indice.setdefault(linha.get(coluna), []).append(linha)
+            por_coluna[coluna] = indice
+        return por_coluna[coluna]
+
+    def _filtrar(self, tabela: str, filtros) -> List[Dict]:
+        """Linhas da tabela que passam nos filtros de primeiro nível"""
+        proprios = [(coluna, predicado) for recurso, coluna, predicado in filtros if recurso is None]
+        linhas = self._linhas(tabela)
+        for coluna, predicado in proprios:
+            linhas = [linha for linha in linhas if (predicado(linha) if coluna is None else predicado(linha.get(coluna)))]
+        return linhas
+
+    def _relacao(self, tabela: str, recurso: str) -> Tuple[str, str, bool]:
+        """(coluna local, coluna no recurso, recurso é um único registro?)"""
+        for (origem, coluna), (destino, referenciada) in CHAVES_ESTRANGEIRAS.items():
+            if origem == tabela and destino == recurso:
+                return coluna, referenciada, True
+        for (origem, coluna), (destino, referenciada) in CHAVES_ESTRANGEIRAS.items():
+            if origem == recurso and destino == tabela:
+                return referenciada, coluna, False
+        raise ErroPostgrest('PGRST200', f"Could not find a relationship between '{tabela}' and '{recurso}'")
+
+    def _projetar(self, tabela: str, linha: Dict, colunas, filtros_recursos: Dict) -> Optional[Dict]:
+        """Colunas pedidas + recursos embutidos; None se um recurso !inner ficou vazio"""
+        nomes, recursos = colunas
+        resultado = {}
+        for nome in nomes:
+            if nome == '*':
+                resultado.update(linha)
+            else:
+                nome = nome.split(':')[-1].split('::')[0].strip()
+                resultado[nome] = linha.get(nome)
+        for recurso, (interno, subcolunas) in recursos.items():
+            local, remota, unico = self._relacao(tabela, recurso)
+            relacionados = [
+                candidato for candidato in self._indice(recurso, remota).get(linha.get(local), [])
+                if all(
+                    predicado(candidato) if coluna is None else predicado(candidato.get(coluna))
+                    for coluna, predicado in filtros_recursos.get(recurso, [])
+                )
+            ]
+            projetados = [
+                projetado for projetado in (self._projetar(recurso, r, subcolunas, {}) for r in relacionados)
+                if projetado is not None
+            ]
+            if interno and not projetados:
+                return None
+            resultado[recurso] = (projetados[0] if projetados else None) if unico else projetados
+        return resultado
+
+    def _selecionar(self, consulta: ConsultaFalsa) -> List[Dict]:
+        filtros_recursos = {}
+        for recurso, coluna, predicado in consulta.filtros:
+            if recurso is not None:
+                filtros_recursos.setdefault(recurso, []).append((coluna, predicado))
+        # Filtro em recurso embutido sem !inner só limita o recurso; aqui também exige o recurso,
+        # como o SupabaseDatabase sempre usa !inner nesses casos
+        linhas = []
+        for linha in self._filtrar(consulta.tabela, consulta.filtros):
+            projetada = self._projetar(consulta.tabela, linha, consulta.colunas, filtros_recursos)
+            if projetada is not None:
+                linhas.append((linha, projetada))
+
+        for coluna, desc in reversed(consulta.ordem):
+            linhas.sort(key=lambda par: (par[0].get(coluna) is None, par[0].get(coluna) or 0), reverse=desc)
+        return [projetada for _, projetada in linhas]
+
+    # ==================== ESCRITA ====================
+
+    def _chave_unica(self, tabela: str, linha: Dict) -> List[Tuple]:
+        chave, _, unicas = ESQUEMA[tabela]
+        return [((chave,), (linha.get(chave),))] + [
+            (colunas, tuple(linha.get(coluna) for coluna in colunas)) for colunas in unicas
+        ]
+
+    def _existente(self, tabela: str, colunas: Tuple[str, ...], valores: Tuple) -> Optional[Dict]:
+        if any(valor is None for valor in valores):
+            return None
+        for candidato in self._indice(tabela, colunas[0]).get(valores[0], []):
+            if all(candidato.get(coluna) == valor for coluna, valor in zip(colunas, valores)):
+                return candidato
+        return None
+
+    def _inserir_linha(self, tabela: str, linha: Dict) -> Dict:
+        chave, serial, _ = ESQUEMA[tabela]
+        for colunas, valores in self._chave_unica(tabela, linha):
+            if self._existente(tabela, colunas, valores):
+                raise ErroPostgrest('23505', f'duplicate key value violates unique constraint on {tabela}{colunas}')
+        if serial and linha.get(chave) is None:
+            self._sequencias[tabela] += 1
+            linha[chave] = self._sequencias[tabela]
+        elif serial:
+            self._sequencias[tabela] = max(self._sequencias[tabela], linha[chave])
+        if tabela not in ('artefatos_analise',):
+            linha.setdefault('created_at', _agora())
+        self.tabelas[tabela][linha[chave]] = linha
+        # Inserção só acrescenta aos índices já montados (carga inicial sem reconstruções)
+        for coluna, indice in self._indices.get(tabela, {}).items():
+            indice.setdefault(linha.get(coluna), []).append(linha)
+        return linha
+
+    def _gravar(self, consulta: ConsultaFalsa) -> List[Dict]:
+        tabela = consulta.tabela
+        dados = consulta.dados if isinstance(consulta.dados, list) else [consulta.dados]
+        # Um envio em lote é uma transação: tudo ou nada (desfeito pelo registro abaixo)
+        inseridas, alteradas = [], []
+        sequencia = self._sequencias[tabela]
+        gravadas = []
+        try:
+            for linha in dados:
+                linha = dict(linha)
+                if consulta.operacao == 'upsert':
+                    conflito = consulta.on_conflict or (ESQUEMA[tabela][0],)
+                    existente = self._existente(tabela, conflito, tuple(linha.get(c) for c in conflito))
+                    if existente is not None:
+                        if not consulta.ignore_duplicates:
+                            alteradas.append((existente, dict(existente)))
+                            existente.update(linha)
+                            self._indices.pop(tabela, None)
+                            gravadas.append(dict(existente))
+                        continue
+                inserida = self._inserir_linha(tabela, linha)
+                inseridas.append(inserida[ESQUEMA[tabela][0]])
+                gravadas.append(dict(inserida))
+        except Exception:
+            for chave in inseridas:
+                self.tabelas[tabela].pop(chave, None)
+            for existente, anterior in alteradas:
+                existente.clear()
+                existente.update(anterior)
+            self._sequencias[tabela] = sequencia
+            self._indices.pop(tabela, None)
+            raise
+        return gravadas
+
+    def _remover(self, tabela: str, linhas: List[Dict]) -> List[Dict]:
+        """Remove as linhas e, em cascata, as que apontam para elas"""
+        chave = ESQUEMA[tabela][0]
+        removidas = []
+        for linha in linhas:
+            if self.tabelas[tabela].pop(linha[chave], None) is not None:
+                removidas.append(dict(linha))
+        self._indices.pop(tabela, None)
+        for (origem, coluna), (destino, referenciada) in CHAVES_ESTRANGEIRAS.items():
+            if destino != tabela:
+                continue
+            valores = {linha.get(referenciada) for linha in removidas}
+            dependentes = [linha for linha in self.tabelas[origem].values() if linha.get(coluna) in valores]
+            if dependentes:
+                self._remover(origem, dependentes)
+        return removidas
+
+
+# ==================== FUNÇÕES E VISÕES DO SUPABASE_SCHEMA.md ====================
+
+def _visao_estatisticas(cliente: ClienteSupabaseFalso) -> List[Dict]:
+    """estatisticas_curso_professor (mantida por gatilhos no Supabase), recalculada sob demanda"""
+    analises = cliente.tabelas['analises']
+    agregados = {}
+    for vinculo in cliente.tabelas['analise_curso'].values():
+        analise = analises.get(vinculo['analise_fk'])
+        if analise is None:
+            continue
+        linha = agregados.setdefault((analise.get('professor_id'), vinculo['curso_fk']), {
+            'professor_id': analise.get('professor_id'),
+            'curso_fk': vinculo['curso_fk'],
+            'total_analises': 0, 'soma_score': 0, 'soma_quadrados': 0,
+            'score_minimo': None, 'score_maximo': None, 'adequadas': 0,
+            'histograma': [0] * FAIXAS_HISTOGRAMA
+        })
+        score = analise['score']
+        linha['total_analises'] += 1
+        linha['soma_score'] += score
+        linha['soma_quadrados'] += score * score
+        linha['score_minimo'] = score if linha['score_minimo'] is None else min(linha['score_minimo'], score)
+        linha['score_maximo'] = score if linha['score_maximo'] is None else max(linha['score_maximo'], score)
+        linha['adequadas'] += 1 if analise['adequado'] else 0
+        linha['histograma'][min(score // 10, FAIXAS_HISTOGRAMA - 1)] += 1
+    return list(agregados.values())
+
+
+def _rpc_estatisticas_cursos_professor(cliente: ClienteSupabaseFalso, parametros: Dict) -> List[Dict]:
+    cursos = cliente.tabelas['cursos']
+    linhas = []
+    for agregado in _visao_estatisticas(cliente):
+        if agregado['professor_id'] != parametros['p_professor_id'] or agregado['curso_fk'] not in cursos:
+            continue
+        curso = cursos[agregado['curso_fk']]
+        total = agregado['total_analises']
+        linhas.append({
+            'codigo_curso': curso['codigo_curso'],
+            'nome': curso['nome'],
+            'descricao_curso': curso.get('descricao_curso', ''),
+            'total_analises': total,
+            'media_score': round(agregado['soma_score'] / total, 2),
+            'score_minimo': agregado['score_minimo'],
+            'score_maximo': agregado['score_maximo'],
+            'adequadas': agregado['adequadas'],
+            'inadequadas': total - agregado['adequadas'],
+        })
+    return sorted(linhas, key=lambda linha: linha['total_analises'], reverse=True)
+
+
+def _rpc_criar_analises_em_lote(cliente: ClienteSupabaseFalso, parametros: Dict) -> List[Dict]:
+    # Versão da migração 9: análises já gravadas com a mesma chave_idempotencia voltam sem duplicar
+    criadas = cliente._gravar(cliente.table('analises').upsert(parametros['p_analises'], on_conflict='chave_idempotencia'))
+    if parametros.get('p_curso_codigo'):
+        cliente._gravar(cliente.table('analise_curso').upsert(
+            [{'analise_fk': analise['analise_id'], 'curso_fk': parametros['p_curso_codigo']} for analise in criadas],
+            on_conflict='analise_fk,curso_fk', ignore_duplicates=True
+        ))
+    return criadas
+
+
+def _rpc_buscar_analises(cliente: ClienteSupabaseFalso, parametros: Dict) -> List[Dict]:
+    """buscar_analises simplificada: trecho no nome do aluno (peso 1) ou no texto da análise (peso 0,5)"""
+    termo = parametros['p_termo'].lower()
+    curso = parametros.get('p_curso_codigo')
+    no_curso = {
+        vinculo['analise_fk'] for vinculo in cliente._indice('analise_curso', 'curso_fk').get(curso, [])
+    } if curso else None
+    ranking = []
+    for analise in cliente._indice('analises', 'professor_id').get(parametros['p_professor_id'], []):
+        if no_curso is not None and analise['analise_id'] not in no_curso:
+            continue
+        relevancia = (1.0 if termo in (analise.get('nome_aluno') or '').lower() else 0.0) + \
+            (0.5 if termo in (analise.get('texto_analise') or '').lower() else 0.0)
+        if relevancia:
+            ranking.append({'analise_id': analise['analise_id'], 'relevancia': relevancia})
+    ranking.sort(key=lambda linha: (linha['relevancia'], linha['analise_id']), reverse=True)
+    return ranking[:parametros.get('p_limite') or 20]
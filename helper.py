@@ -1,11 +1,11 @@
 import re, uuid, os
-import fitz
 import json
 from datetime import datetime
 from core.models.analise import Analise
 from core.models.ementa import Ementa
 from core.models.disciplinas import Disciplinas
 from core.database.database_separado import AnalyseDatabaseSeparado
+from core.services.ocr_extractor import create_selective_ocr
 
 # Importar extrator Docling
 try:
@@ -26,12 +26,8 @@ def convert_datetime_for_json(data: dict) -> dict:
     return converted
 
 def read_pdf(file_path):
-    """Extrai texto de PDF usando PyMuPDF (método tradicional)"""
-    text = ""
-    with fitz.open(file_path) as pdf:
-        for page in pdf:
-            text += page.get_text()
-    return text
+    """Extrai texto de PDF usando PyMuPDF (método tradicional), com OCR nas páginas escaneadas"""
+    return create_selective_ocr().extract_text(file_path)
 
 
 def read_pdf_with_docling(file_path: str, ai_client=None) -> dict:
@@ -0,0 +1,609 @@
+#!/usr/bin/env python3
+"""
+Migração em massa dos dados TinyDB para o Supabase
+
+Lê as tabelas do AnalyseDatabaseSeparado (um arquivo JSON por tabela em
+--dados-dir) e, opcionalmente, o db.json do AnalyseDatabase legado (--legado),
+e grava tudo no Supabase com upserts em lote:
+
+- As tabelas são gravadas em fases, na ordem das chaves estrangeiras. Dentro
+  de uma fase, os lotes de todas as tabelas saem em paralelo (--workers).
+- Ementas, análises e tags recebem ids novos no Supabase. Ementas e análises
+  levam uma `chave_idempotencia` derivada da origem e do id antigo (migração 9
+  do SUPABASE_SCHEMA.md), tags são identificadas pelo nome. O mapa id antigo ->
+  id novo fica no checkpoint e é usado para remapear ementa_fk, analise_fk e tag_fk.
+- O checkpoint (SQLite, --checkpoint) guarda o hash de cada lote concluído.
+  Rodar de novo retoma de onde parou e só reenvia lotes novos ou alterados,
+  então o script também serve para sincronizar dados locais mais recentes.
+- No fim, a verificação compara o checksum de cada tabela na origem com o das
+  linhas correspondentes no Supabase.
+
+Uso:
+    python migrate_to_supabase.py
+    python migrate_to_supabase.py --legado db.json --lote 1000 --workers 8
+    python migrate_to_supabase.py --dry-run
+    python migrate_to_supabase.py --apenas-verificar
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from dotenv import load_dotenv  # noqa: E402
+
+from core.database.artifacts import canonical_json, pack_structured_data  # noqa: E402
+from core.database.write_queue import is_connection_error  # noqa: E402
+
+# Base das chaves de idempotência: o mesmo registro de origem gera sempre a mesma chave
+NAMESPACE_MIGRACAO = uuid.UUID('bfec8810-b83a-4011-9439-53addf3f7114')
+
+TAMANHO_LOTE = 500
+WORKERS = 4
+# Tentativas por lote em falhas de rede (com espera crescente entre elas)
+MAX_TENTATIVAS = 4
+CHECKPOINT_PATH = 'src/data/database/migracao_checkpoint.db'
+
+# colunas: gravadas no Supabase | conflito: alvo do upsert | id: id gerado pelo Supabase
+# remapear: coluna -> tabela cujo mapa de ids traduz o valor | verificar: colunas do checksum
+TABELAS = {
+    'professores': {
+        'colunas': ('prontuario', 'nome', 'email_educacional', 'senha', 'created_at', 'updated_at'),
+        'conflito': 'prontuario',
+        'verificar': ('prontuario', 'nome', 'email_educacional'),
+    },
+    'cursos': {
+        'colunas': ('codigo_curso', 'nome', 'descricao_curso', 'created_at', 'updated_at'),
+        'conflito': 'codigo_curso',
+        'verificar': ('codigo_curso', 'nome', 'descricao_curso'),
+    },
+    'disciplinas': {
+        'colunas': ('id_disciplina', 'nome', 'carga_horaria', 'created_at', 'updated_at'),
+        'conflito': 'id_disciplina',
+        'verificar': ('id_disciplina', 'nome', 'carga_horaria'),
+    },
+    'tags': {
+        'colunas': ('nome', 'created_at'),
+        'conflito': 'nome',
+        'id': 'id_tag',
+        'verificar': ('nome',),
+    },
+    'ementas': {
+        'colunas': ('drive_id', 'file_path', 'file_name', 'file_size', 'hash_conteudo',
+                    'professor_id', 'data_upload', 'created_at'),
+        'conflito': 'chave_idempotencia',
+        'id': 'id_ementa',
+        'verificar': ('chave_idempotencia', 'drive_id', 'file_name', 'hash_conteudo', 'professor_id'),
+    },
+    'analises': {
+        'colunas': ('nome_aluno', 'ementa_fk', 'adequado', 'score', 'texto_analise', 'materias_restantes',
+                    'professor_id', 'dados_estruturados_json', 'comentario', 'created_at', 'updated_at'),
+        'conflito': 'chave_idempotencia',
+        'id': 'analise_id',
+        'remapear': {'ementa_fk': 'ementas'},
+        'verificar': ('chave_idempotencia', 'nome_aluno', 'ementa_fk', 'adequado', 'score',
+                      'texto_analise', 'professor_id'),
+    },
+    'professor_curso': {
+        'colunas': ('prontuario_professor', 'curso_fk', 'created_at'),
+        'conflito': 'prontuario_professor,curso_fk',
+        'verificar': ('prontuario_professor', 'curso_fk'),
+    },
+    'curso_tags': {
+        'colunas': ('curso_fk', 'tag_fk', 'created_at'),
+        'conflito': 'curso_fk,tag_fk',
+        'remapear': {'tag_fk': 'tags'},
+        'verificar': ('curso_fk', 'tag_fk'),
+    },
+    'cursos_disciplina': {
+        'colunas': ('curso_fk', 'disciplina_fk', 'created_at'),
+        'conflito': 'curso_fk,disciplina_fk',
+        'verificar': ('curso_fk', 'disciplina_fk'),
+    },
+    'ementa_disciplina': {
+        'colunas': ('ementa_fk', 'disciplina_fk', 'created_at'),
+        'conflito': 'ementa_fk,disciplina_fk',
+        'remapear': {'ementa_fk': 'ementas'},
+        'verificar': ('ementa_fk', 'disciplina_fk'),
+    },
+    # Derivada do campo curso_fk das análises TinyDB
+    'analise_curso': {
+        'colunas': ('analise_fk', 'curso_fk'),
+        'conflito': 'analise_fk,curso_fk',
+        'remapear': {'analise_fk': 'analises'},
+        'verificar': ('analise_fk', 'curso_fk'),
+    },
+}
+
+# Ordem das chaves estrangeiras: uma fase só começa quando a anterior terminou
+FASES = [
+    ('professores', 'cursos', 'disciplinas', 'tags'),
+    ('ementas', 'professor_curso', 'cursos_disciplina', 'curso_tags'),
+    ('analises', 'ementa_disciplina'),
+    ('analise_curso',),
+]
+
+# Nomes das tabelas no db.json do AnalyseDatabase (as demais têm o mesmo nome)
+TABELAS_LEGADO = {'professores': 'professor', 'ementas': 'ementa', 'analises': 'analise'}
+
+CHECKPOINT_SQL = """
+CREATE TABLE IF NOT EXISTS lotes_concluidos (
+    tabela TEXT NOT NULL,
+    assinatura TEXT NOT NULL,
+    linhas INTEGER NOT NULL,
+    concluido_em REAL NOT NULL,
+    PRIMARY KEY (tabela, assinatura)
+);
+
+CREATE TABLE IF NOT EXISTS mapa_ids (
+    tabela TEXT NOT NULL,
+    origem TEXT NOT NULL,
+    id_origem INTEGER NOT NULL,
+    id_destino INTEGER NOT NULL,
+    PRIMARY KEY (tabela, origem, id_origem)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS linhas_rejeitadas (
+    tabela TEXT NOT NULL,
+    origem TEXT NOT NULL,
+    id_origem TEXT NOT NULL,
+    erro TEXT,
+    PRIMARY KEY (tabela, origem, id_origem)
+);
+"""
+
+
+def ler_tinydb(caminho: str) -> Dict:
+    """Conteúdo de um arquivo TinyDB (arquivo vazio = nenhuma tabela)"""
+    with open(caminho, 'r', encoding='utf-8') as f:
+        texto = f.read().strip()
+    return json.loads(texto) if texto else {}
+
+
+def normalizar(valor):
+    """Valor comparável entre TinyDB e Postgres ("60" e 60.0 viram "60")"""
+    if valor is None or isinstance(valor, bool):
+        return valor
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor)
+
+
+def digest_linha(tabela: str, linha: Dict) -> str:
+    """Hash das colunas verificadas de uma linha"""
+    valores = [normalizar(linha.get(coluna)) for coluna in TABELAS[tabela]['verificar']]
+    return hashlib.sha256(canonical_json(valores).encode('utf-8')).hexdigest()
+
+
+def chave_linha(tabela: str, linha: Dict) -> Tuple:
+    """Valores do alvo do upsert, que identificam a linha no Supabase"""
+    return tuple(normalizar(linha.get(coluna)) for coluna in TABELAS[tabela]['conflito'].split(','))
+
+
+def checksum_tabela(digests) -> str:
+    """Checksum de uma tabela, independente da ordem das linhas"""
+    return hashlib.sha256(''.join(sorted(digests)).encode('ascii')).hexdigest()[:16]
+
+
+class Checkpoint:
+    """Lotes concluídos, mapa de ids e linhas rejeitadas da migração (usado só pela thread principal)"""
+
+    def __init__(self, db_path: str):
+        if db_path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(CHECKPOINT_SQL)
+
+    def limpar(self):
+        """Descarta o progresso salvo (a próxima execução reenvia tudo)"""
+        with self.conn:
+            for tabela in ('lotes_concluidos', 'mapa_ids', 'linhas_rejeitadas'):
+                self.conn.execute(f"DELETE FROM {tabela}")
+
+    def lote_concluido(self, tabela: str, assinatura: str) -> bool:
+        return self.conn.execute(
+            "SELECT 1 FROM lotes_concluidos WHERE tabela = ? AND assinatura = ?", (tabela, assinatura)
+        ).fetchone() is not None
+
+    def registrar_lote(self, tabela: str, assinatura: str, linhas: int,
+                       ids: Dict[Tuple[str, int], int], rejeitadas: List[Tuple[str, str, str]]):
+        """Grava o lote, seus ids e suas rejeições na mesma transação"""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO mapa_ids (tabela, origem, id_origem, id_destino) VALUES (?, ?, ?, ?)",
+                [(tabela, origem, id_origem, id_destino) for (origem, id_origem), id_destino in ids.items()]
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO linhas_rejeitadas (tabela, origem, id_origem, erro) VALUES (?, ?, ?, ?)",
+                [(tabela, origem, str(id_origem), erro) for origem, id_origem, erro in rejeitadas]
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO lotes_concluidos (tabela, assinatura, linhas, concluido_em) VALUES (?, ?, ?, ?)",
+                (tabela, assinatura, linhas, time.time())
+            )
+
+    def carregar_mapas(self) -> Dict[str, Dict[Tuple[str, int], int]]:
+        mapas = {tabela: {} for tabela in TABELAS}
+        for tabela, origem, id_origem, id_destino in self.conn.execute(
+            "SELECT tabela, origem, id_origem, id_destino FROM mapa_ids"
+        ):
+            mapas[tabela][(origem, id_origem)] = id_destino
+        return mapas
+
+    def rejeitadas(self) -> List[Tuple[str, str, str, str]]:
+        return self.conn.execute(
+            "SELECT tabela, origem, id_origem, erro FROM linhas_rejeitadas ORDER BY tabela, origem, id_origem"
+        ).fetchall()
+
+
+class MigradorSupabase:
+    """Migração TinyDB -> Supabase em fases, com lotes paralelos, retomada e verificação"""
+
+    def __init__(self, dados_dir: str, legado: Optional[str], checkpoint: Checkpoint,
+                 url: str = None, service_key: str = None, tamanho_lote: int = TAMANHO_LOTE,
+                 workers: int = WORKERS, dry_run: bool = False):
+        self.dados_dir = dados_dir
+        self.legado = ler_tinydb(legado) if legado else None
+        self.checkpoint = checkpoint
+        self.url = url
+        self.service_key = service_key
+        self.tamanho_lote = tamanho_lote
+        self.workers = workers
+        self.dry_run = dry_run
+        self.mapas = checkpoint.carregar_mapas()
+        self.relatorio = {
+            tabela: {'enviadas': 0, 'retomadas': 0, 'rejeitadas': 0, 'referencias_quebradas': 0}
+            for tabela in TABELAS
+        }
+        self._local = threading.local()
+        self._artefatos_disponiveis = True
+
+    # ==================== ORIGEM ====================
+
+    def _fontes(self, tabela: str) -> Iterator[Tuple[str, Dict]]:
+        """(origem, documentos) de uma tabela: arquivo do banco separado e/ou db.json legado"""
+        caminho = os.path.join(self.dados_dir, f'{tabela}.json')
+        if os.path.exists(caminho):
+            yield 'separado', ler_tinydb(caminho).get('_default', {})
+        if self.legado is not None:
+            yield 'legado', self.legado.get(TABELAS_LEGADO.get(tabela, tabela), {})
+
+    def _linhas_origem(self, tabela: str) -> Iterator[Tuple[str, int, Dict]]:
+        """(origem, id de origem, documento) em ordem de doc_id, para os lotes serem estáveis entre execuções"""
+        fonte = 'analises' if tabela == 'analise_curso' else tabela
+        coluna_id = TABELAS[fonte].get('id')
+        for origem, documentos in self._fontes(fonte):
+            for doc_id, linha in sorted(documentos.items(), key=lambda item: int(item[0])):
+                id_origem = int(linha.get(coluna_id) or doc_id) if coluna_id else int(doc_id)
+                if tabela != 'analise_curso':
+                    yield origem, id_origem, linha
+                elif linha.get('curso_fk'):
+                    yield origem, id_origem, {'analise_fk': id_origem, 'curso_fk': linha['curso_fk']}
+
+    def _preparar(self, origem: str, tabela: str, id_origem: int, linha: Dict) -> Optional[Dict]:
+        """Linha no formato do Supabase; None se uma chave estrangeira não tem correspondente migrado"""
+        spec = TABELAS[tabela]
+        linha = dict(linha)
+        if tabela in ('ementas', 'analises'):
+            linha.setdefault('professor_id', linha.get('prontuario_professor'))
+        if tabela == 'analises':
+            dados = linha.get('dados_estruturados_json') or linha.get('dados_estruturados')
+            linha['dados_estruturados_json'] = json.dumps(dados, ensure_ascii=False) if isinstance(dados, dict) else dados
+
+        dados = {coluna: linha[coluna] for coluna in spec['colunas'] if linha.get(coluna) is not None}
+        if tabela == 'cursos':
+            dados.setdefault('descricao_curso', '')
+        if spec['conflito'] == 'chave_idempotencia':
+            dados['chave_idempotencia'] = str(uuid.uuid5(NAMESPACE_MIGRACAO, f"{origem}:{tabela}:{id_origem}"))
+
+        for coluna, referencia in spec.get('remapear', {}).items():
+            try:
+                id_destino = self.mapas[referencia].get((origem, int(dados[coluna])))
+            except (KeyError, TypeError, ValueError):
+                id_destino = None
+            if id_destino is None:
+                return None
+            dados[coluna] = id_destino
+        return dados
+
+    def _itens(self, tabela: str) -> Iterator[Optional[Dict]]:
+        """Linhas preparadas da tabela; None para cada referência quebrada"""
+        for origem, id_origem, linha in self._linhas_origem(tabela):
+            dados = self._preparar(origem, tabela, id_origem, linha)
+            yield {'origem': origem, 'id_origem': id_origem, 'linha': dados} if dados is not None else None
+
+    def _lotes(self, tabela: str) -> Iterator[List[Dict]]:
+        lote = []
+        for item in self._itens(tabela):
+            if item is None:
+                self.relatorio[tabela]['referencias_quebradas'] += 1
+                continue
+            lote.append(item)
+            if len(lote) >= self.tamanho_lote:
+                yield lote
+                lote = []
+        if lote:
+            yield lote
+
+    # ==================== ENVIO ====================
+
+    def _client(self):
+        """Um cliente por thread de envio (cada um com seu pool de conexões)"""
+        if not hasattr(self._local, 'client'):
+            from supabase import create_client
+            self._local.client = create_client(self.url, self.service_key)
+        return self._local.client
+
+    def verificar_pre_requisitos(self):
+        """Falha cedo se o banco ainda não tem a coluna chave_idempotencia (migração 9)"""
+        client = self._client()
+        for tabela in ('ementas', 'analises'):
+            try:
+                client.table(tabela).select('chave_idempotencia').limit(1).execute()
+            except Exception as e:
+                if is_connection_error(e) or 'chave_idempotencia' not in str(e):
+                    raise
+                raise SystemExit(
+                    f"❌ {tabela}.chave_idempotencia não existe no Supabase. "
+                    "Aplique a migração 9 do SUPABASE_SCHEMA.md antes de migrar."
+                )
+
+    def _gravar_artefatos(self, client, linhas: List[Dict]):
+        """Move dados_estruturados_json das análises para artefatos_analise (como SupabaseDatabase._store_artifacts)"""
+        if not self._artefatos_disponiveis:
+            return
+        artefatos = {}
+        hashes = []
+        for linha in linhas:
+            dados_json = linha.get('dados_estruturados_json')
+            if not dados_json:
+                hashes.append(None)
+                continue
+            content_hash, encoded, tamanho = pack_structured_data(json.loads(dados_json))
+            artefatos[content_hash] = {
+                'hash_conteudo': content_hash,
+                'conteudo_gzip': encoded,
+                'tamanho_original': tamanho
+            }
+            hashes.append(content_hash)
+        if not artefatos:
+            return
+        try:
+            client.table('artefatos_analise').upsert(
+                list(artefatos.values()), on_conflict='hash_conteudo', ignore_duplicates=True
+            ).execute()
+        except Exception as e:
+            if is_connection_error(e):
+                raise
+            print(f"⚠️ Tabela artefatos_analise indisponível (mantendo dados estruturados nas análises): {e}")
+            self._artefatos_disponiveis = False
+            return
+        for linha, content_hash in zip(linhas, hashes):
+            if content_hash:
+                linha.pop('dados_estruturados_json', None)
+                linha['artefato_hash'] = content_hash
+
+    def _upsert(self, client, tabela: str, linhas: List[Dict]) -> List[Dict]:
+        """
+        Upsert no alvo de conflito da tabela
+
+        As linhas são agrupadas pelo conjunto de colunas: em um envio em lote,
+        colunas ausentes em uma linha seriam gravadas como NULL em vez do default.
+        """
+        grupos = {}
+        for linha in linhas:
+            grupos.setdefault(tuple(sorted(linha)), []).append(linha)
+        retornadas = []
+        for grupo in grupos.values():
+            response = client.table(tabela).upsert(grupo, on_conflict=TABELAS[tabela]['conflito']).execute()
+            retornadas.extend(response.data or [])
+        return retornadas
+
+    def _upsert_lote(self, tabela: str, lote: List[Dict]) -> Dict:
+        client = self._client()
+        linhas = [dict(item['linha']) for item in lote]
+        if tabela == 'analises':
+            self._gravar_artefatos(client, linhas)
+
+        rejeitadas = []
+        try:
+            retornadas = self._upsert(client, tabela, linhas)
+        except Exception as e:
+            if is_connection_error(e):
+                raise
+            # Lote recusado por alguma linha inválida: linha a linha para isolar as rejeitadas
+            retornadas = []
+            for item, linha in zip(lote, linhas):
+                try:
+                    retornadas.extend(self._upsert(client, tabela, [linha]))
+                except Exception as erro_linha:
+                    if is_connection_error(erro_linha):
+                        raise
+                    rejeitadas.append((item['origem'], item['id_origem'], str(erro_linha)))
+
+        ids = {}
+        coluna_id = TABELAS[tabela].get('id')
+        if coluna_id:
+            conflito = TABELAS[tabela]['conflito']
+            destino = {row[conflito]: row[coluna_id] for row in retornadas}
+            for item in lote:
+                id_destino = destino.get(item['linha'][conflito])
+                if id_destino is not None:
+                    ids[(item['origem'], item['id_origem'])] = id_destino
+        return {'ids': ids, 'rejeitadas': rejeitadas}
+
+    def _enviar_lote(self, tabela: str, lote: List[Dict]) -> Dict:
+        """Grava um lote, repetindo em falhas de rede"""
+        for tentativa in range(1, MAX_TENTATIVAS + 1):
+            try:
+                return self._upsert_lote(tabela, lote)
+            except Exception as e:
+                if not is_connection_error(e) or tentativa == MAX_TENTATIVAS:
+                    raise
+                espera = 2 ** tentativa
+                print(f"⏳ {tabela}: falha de rede ({e}); nova tentativa em {espera}s")
+                time.sleep(espera)
+
+    def _coletar(self, em_andamento: Dict, quando: str):
+        """Registra no checkpoint os lotes terminados"""
+        if not em_andamento:
+            return
+        concluidos, _ = wait(em_andamento, return_when=quando)
+        for futuro in concluidos:
+            tabela, lote, assinatura = em_andamento.pop(futuro)
+            resultado = futuro.result()
+            self.checkpoint.registrar_lote(tabela, assinatura, len(lote), resultado['ids'], resultado['rejeitadas'])
+            self.mapas[tabela].update(resultado['ids'])
+            self.relatorio[tabela]['enviadas'] += len(lote) - len(resultado['rejeitadas'])
+            self.relatorio[tabela]['rejeitadas'] += len(resultado['rejeitadas'])
+            for origem, id_origem, erro in resultado['rejeitadas']:
+                print(f"⚠️ {tabela} ({origem} {id_origem}) rejeitada: {erro}")
+
+    def _executar_fase(self, tabelas: Tuple[str, ...]):
+        """Envia os lotes das tabelas da fase em paralelo, no máximo 2 por worker em memória"""
+        lotes = ((tabela, lote) for tabela in tabelas for lote in self._lotes(tabela))
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        em_andamento = {}
+        try:
+            for tabela, lote in lotes:
+                assinatura = hashlib.sha256(
+                    canonical_json([[item['origem'], item['id_origem'], item['linha']] for item in lote]).encode('utf-8')
+                ).hexdigest()
+                if self.checkpoint.lote_concluido(tabela, assinatura):
+                    self.relatorio[tabela]['retomadas'] += len(lote)
+                    continue
+                if self.dry_run:
+                    # Sem Supabase: ids de origem no lugar dos definitivos, para contar referências quebradas
+                    if TABELAS[tabela].get('id'):
+                        self.mapas[tabela].update({(item['origem'], item['id_origem']): item['id_origem'] for item in lote})
+                    self.relatorio[tabela]['enviadas'] += len(lote)
+                    continue
+                em_andamento[executor.submit(self._enviar_lote, tabela, lote)] = (tabela, lote, assinatura)
+                if len(em_andamento) >= self.workers * 2:
+                    self._coletar(em_andamento, FIRST_COMPLETED)
+            self._coletar(em_andamento, ALL_COMPLETED)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def migrar(self) -> bool:
+        """Executa as fases em ordem; False se alguma falhou (o progresso fica no checkpoint)"""
+        inicio = time.perf_counter()
+        for numero, tabelas in enumerate(FASES, start=1):
+            print(f"📦 Fase {numero}/{len(FASES)}: {', '.join(tabelas)}")
+            try:
+                self._executar_fase(tabelas)
+            except Exception as e:
+                print(f"❌ Migração interrompida na fase {numero}: {e}")
+                print("🔄 Execute o script novamente para retomar a partir do checkpoint")
+                return False
+
+        print(f"\n{'Tabela':<20}{'Enviadas':>10}{'Retomadas':>11}{'Rejeitadas':>12}{'Ref. quebradas':>16}")
+        for tabela, contagem in self.relatorio.items():
+            print(f"{tabela:<20}{contagem['enviadas']:>10}{contagem['retomadas']:>11}"
+                  f"{contagem['rejeitadas']:>12}{contagem['referencias_quebradas']:>16}")
+        print(f"⏱️ {time.perf_counter() - inicio:.1f}s")
+        if any(contagem['rejeitadas'] for contagem in self.relatorio.values()):
+            print("⚠️ Há linhas rejeitadas; veja a tabela linhas_rejeitadas do checkpoint")
+        return True
+
+    # ==================== VERIFICAÇÃO ====================
+
+    def _digests_destino(self, tabela: str, linhas: List[Dict], chunk_size: int = 200) -> Dict[Tuple, str]:
+        """Hash das linhas do Supabase correspondentes a `linhas` (filtro in_ na primeira coluna do alvo, em paralelo)"""
+        primeira_coluna = TABELAS[tabela]['conflito'].split(',')[0]
+        valores = list(dict.fromkeys(linha[primeira_coluna] for linha in linhas))
+        chaves = [chave_linha(tabela, linha) for linha in linhas]
+        colunas = ', '.join(TABELAS[tabela]['verificar'])
+        esperadas = set(chaves)
+
+        def buscar(chunk):
+            return self._client().table(tabela).select(colunas).in_(primeira_coluna, chunk).execute().data or []
+
+        destino = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for linhas in executor.map(buscar, [valores[i:i + chunk_size] for i in range(0, len(valores), chunk_size)]):
+                for linha in linhas:
+                    chave = chave_linha(tabela, linha)
+                    if chave in esperadas:
+                        destino[chave] = digest_linha(tabela, linha)
+        return destino
+
+    def verificar(self) -> bool:
+        """Compara, tabela a tabela, o checksum da origem com o das linhas correspondentes no Supabase"""
+        print("\n🔍 Verificando checksums...")
+        ok = True
+        for tabelas in FASES:
+            for tabela in tabelas:
+                linhas = [item['linha'] for item in self._itens(tabela) if item is not None]
+                if not linhas:
+                    continue
+                origem = {chave_linha(tabela, linha): digest_linha(tabela, linha) for linha in linhas}
+                destino = self._digests_destino(tabela, linhas)
+                faltando = [chave for chave in origem if chave not in destino]
+                divergentes = [chave for chave in origem if chave in destino and destino[chave] != origem[chave]]
+                soma_origem = checksum_tabela(origem.values())
+                soma_destino = checksum_tabela(destino.values())
+                if not faltando and not divergentes:
+                    print(f"✅ {tabela}: {len(origem)} linha(s), checksum {soma_origem}")
+                    continue
+                ok = False
+                print(f"❌ {tabela}: checksum {soma_origem} na origem, {soma_destino} no Supabase; "
+                      f"{len(faltando)} faltando, {len(divergentes)} divergente(s)")
+                for chave in (faltando + divergentes)[:10]:
+                    print(f"   - {chave}")
+        return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migra os dados TinyDB (banco separado e db.json legado) para o Supabase")
+    parser.add_argument('--dados-dir', default='src/data/database', help="pasta dos arquivos JSON do AnalyseDatabaseSeparado")
+    parser.add_argument('--legado', help="db.json do AnalyseDatabase (opcional)")
+    parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help="linhas por upsert")
+    parser.add_argument('--workers', type=int, default=WORKERS, help="lotes enviados em paralelo")
+    parser.add_argument('--checkpoint', default=CHECKPOINT_PATH, help="arquivo SQLite com o progresso da migração")
+    parser.add_argument('--reiniciar', action='store_true', help="descarta o checkpoint e reenvia tudo")
+    parser.add_argument('--dry-run', action='store_true', help="só lê a origem e conta linhas e referências quebradas")
+    parser.add_argument('--apenas-verificar', action='store_true', help="pula a migração e só compara os checksums")
+    parser.add_argument('--sem-verificacao', action='store_true', help="não compara os checksums no final")
+    args = parser.parse_args()
+
+    load_dotenv()
+    url = os.getenv("SUPABASE_URL")
+    service_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not args.dry_run and (not url or not service_key):
+        print("❌ Configure SUPABASE_URL e SUPABASE_SERVICE_ROLE_KEY no .env (a migração ignora o RLS)")
+        sys.exit(1)
+
+    # Dry-run não deve tocar no checkpoint real (os ids dele seriam os de origem)
+    checkpoint = Checkpoint(':memory:' if args.dry_run else args.checkpoint)
+    if args.reiniciar:
+        checkpoint.limpar()
+    migrador = MigradorSupabase(
+        args.dados_dir, args.legado, checkpoint, url=url, service_key=service_key,
+        tamanho_lote=args.lote, workers=args.workers, dry_run=args.dry_run
+    )
+
+    if args.dry_run:
+        print("🧪 Dry-run: nada será gravado no Supabase")
+        sys.exit(0 if migrador.migrar() else 1)
+
+    migrador.verificar_pre_requisitos()
+    ok = True
+    if not args.apenas_verificar:
+        ok = migrador.migrar()
+    if ok and not args.sem_verificacao:
+        ok = migrador.verificar()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,10 @@ from core.models.disciplinas import Disciplinas
 from core.models.analise import Analise
 from core.models.ementa import Ementa, EmentaCreate
 from core.services.google_drive_service import GoogleDriveService
+from core.services.similarity_index import similarity_index
+from core.services.page_relevance import create_page_relevance_scorer, split_pages
+from core.services.document_router import create_document_router
+from core.utils.text_normalization import tokenize
 
 # Adicionar o diretório raiz do projeto ao path para importar o módulo ai
 project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -48,7 +52,7 @@ if database.use_supabase:
     database.client = supabase_config.get_client(use_service_role=True) or supabase_config.get_client()
 
 # Verificar se os métodos necessários existem
-required_methods = ['update_analise_comentario', 'check_analise_exists_for_ementa_and_curso']
+required_methods = ['update_analise_comentario', 'check_analise_exists_for_ementa_and_curso', 'find_existing_analises', 'load_course_overview', 'search_analises', 'sync_pending_writes']
 missing_methods = [method for method in required_methods if not hasattr(database, method)]
 
 if missing_methods:
@@ -61,6 +65,19 @@ if missing_methods:
 # Inicializa o serviço do Google Drive
 drive_service = GoogleDriveService()
 
+# Tamanho da página do histórico de análises (paginação por keyset)
+HISTORICO_PAGE_SIZE = 200
+
+# Triagem por similaridade: abaixo desta afinidade (TF-IDF, 0 a 1) com o curso, o PDF
+# não vai ao LLM sem confirmação do professor (0 desativa a triagem)
+AFINIDADE_MINIMA_TRIAGEM = float(os.getenv("AFINIDADE_MINIMA_TRIAGEM", "0.05"))
+
+# Filtro de relevância de páginas (reduz o texto enviado ao LLM)
+page_relevance_scorer = create_page_relevance_scorer()
+
+# Roteador entre os pipelines de ementa e de histórico
+document_router = create_document_router()
+
 # Configura a página do Streamlit
 st.set_page_config(
     layout="wide", 
@@ -736,9 +753,43 @@ def authenticate_professor_unified(login_field: str, senha: str) -> Optional[Dic
         st.error(f"Erro na autenticação: {str(e)}")
         return None
 
+# Função para resumir o histórico carregado quando não há agregados no banco
+def summarize_historico(df_historico: pd.DataFrame) -> Dict:
+    """Indicadores do dashboard no mesmo formato de database.get_course_dashboard_stats"""
+    scores = df_historico['score']
+    adequadas = int((df_historico['adequado'] == True).sum())
+    histograma = [int(((scores // 10).clip(upper=9) == faixa).sum()) for faixa in range(10)]
+    return {
+        'total_analises': len(df_historico),
+        'adequadas': adequadas,
+        'inadequadas': len(df_historico) - adequadas,
+        'media_score': float(scores.mean()),
+        'desvio_padrao': float(scores.std()) if len(df_historico) > 1 else 0.0,
+        'score_minimo': int(scores.min()),
+        'score_maximo': int(scores.max()),
+        'histograma': histograma,
+        'scores_acima_70': sum(histograma[7:]),
+        'scores_abaixo_50': sum(histograma[:5])
+    }
+
+# Função para gerar a impressão digital de um arquivo enviado
+def get_upload_fingerprint(uploaded_file, course_code: str, professor_prontuario: str) -> str:
+    """Identifica um arquivo do st.file_uploader de forma estável entre reruns"""
+    file_id = getattr(uploaded_file, 'file_id', None)
+    if file_id:
+        identificador = f"{file_id}:{uploaded_file.name}:{uploaded_file.size}"
+    else:
+        identificador = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+    return f"{professor_prontuario}:{course_code}:{identificador}"
+
 # Função para processar uploads de PDFs
 def process_uploaded_files(uploaded_files, course_code: str, professor_prontuario: str) -> List[Dict]:
-    """Processa arquivos PDFs enviados e cria registros de ementas"""
+    """Processa arquivos PDFs enviados e cria registros de ementas
+    
+    Idempotente por sessão: o ledger de ingestão (st.session_state['ingest_ledger']) guarda
+    o resultado de cada arquivo já tratado, então reruns do Streamlit com os mesmos arquivos
+    no uploader não repetem uploads para o Drive nem inserções em ementas.
+    """
     if not uploaded_files:
         return []
     
@@ -750,6 +801,12 @@ def process_uploaded_files(uploaded_files, course_code: str, professor_prontuari
         st.error("Máximo 5 PDFs por lote!")
         return []
     
+    # Ledger de ingestão da sessão: impressão digital do arquivo -> ementa já criada
+    ingest_ledger = st.session_state.setdefault('ingest_ledger', {})
+    fingerprints = [get_upload_fingerprint(f, course_code, professor_prontuario) for f in uploaded_files]
+    if all(fp in ingest_ledger for fp in fingerprints):
+        return [ingest_ledger[fp] for fp in fingerprints]
+    
     # Verificar se Google Drive está configurado
     drive_available = os.path.exists('credentials.json')
     
@@ -759,14 +816,36 @@ def process_uploaded_files(uploaded_files, course_code: str, professor_prontuari
     # Processar uploads
     ementas_data = []
     for i, uploaded_file in enumerate(uploaded_files):
+        fingerprint = fingerprints[i]
+        if fingerprint in ingest_ledger:
+            ementas_data.append(ingest_ledger[fingerprint])
+            continue
+        
         try:
             # Salvar arquivo temporariamente
             file_path = f"src/data/uploads/{uploaded_file.name}"
             os.makedirs("src/data/uploads", exist_ok=True)
             
+            conteudo = uploaded_file.getvalue()
             with open(file_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            
+                f.write(conteudo)
+
+            # Detectar PDF já enviado (mesmo conteúdo) para reaproveitar ementa, Drive e extração
+            hash_conteudo = hashlib.sha256(conteudo).hexdigest()
+            ementa_existente = database.get_ementa_by_hash(hash_conteudo, professor_prontuario)
+            if ementa_existente and ementa_existente.get('id_ementa'):
+                ementas_data.append({
+                    'id_ementa': ementa_existente['id_ementa'],
+                    'nome_arquivo': uploaded_file.name,
+                    'caminho': file_path,
+                    'drive_id': ementa_existente.get('drive_id'),
+                    'hash_conteudo': hash_conteudo,
+                    'reutilizada': True
+                })
+                ingest_ledger[fingerprint] = ementas_data[-1]
+                st.info(f"♻️ {uploaded_file.name} já foi enviado anteriormente (ID: {ementa_existente['id_ementa']}). Reutilizando ementa existente.")
+                continue
+
             # Upload para Google Drive se disponível
             drive_id = None
             if drive_available and not st.session_state.get('skip_drive', False):
@@ -797,6 +876,7 @@ def process_uploaded_files(uploaded_files, course_code: str, professor_prontuari
             # Criar registro da ementa (sem id_ementa - será gerado pelo Supabase)
             ementa_data = {
                 'drive_id': drive_id,
+                'hash_conteudo': hash_conteudo,
                 'data_upload': datetime.now()
             }
             
@@ -813,8 +893,10 @@ def process_uploaded_files(uploaded_files, course_code: str, professor_prontuari
                         'id_ementa': ementa_id,
                         'nome_arquivo': uploaded_file.name,
                         'caminho': file_path,
-                        'drive_id': drive_id
+                        'drive_id': drive_id,
+                        'hash_conteudo': hash_conteudo
                     })
+                    ingest_ledger[fingerprint] = ementas_data[-1]
                     st.success(f"✅ {uploaded_file.name} processado com sucesso (ID: {ementa_id})")
                 else:
                     st.error(f"❌ Erro ao criar registro da ementa para {uploaded_file.name}. Resultado: {ementa_result}")
@@ -845,9 +927,37 @@ def upload_pdfs(course_code: str, professor_prontuario: str) -> List[Dict]:
     
     return []
 
+def link_ementa_disciplines(ementa_id: int, texto_ementa: str, disciplinas: List[Dict]) -> List[str]:
+    """Vincula a ementa (ementa_disciplina) às disciplinas do curso citadas no texto do PDF
+
+    Uma disciplina é citada quando os termos do seu nome aparecem em sequência no texto
+    (sem acento e sem stopwords). São esses vínculos que a busca por disciplina usa.
+
+    Returns:
+        List[str]: IDs das disciplinas vinculadas agora
+    """
+    texto = f" {' '.join(tokenize(texto_ementa))} "
+    ja_vinculadas = {disciplina['id_disciplina'] for disciplina in database.get_ementa_disciplines(ementa_id)}
+    vinculadas = []
+    for disciplina in disciplinas:
+        termos = ' '.join(tokenize(disciplina.get('nome') or ''))
+        if not termos or disciplina['id_disciplina'] in ja_vinculadas or f" {termos} " not in texto:
+            continue
+        if database.create_ementa_disciplina_relationship(ementa_id, disciplina['id_disciplina']):
+            vinculadas.append(disciplina['id_disciplina'])
+    return vinculadas
+
 # Função para análise real com IA
-def process_analysis_with_ai(ementa_id: int, course_code: str, professor_prontuario: str) -> List[Dict]:
-    """Processa análise real usando IA"""
+def process_analysis_with_ai(ementa_id: int, course_code: str, professor_prontuario: str, salvar: bool = True,
+                             ignorar_triagem: bool = False) -> List[Dict]:
+    """Processa análise real usando IA
+    
+    Com salvar=False a análise não é gravada: os dados prontos para inserção ficam
+    em 'analise_pendente', para serem salvos em lote com database.create_analises_bulk.
+    
+    Antes do LLM, a triagem local compara o PDF com o curso (SimilarityIndex). Com afinidade
+    abaixo de AFINIDADE_MINIMA_TRIAGEM o PDF é pulado (retorna []), a menos que ignorar_triagem.
+    """
     
     try:
         # Inicializar cliente de IA
@@ -883,8 +993,13 @@ def process_analysis_with_ai(ementa_id: int, course_code: str, professor_prontua
             st.error(f"Curso {course_code} não encontrado!")
             return []
         
+        # Reaproveitar extração já armazenada para este PDF (evita novo download e nova extração)
+        structured_data = database.get_dados_estruturados_by_ementa(ementa_id)
+        if structured_data and structured_data.get('raw_text'):
+            texto_ementa = structured_data['raw_text']
+            st.info("♻️ Reutilizando extração armazenada deste PDF")
         # Se a ementa tem drive_id, baixar do Google Drive
-        if ementa_data.get('drive_id') and not ementa_data['drive_id'].startswith('local_'):
+        elif ementa_data.get('drive_id') and not ementa_data['drive_id'].startswith('local_'):
             with st.spinner("Baixando ementa do Google Drive..."):
                 file_content = drive_service.download_file(
                     ementa_data['drive_id'], 
@@ -950,10 +1065,70 @@ def process_analysis_with_ai(ementa_id: int, course_code: str, professor_prontua
         if not texto_ementa.strip():
             st.error("Não foi possível extrair texto da ementa!")
             return []
-        
+
+        # Triagem local por similaridade (TF-IDF), antes de gastar chamadas de LLM
+        try:
+            cursos_professor = st.session_state.get('professor_courses') or [curso_data]
+            for curso in cursos_professor:
+                if not similarity_index.has_course(curso['codigo_curso']):
+                    similarity_index.add_course(curso, database.get_curso_disciplines(curso['codigo_curso']))
+            similarity_index.add_student(ementa_id, texto_ementa, {'professor_id': professor_prontuario})
+
+            codigos_professor = list(dict.fromkeys([course_code] + [curso['codigo_curso'] for curso in cursos_professor]))
+            if not similarity_index.has_course(course_code):
+                similarity_index.add_course(curso_data, database.get_curso_disciplines(course_code))
+            ranking_cursos = similarity_index.rank_courses_for_student(ementa_id, cursos=codigos_professor)
+            if ranking_cursos:
+                st.caption("Afinidade estimada com seus cursos: " + " | ".join(
+                    f"{item['codigo_curso']}: {item['similaridade']:.2f}" for item in ranking_cursos
+                ))
+            
+            # Curso sem disciplinas cadastradas não tem vocabulário para comparar: sem triagem
+            afinidade = next((item['similaridade'] for item in ranking_cursos if item['codigo_curso'] == course_code), 0.0)
+            if (not ignorar_triagem and AFINIDADE_MINIMA_TRIAGEM > 0 and afinidade < AFINIDADE_MINIMA_TRIAGEM
+                    and database.get_curso_disciplines(course_code)):
+                melhor = ranking_cursos[0] if ranking_cursos else None
+                sugestao = (f" Curso mais afim: {melhor['codigo_curso']} ({melhor['similaridade']:.2f})."
+                            if melhor and melhor['codigo_curso'] != course_code else "")
+                st.warning(f"⚠️ Ementa {ementa_id} não enviada à IA: afinidade {afinidade:.2f} com o curso "
+                           f"{course_code} (mínimo {AFINIDADE_MINIMA_TRIAGEM:.2f}).{sugestao} "
+                           f"Marque 'Analisar mesmo com baixa afinidade' para enviar mesmo assim.")
+                print(f"🚦 Triagem: ementa {ementa_id} pulada (afinidade {afinidade:.4f} com {course_code})")
+                return []
+        except Exception as e:
+            print(f"⚠️ Erro na triagem por similaridade: {e}")
+
+        # Disciplinas do curso citadas no PDF: alimentam a busca por disciplina
+        try:
+            vinculadas = link_ementa_disciplines(ementa_id, texto_ementa, database.get_curso_disciplines(course_code))
+            if vinculadas:
+                print(f"🔗 Ementa {ementa_id} vinculada às disciplinas {', '.join(vinculadas)}")
+        except Exception as e:
+            print(f"⚠️ Erro ao vincular disciplinas à ementa: {e}")
+
+        # Enviar ao LLM apenas as páginas com informação curricular
+        texto_relevante = texto_ementa
+        try:
+            paginas = split_pages(texto_ementa, (structured_data or {}).get('page_offsets'))
+            texto_relevante, relevancia = page_relevance_scorer.select(paginas)
+            if structured_data:
+                structured_data.setdefault('extraction_info', {})['relevancia'] = relevancia
+            print(f"📉 Filtro de páginas: {relevancia['paginas_enviadas']}/{relevancia['paginas_total']} "
+                  f"enviadas, ~{relevancia['tokens_economizados']} tokens economizados")
+            if relevancia['tokens_economizados'] > 0:
+                st.caption(f"📉 {relevancia['paginas_enviadas']} de {relevancia['paginas_total']} páginas enviadas à IA "
+                           f"(~{relevancia['tokens_economizados']} tokens economizados)")
+        except Exception as e:
+            print(f"⚠️ Erro no filtro de relevância de páginas: {e}")
+            texto_relevante = texto_ementa
+
+        # Cada tipo de documento segue seu próprio pipeline (ementa x histórico)
+        rota = document_router.route(texto_ementa, structured_data)
+        print(f"🔀 Documento {ementa_id}: formato {rota.formato.value} -> pipeline {rota.pipeline.value}")
+
         # Gerar resumo da ementa
         with st.spinner("Gerando resumo da ementa..."):
-            resumo_ementa = ai_client.resume_ementa(texto_ementa)
+            resumo_ementa = document_router.summarize(ai_client, rota, texto_relevante)
         
         # Gerar score da análise
         with st.spinner("Calculando score da análise..."):
@@ -977,8 +1152,8 @@ def process_analysis_with_ai(ementa_id: int, course_code: str, professor_prontua
         import re
         nome_aluno = "Nome não identificado"
         
-        # Tentar extrair do Docling primeiro
-        if 'structured_data' in locals() and structured_data:
+        # Tentar extrair do Docling primeiro (ementas de disciplina não têm dados de aluno)
+        if rota.extrair_aluno and 'structured_data' in locals() and structured_data:
             student_info = structured_data.get("student_info", {})
             if student_info.get("nome"):
                 nome_aluno = student_info["nome"]
@@ -1022,6 +1197,10 @@ def process_analysis_with_ai(ementa_id: int, course_code: str, professor_prontua
             # Atualizar analise_dict com campos obrigatórios
             analise_dict.update(required_fields)
             
+            if not salvar:
+                analise_data['analise_pendente'] = analise_dict
+                return [analise_data]
+            
             # Salvar no banco com relacionamento ao curso
             print(f"🔍 [DEBUG] Salvando análise com curso_codigo: {course_code}")
             print(f"🔍 [DEBUG] Dados da análise: {analise_dict.keys()}")
@@ -1034,27 +1213,13 @@ def process_analysis_with_ai(ementa_id: int, course_code: str, professor_prontua
                 if analise_id:
                     st.success(f"✅ Análise salva com sucesso! ID: {analise_id} | Vinculada ao curso: {course_code}")
                     
-                    # Verificar se o relacionamento foi criado (aguardar um pouco para garantir que foi processado)
-                    import time
-                    time.sleep(0.5)
-                    
-                    try:
-                        analise_cursos = database.get_analise_cursos(analise_id)
-                        print(f"🔍 [DEBUG] Cursos relacionados à análise {analise_id}: {analise_cursos}")
-                        
-                        if analise_cursos and len(analise_cursos) > 0:
-                            curso_encontrado = any(c.get('codigo_curso') == course_code or c.get('curso_fk') == course_code for c in analise_cursos)
-                            if curso_encontrado:
-                                st.success(f"✅ Relacionamento com curso {course_code} criado com sucesso!")
-                            else:
-                                st.warning(f"⚠️ Análise salva, mas relacionamento com curso {course_code} não encontrado.")
-                                st.info(f"   Cursos encontrados: {[c.get('codigo_curso', c.get('curso_fk', 'N/A')) for c in analise_cursos]}")
-                        else:
-                            st.warning(f"⚠️ Análise salva, mas nenhum relacionamento com curso foi encontrado.")
-                            st.info(f"   Verifique os logs do console para mais detalhes.")
-                    except Exception as e:
-                        print(f"❌ Erro ao verificar relacionamento: {e}")
-                        st.warning(f"⚠️ Análise salva, mas não foi possível verificar o relacionamento com o curso.")
+                    # A resposta do upsert do vínculo já confirma o relacionamento (sem releitura);
+                    # banco local e fila de escritas gravam o vínculo junto com a análise
+                    if analise_result.get('curso_vinculado', True):
+                        st.success(f"✅ Relacionamento com curso {course_code} criado com sucesso!")
+                    else:
+                        st.warning(f"⚠️ Análise salva, mas relacionamento com curso {course_code} não foi criado.")
+                        st.info(f"   Verifique os logs do console para mais detalhes.")
                 else:
                     st.warning(f"⚠️ Análise salva, mas ID não foi retornado.")
             else:
@@ -1237,6 +1402,12 @@ else:
         professor_courses = database.get_professor_courses(st.session_state.user_data['prontuario'])
         st.session_state.professor_courses = professor_courses
     
+    # Índice de similaridade vive em memória: recarregar cursos e alunos já analisados
+    # uma vez por sessão, em segundo plano (documentos já indexados por outra sessão são mantidos)
+    if 'indice_similaridade_carregado' not in st.session_state:
+        similarity_index.load_in_background(database, st.session_state.user_data['prontuario'])
+        st.session_state.indice_similaridade_carregado = True
+    
     # Barra de navegação no topo
     logo_path = os.path.join(project_root, "images", "logo-nexus.png")
     
@@ -1310,6 +1481,16 @@ else:
     
     st.markdown("---")
     
+    # Gravações feitas durante uma queda de conexão: reaplicadas assim que o Supabase responde
+    fila_escritas = database.sync_pending_writes()
+    if fila_escritas and fila_escritas['pendentes']:
+        st.warning(
+            f"⏳ {fila_escritas['pendentes']} gravação(ões) aguardando conexão com o banco de dados "
+            f"(a mais antiga há {fila_escritas['atraso_segundos']:.0f}s). Elas serão enviadas automaticamente."
+        )
+    if fila_escritas and fila_escritas['falhas']:
+        st.error(f"❌ {fila_escritas['falhas']} gravação(ões) não puderam ser reaplicadas: {fila_escritas['ultimo_erro']}")
+    
     # ==================== PÁGINA: GERENCIAR CURSOS ====================
     if st.session_state.current_page == "gerenciar_cursos":
         st.markdown("## Gerenciamento de Cursos e Disciplinas")
@@ -1475,6 +1656,7 @@ else:
                                                     client.table("disciplinas").update({
                                                         'carga_horaria': nova_carga
                                                     }).eq('id_disciplina', disc['id_disciplina']).execute()
+                                                    database.invalidate_reference_cache("disciplinas", "disciplina", "curso_disciplinas")
                                                     st.success(f"Carga horária de {disc['nome']} atualizada para {nova_carga}h!")
                                                     st.rerun()
                                         except Exception as e:
@@ -1497,6 +1679,7 @@ else:
                                                         else:
                                                             # Tentar deletar sem ID
                                                             client.table("cursos_disciplina").delete().eq("curso_fk", curso['codigo_curso']).eq("disciplina_fk", disc['id_disciplina']).execute()
+                                                        database.invalidate_reference_cache("curso_disciplinas")
                                                     st.success(f"Disciplina {disc['nome']} removida do curso!")
                                                     st.rerun()
                                         except Exception as e:
@@ -1610,6 +1793,7 @@ else:
                                                             client.table("disciplinas").update({
                                                                 'carga_horaria': disc_data['carga_horaria']
                                                             }).eq('id_disciplina', disc_id).execute()
+                                                            database.invalidate_reference_cache("disciplinas", "disciplina", "curso_disciplinas")
                                                 except Exception as e:
                                                     st.warning(f"Não foi possível atualizar carga horária de {disc_data['nome']}: {str(e)}")
                                             
@@ -1744,6 +1928,12 @@ else:
             if ementas_data and len(ementas_data) > 0:
                 st.info(f"{len(ementas_data)} PDF(s) já carregado(s). Clique em 'Processar Análises' para analisar.")
         
+        ignorar_triagem = st.checkbox(
+            "Analisar mesmo com baixa afinidade",
+            key=f"ignorar_triagem_{course_code}",
+            help="Envia à IA também os PDFs que a triagem local considera pouco relacionados ao curso"
+        )
+        
         # Botão para processar análises
         col_btn1, col_btn2 = st.columns([1, 1])
         with col_btn1:
@@ -1775,9 +1965,12 @@ else:
                 ementas_com_analise_existente = []
                 ementas_sem_analise = []
                 
+                analises_existentes = database.find_existing_analises(
+                    [e['id_ementa'] for e in ementas_validas], course_code
+                )
                 for ementa_data in ementas_validas:
                     ementa_id = ementa_data.get('id_ementa')
-                    analise_existente = database.check_analise_exists_for_ementa_and_curso(ementa_id, course_code)
+                    analise_existente = analises_existentes.get(ementa_id)
                     if analise_existente:
                         ementas_com_analise_existente.append({
                             'ementa': ementa_data,
@@ -1827,33 +2020,62 @@ else:
                         for ementa_data in ementas_para_processar:
                             ementa_id = ementa_data.get('id_ementa')
                             
-                            # Se for reprocessar e já existe análise, deletar a antiga primeiro
-                            if reprocessar:
-                                analise_existente = database.check_analise_exists_for_ementa_and_curso(ementa_id, course_code)
-                                if analise_existente:
-                                    analise_id_antiga = analise_existente.get('analise_id')
-                                    if analise_id_antiga:
-                                        try:
-                                            database.delete_analise(analise_id_antiga, st.session_state.user_data['prontuario'])
-                                            st.info(f"🗑️ Análise anterior (ID: {analise_id_antiga}) removida para reprocessamento.")
-                                        except Exception as e:
-                                            st.warning(f"⚠️ Não foi possível remover análise anterior: {e}")
-                            
-                            # Processar análise
+                            # Processar análise (gravação em lote ao final)
                             analyses = process_analysis_with_ai(
                                 ementa_id, 
                                 course_code, 
-                                st.session_state.user_data['prontuario']
+                                st.session_state.user_data['prontuario'],
+                                salvar=False,
+                                ignorar_triagem=ignorar_triagem
                             )
                             if analyses and len(analyses) > 0:
                                 all_analyses.extend(analyses)
                                 valid_ementas += 1
                         
+                        # Salvar todas as análises e vínculos com o curso de uma vez
+                        pendentes = [a for a in all_analyses if a.get('analise_pendente')]
+                        if pendentes:
+                            criadas = database.create_analises_bulk(
+                                [a.pop('analise_pendente') for a in pendentes], course_code
+                            )
+                            ids_por_ementa = {c.get('ementa_fk'): c.get('analise_id') for c in criadas}
+                            for analise in pendentes:
+                                analise['analise_id'] = ids_por_ementa.get(analise['ementa_fk'])
+                            if criadas:
+                                st.success(f"✅ {len(criadas)} análise(s) salva(s) e vinculada(s) ao curso {course_code}")
+                                
+                                # Reprocessamento: remover as análises anteriores só depois que as novas
+                                # foram gravadas (se a gravação falhar, as antigas continuam no banco).
+                                # Id provisório (negativo): a nova análise ainda está só na fila de escritas
+                                # e pode falhar na reaplicação, então a anterior é mantida
+                                if reprocessar:
+                                    for ementa_id, analise_existente in analises_existentes.items():
+                                        analise_id_antiga = analise_existente.get('analise_id')
+                                        analise_id_nova = ids_por_ementa.get(ementa_id)
+                                        if not analise_id_antiga or not analise_id_nova:
+                                            continue
+                                        if analise_id_nova < 0:
+                                            st.info(f"ℹ️ Análise anterior (ID: {analise_id_antiga}) mantida: a nova aguarda "
+                                                    f"sincronização com o Supabase. Remova a anterior depois, se desejar.")
+                                            continue
+                                        try:
+                                            database.delete_analise(analise_id_antiga, st.session_state.user_data['prontuario'])
+                                            st.info(f"🗑️ Análise anterior (ID: {analise_id_antiga}) substituída pela nova análise.")
+                                        except Exception as e:
+                                            st.warning(f"⚠️ Não foi possível remover análise anterior: {e}")
+                            else:
+                                # Resultados da IA continuam visíveis (sem ID); análises anteriores foram mantidas
+                                st.error("❌ Falha ao salvar análises no banco de dados. Verifique os logs para mais detalhes.")
+                                if reprocessar:
+                                    st.info("ℹ️ As análises anteriores foram mantidas.")
+                                st.session_state.analyses_data = all_analyses
+                                valid_ementas = 0
+                        
                         if valid_ementas > 0:
                             st.success(f"✅ Análises processadas com sucesso. {valid_ementas} ementa(s) processada(s).")
                             st.session_state.analyses_data = all_analyses
                             st.rerun()
-                        else:
+                        elif not all_analyses:
                             st.error("❌ Nenhuma análise foi processada com sucesso.")
                 else:
                     st.info("✅ Nenhuma ementa para processar.")
@@ -1867,6 +2089,9 @@ else:
                 ementas_key = f'ementas_data_{course_code}'
                 if ementas_key in st.session_state:
                     del st.session_state[ementas_key]
+                # Limpar ledger de ingestão (próximos uploads voltam a ser processados)
+                if 'ingest_ledger' in st.session_state:
+                    del st.session_state['ingest_ledger']
                 # Incrementar contador para resetar o file_uploader
                 if 'uploader_counter' in st.session_state:
                     st.session_state.uploader_counter += 1
@@ -2502,9 +2727,17 @@ else:
         
         st.markdown("---")
         
+        # Disciplinas, primeira página do histórico e estatísticas por curso são
+        # independentes: carregadas de uma vez, com as consultas em paralelo
+        historico_limite_key = f"historico_limite_{course_code}"
+        historico_limite = st.session_state.setdefault(historico_limite_key, HISTORICO_PAGE_SIZE)
+        visao_curso = database.load_course_overview(
+            course_code, st.session_state.user_data['prontuario'], historico_limit=HISTORICO_PAGE_SIZE
+        )
+        
         # Seção: Disciplinas do Curso
         st.markdown("#### Disciplinas do Curso")
-        disciplinas_curso = database.get_curso_disciplines(course_code)
+        disciplinas_curso = visao_curso['disciplinas']
         
         if disciplinas_curso:
             # Criar DataFrame com as disciplinas
@@ -2557,17 +2790,90 @@ else:
         
         st.markdown("---")
         
+        # Seção: alunos já analisados que mais combinam com este curso (triagem local, sem IA)
+        st.markdown("#### Alunos Armazenados Mais Afins ao Curso")
+        if not similarity_index.has_course(course_code) and visao_curso.get('curso'):
+            similarity_index.add_course(visao_curso['curso'], disciplinas_curso)
+        alunos_afins = similarity_index.rank_students_for_course(
+            course_code, limite=10, professor_id=st.session_state.user_data['prontuario']
+        )
+        if similarity_index.is_loading(st.session_state.user_data['prontuario']):
+            st.caption("⏳ Índice ainda carregando as análises armazenadas: a lista pode estar incompleta.")
+        if alunos_afins:
+            st.caption("Afinidade estimada por similaridade de texto (TF-IDF) entre os históricos enviados e o curso.")
+            st.dataframe(
+                pd.DataFrame([
+                    {
+                        'Ementa': aluno['aluno_id'],
+                        'Aluno': aluno.get('nome_aluno') or 'Não identificado',
+                        'Afinidade': aluno['similaridade']
+                    }
+                    for aluno in alunos_afins
+                ]),
+                use_container_width=True,
+                hide_index=True
+            )
+        else:
+            st.info("Nenhum histórico indexado ainda para comparar com este curso.")
+        
+        st.markdown("---")
+        
         # Seção: Dashboard e Histórico completo do curso
         st.markdown("### Dashboard de Análises")
         st.markdown(f"**Curso:** {curso_info['nome']} ({course_code})")
         
-        # Buscar todas as análises do curso selecionado feitas pelo professor logado (histórico)
-        historico_analyses = database.get_analises_by_curso_and_professor_usando_relacionamento(course_code, st.session_state.user_data['prontuario'])
+        # Busca por aluno, disciplina ou trecho da análise (índice de texto no banco, sem acentos)
+        termo_busca = st.text_input(
+            "🔎 Buscar análises",
+            key=f"busca_analises_{course_code}",
+            placeholder="Nome do aluno, disciplina ou trecho da análise"
+        )
+        if termo_busca.strip():
+            resultados_busca = database.search_analises(
+                st.session_state.user_data['prontuario'], termo_busca, curso_codigo=course_code
+            )
+            if resultados_busca:
+                df_busca = pd.DataFrame(resultados_busca)
+                df_busca['status'] = df_busca['adequado'].map({True: '✅ Adequado', False: '❌ Não Adequado'})
+                df_busca_display = df_busca[['analise_id', 'nome_aluno', 'score', 'status', 'relevancia']].copy()
+                df_busca_display.columns = ['ID', 'Aluno', 'Score', 'Status', 'Relevância']
+                st.dataframe(df_busca_display, use_container_width=True, hide_index=True)
+            else:
+                st.info(f"Nenhuma análise encontrada para \"{termo_busca}\".")
+        
+        # Buscar o histórico do curso feito pelo professor logado, página a página
+        # (keyset + apenas colunas da listagem; textos completos só ao abrir uma análise)
+        historico_analyses = list(visao_curso['historico']['analises'])
+        historico_cursor = visao_curso['historico']['proximo_cursor']
+        while historico_cursor and len(historico_analyses) < historico_limite:
+            pagina = database.list_analises_curso_professor(
+                course_code, st.session_state.user_data['prontuario'],
+                limit=min(HISTORICO_PAGE_SIZE, historico_limite - len(historico_analyses)),
+                cursor=historico_cursor
+            )
+            historico_analyses.extend(pagina['analises'])
+            historico_cursor = pagina['proximo_cursor']
+        
+        if historico_cursor:
+            col_info_hist, col_mais_hist = st.columns([3, 1])
+            with col_info_hist:
+                total_curso = (visao_curso.get('painel') or {}).get('total_analises')
+                st.caption(f"Exibindo as {len(historico_analyses)} análises mais recentes deste curso"
+                           + (f" (de {total_curso})." if total_curso else "."))
+            with col_mais_hist:
+                if st.button("Carregar mais análises", key=f"carregar_mais_{course_code}", use_container_width=True):
+                    st.session_state[historico_limite_key] = historico_limite + HISTORICO_PAGE_SIZE
+                    st.rerun()
         
         if historico_analyses:
             # Criar DataFrame com histórico
             df_historico = pd.DataFrame(historico_analyses)
             
+            # Indicadores de todas as análises do curso, mantidos no banco a cada
+            # análise criada/removida (sem os agregados, calculados sobre o histórico carregado)
+            painel = visao_curso.get('painel') or summarize_historico(df_historico)
+            total_painel = painel['total_analises']
+            
             # ==================== DASHBOARD COM GRÁFICOS ====================
             st.markdown("#### Visão Geral do Curso")
             
@@ -2575,24 +2881,22 @@ else:
             col1, col2, col3, col4, col5 = st.columns(5)
             
             with col1:
-                st.metric("Total de Análises", len(historico_analyses))
+                st.metric("Total de Análises", total_painel)
             
             with col2:
-                adequados_historico = len(df_historico[df_historico['adequado'] == True])
-                taxa_adequacao = (adequados_historico / len(historico_analyses) * 100) if len(historico_analyses) > 0 else 0
+                adequados_historico = painel['adequadas']
+                taxa_adequacao = (adequados_historico / total_painel * 100) if total_painel > 0 else 0
                 st.metric("Adequados", f"{adequados_historico} ({taxa_adequacao:.0f}%)")
             
             with col3:
-                nao_adequados = len(historico_analyses) - adequados_historico
+                nao_adequados = painel['inadequadas']
                 st.metric("Não Adequados", nao_adequados)
             
             with col4:
-                score_medio_historico = df_historico['score'].mean()
-                st.metric("Score Médio", f"{score_medio_historico:.1f}/100")
+                st.metric("Score Médio", f"{painel['media_score']:.1f}/100")
             
             with col5:
-                score_max_historico = df_historico['score'].max()
-                st.metric("Score Máximo", f"{score_max_historico}/100")
+                st.metric("Score Máximo", f"{painel['score_maximo']}/100")
             
             st.markdown("---")
             
@@ -2618,12 +2922,12 @@ else:
                 st.plotly_chart(fig_pie, use_container_width=True)
             
             with col2:
-                # Histograma de Distribuição de Scores
+                # Histograma de Distribuição de Scores (faixas de 10 pontos já contadas no banco)
                 st.markdown("##### Distribuição de Scores")
-                fig_hist = px.histogram(
-                    df_historico,
-                    x='score',
-                    nbins=10,
+                faixas_score = [f"{10 * faixa}-{10 * faixa + 9}" for faixa in range(9)] + ["90-100"]
+                fig_hist = px.bar(
+                    x=faixas_score,
+                    y=painel['histograma'],
                     color_discrete_sequence=['#007bff']
                 )
                 fig_hist.update_layout(
@@ -2659,6 +2963,8 @@ else:
             with col1:
                 # Linha Temporal de Scores (se houver data)
                 st.markdown("##### Evolução Temporal")
+                if historico_cursor:
+                    st.caption(f"Últimas {len(historico_analyses)} análises carregadas")
                 if 'created_at' in df_historico.columns:
                     # Converter created_at para datetime
                     df_historico['data'] = pd.to_datetime(df_historico['created_at'])
@@ -2708,6 +3014,8 @@ else:
             with col2:
                 # Tabela de Top 10 Melhores Alunos
                 st.markdown("##### Top 10 Melhores Scores")
+                if historico_cursor:
+                    st.caption(f"Entre as {len(historico_analyses)} análises carregadas")
                 top_alunos = df_historico.nlargest(10, 'score')[['nome_aluno', 'score', 'adequado']].copy()
                 top_alunos['Posição'] = range(1, len(top_alunos) + 1)
                 top_alunos['Status'] = top_alunos['adequado'].apply(lambda x: 'Adequado' if x else 'Não Adequado')
@@ -2733,25 +3041,24 @@ else:
             col1, col2, col3, col4 = st.columns(4)
             
             with col1:
-                st.metric("Score Mínimo", f"{df_historico['score'].min()}/100")
+                st.metric("Score Mínimo", f"{painel['score_minimo']}/100")
                 st.metric("Mediana", f"{df_historico['score'].median():.1f}/100")
             
             with col2:
-                desvio_padrao = df_historico['score'].std()
-                st.metric("Desvio Padrão", f"{desvio_padrao:.2f}")
+                st.metric("Desvio Padrão", f"{painel['desvio_padrao']:.2f}")
                 q1 = df_historico['score'].quantile(0.25)
                 st.metric("1º Quartil", f"{q1:.1f}/100")
             
             with col3:
                 q3 = df_historico['score'].quantile(0.75)
                 st.metric("3º Quartil", f"{q3:.1f}/100")
-                scores_acima_70 = len(df_historico[df_historico['score'] >= 70])
-                st.metric("Scores ≥ 70", f"{scores_acima_70} ({scores_acima_70/len(df_historico)*100:.0f}%)")
+                scores_acima_70 = painel['scores_acima_70']
+                st.metric("Scores ≥ 70", f"{scores_acima_70} ({scores_acima_70/total_painel*100:.0f}%)")
             
             with col4:
-                scores_abaixo_50 = len(df_historico[df_historico['score'] < 50])
-                st.metric("Scores < 50", f"{scores_abaixo_50} ({scores_abaixo_50/len(df_historico)*100:.0f}%)")
-                amplitude = df_historico['score'].max() - df_historico['score'].min()
+                scores_abaixo_50 = painel['scores_abaixo_50']
+                st.metric("Scores < 50", f"{scores_abaixo_50} ({scores_abaixo_50/total_painel*100:.0f}%)")
+                amplitude = painel['score_maximo'] - painel['score_minimo']
                 st.metric("Amplitude", f"{amplitude}")
             
             st.markdown("---")
@@ -3244,28 +3551,30 @@ else:
             # Seção: Histórico de Análises do Professor (separado das análises recém-processadas)
             if historico_analyses and len(historico_analyses) > 0:
                 st.markdown("### Histórico de Análises do Professor")
-                st.info(f"Você possui {len(historico_analyses)} análise(s) histórica(s) para este curso.")
+                # Totais de todas as análises do curso (painel agregado no banco); a tabela
+                # abaixo contém apenas as páginas do histórico já carregadas
+                mensagem_historico = f"Você possui {total_painel} análise(s) histórica(s) para este curso."
+                if len(historico_analyses) < total_painel:
+                    mensagem_historico += f" A tabela exibe as {len(historico_analyses)} mais recentes."
+                st.info(mensagem_historico)
                 
-                # Criar DataFrame com análises históricas
+                # Criar DataFrame com análises históricas (páginas carregadas)
                 df_historico_professor = pd.DataFrame(historico_analyses)
                 
                 # Estatísticas do histórico do professor
                 col1, col2, col3, col4 = st.columns(4)
                 
                 with col1:
-                    st.metric("Total Histórico", len(historico_analyses))
+                    st.metric("Total Histórico", total_painel)
                 
                 with col2:
-                    adequados_historico = len(df_historico_professor[df_historico_professor['adequado'] == True])
-                    st.metric("Adequadas", adequados_historico)
+                    st.metric("Adequadas", painel['adequadas'])
                 
                 with col3:
-                    score_medio_historico = df_historico_professor['score'].mean()
-                    st.metric("Score Médio", f"{score_medio_historico:.1f}")
+                    st.metric("Score Médio", f"{painel['media_score']:.1f}")
                 
                 with col4:
-                    score_max_historico = df_historico_professor['score'].max()
-                    st.metric("Score Máximo", score_max_historico)
+                    st.metric("Score Máximo", painel['score_maximo'])
                 
                 # Tabela do histórico do professor
                 st.markdown("#### Tabela do Histórico")
@@ -3298,11 +3607,11 @@ else:
             
             # Seção: Estatísticas por Curso
             st.markdown("### Estatísticas por Curso")
-            estatisticas_cursos = database.get_estatisticas_por_curso_do_professor(st.session_state.user_data['prontuario'])
+            estatisticas_cursos = visao_curso['estatisticas']
             
             if estatisticas_cursos:
                 # Criar DataFrame com estatísticas
-                df_estatisticas = pd.DataFrame(estatisticas_cursos)
+                df_estatisticas = pd.DataFrame(estatisticas_cursos).drop(columns=['descricao_curso'], errors='ignore')
                 
                 # Configurar tabela de estatísticas
                 gb_estatisticas = GridOptionsBuilder.from_dataframe(df_estatisticas)
@@ -3340,11 +3649,10 @@ else:
                 col1, col2, col3, col4 = st.columns(4)
                 
                 with col1:
-                    st.metric("Total Histórico", len(historico_analyses))
+                    st.metric("Total Histórico", total_painel)
                 
                 with col2:
-                    adequados_historico = len(df_historico[df_historico['adequado'] == True])
-                    st.metric("Adequados", adequados_historico)
+                    st.metric("Adequados", painel['adequadas'])
                 
                 with col3:
                     score_medio_historico = df_historico['score'].mean()
@@ -0,0 +1,36 @@
+"""
+Artefatos de análise (dados estruturados) comprimidos e endereçados por conteúdo
+
+Os dados estruturados da extração (incluindo o texto completo do PDF) ficam
+fora da linha de `analises`, na tabela `artefatos_analise`, comprimidos com
+gzip e identificados pelo SHA-256 do JSON canônico. Análises com o mesmo
+conteúdo compartilham o mesmo artefato.
+"""
+import base64
+import gzip
+import hashlib
+import json
+from typing import Dict, Tuple
+
+
+def canonical_json(data: Dict) -> str:
+    """JSON determinístico (chaves ordenadas), base do hash de conteúdo"""
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def pack_structured_data(data: Dict) -> Tuple[str, str, int]:
+    """
+    Comprime dados estruturados para armazenamento
+
+    Returns:
+        Tuple[str, str, int]: (hash SHA-256, conteúdo gzip em base64, tamanho original em bytes)
+    """
+    raw = canonical_json(data).encode("utf-8")
+    content_hash = hashlib.sha256(raw).hexdigest()
+    encoded = base64.b64encode(gzip.compress(raw, compresslevel=6)).decode("ascii")
+    return content_hash, encoded, len(raw)
+
+
+def unpack_structured_data(encoded: str) -> Dict:
+    """Descomprime o conteúdo gerado por pack_structured_data"""
+    return json.loads(gzip.decompress(base64.b64decode(encoded)).decode("utf-8"))
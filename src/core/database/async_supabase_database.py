@@ -0,0 +1,125 @@
+"""
+Fachada assíncrona do Supabase com pool de conexões HTTP compartilhado
+
+Os clientes síncronos do supabase-py fazem uma requisição por vez. Aqui os
+clientes PostgREST assíncronos (anon e service role) usam um único
+httpx.AsyncClient com keep-alive, e um loop de eventos em thread própria
+permite que o código síncrono (Streamlit) dispare várias consultas
+independentes ao mesmo tempo e espere por todas.
+"""
+import asyncio
+import os
+import threading
+from typing import Any, Awaitable, Dict, Optional
+
+import httpx
+from postgrest import AsyncPostgrestClient
+
+from core.config.supabase_config import supabase_config
+
+
+class AsyncSupabaseDatabase:
+    """Clientes PostgREST assíncronos sobre um pool HTTP com keep-alive"""
+
+    def __init__(self, url: str, anon_key: str, service_role_key: Optional[str] = None,
+                 max_connections: int = 20, max_keepalive_connections: int = 10,
+                 keepalive_expiry: float = 30.0, timeout: float = 30.0):
+        """
+        Inicializa a fachada
+
+        Args:
+            url: URL do projeto Supabase
+            anon_key: Chave anon
+            service_role_key: Chave service role (opcional)
+            max_connections: Conexões simultâneas no pool (excedentes aguardam na fila)
+            max_keepalive_connections: Conexões ociosas mantidas abertas para reuso
+            keepalive_expiry: Tempo (s) que uma conexão ociosa fica no pool
+            timeout: Tempo máximo (s) de cada requisição
+        """
+        # Loop de eventos dedicado: o Streamlit roda o script de forma síncrona
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="supabase-async", daemon=True)
+        self._thread.start()
+
+        self.http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry
+            ),
+            timeout=timeout,
+            follow_redirects=True
+        )
+        self.rest_url = f"{url.rstrip('/')}/rest/v1"
+        self.client = self._create_client(anon_key) if anon_key else None
+        self.service_client = self._create_client(service_role_key) if service_role_key else None
+
+    def _create_client(self, key: str) -> AsyncPostgrestClient:
+        headers = {
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+            "apikey": key,
+            "Authorization": f"Bearer {key}"
+        }
+        # As requisições usam URL absoluta e os headers do cliente: o mesmo
+        # httpx.AsyncClient atende anon e service role
+        return AsyncPostgrestClient(self.rest_url, headers=headers, http_client=self.http)
+
+    def get_client(self, prefer_service_role: bool = False) -> Optional[AsyncPostgrestClient]:
+        """Retorna o cliente apropriado (service_client se preferido e disponível, senão client)"""
+        if prefer_service_role and self.service_client:
+            return self.service_client
+        return self.client if self.client else self.service_client
+
+    # ==================== EXECUÇÃO ====================
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """Executa uma corrotina no loop da fachada e aguarda o resultado (uso em código síncrono)"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    async def gather(self, consultas: Dict[str, Awaitable]) -> Dict[str, Any]:
+        """
+        Aguarda consultas independentes em paralelo
+
+        Returns:
+            Dict[str, Any]: nome -> resultado; uma consulta que falha devolve a
+            exceção no lugar do resultado, sem cancelar as demais
+        """
+        resultados = await asyncio.gather(*consultas.values(), return_exceptions=True)
+        return dict(zip(consultas.keys(), resultados))
+
+    def run_concurrently(self, consultas: Dict[str, Awaitable], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Versão síncrona de gather()"""
+        return self.run(self.gather(consultas), timeout)
+
+    async def fetch(self, query) -> Any:
+        """Executa uma requisição montada (select, rpc...) e devolve os dados da resposta"""
+        response = await query.execute()
+        return response.data
+
+    def close(self):
+        """Fecha as conexões do pool e encerra o loop"""
+        try:
+            self.run(self.http.aclose(), timeout=5)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def create_async_supabase_database() -> Optional[AsyncSupabaseDatabase]:
+    """Factory function para criar a fachada assíncrona (None em modo offline)"""
+    if supabase_config.offline_mode:
+        return None
+    try:
+        return AsyncSupabaseDatabase(
+            supabase_config.url,
+            supabase_config.anon_key,
+            supabase_config.service_role_key,
+            max_connections=int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+        )
+    except Exception as e:
+        print(f"⚠️ Erro ao inicializar cliente assíncrono do Supabase: {e}")
+        return None
+
+
+# Instância global: um único pool de conexões para todas as sessões do Streamlit
+async_database = create_async_supabase_database()
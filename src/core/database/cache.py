@@ -0,0 +1,107 @@
+"""
+Cache de leitura (read-through) para dados de referência
+
+Cursos, disciplinas e vínculos professor-curso quase nunca mudam, mas eram
+buscados de novo a cada rerun do Streamlit. O cache é um objeto de módulo,
+portanto compartilhado entre todas as sessões do mesmo processo; as escritas
+feitas pelo SupabaseDatabase invalidam os namespaces afetados.
+"""
+import copy
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class TTLCache:
+    """Cache em memória com expiração por tempo, seguro para múltiplas threads"""
+
+    def __init__(self, ttl_seconds: float = 300.0, max_entries: int = 5000):
+        """
+        Inicializa o cache
+
+        Args:
+            ttl_seconds: Tempo de vida de cada entrada (0 desativa o cache)
+            max_entries: Limite de entradas; ao atingir, as mais antigas são descartadas
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.RLock()
+        # (namespace, chave) -> (expira_em, valor)
+        self._entries: Dict[Tuple[str, Hashable], Tuple[float, Any]] = {}
+        self._hits = 0
+        self._misses = 0
+
+    def get_or_load(self, namespace: str, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Retorna o valor em cache ou chama `loader` e armazena o resultado
+
+        Resultados vazios (None, []) não são armazenados, para não esconder
+        falhas transitórias de conexão. O valor devolvido é sempre uma cópia.
+        """
+        if self.ttl_seconds <= 0:
+            return loader()
+
+        value = self.lookup(namespace, key)
+        if value is not None:
+            return value
+
+        value = loader()
+        self.store(namespace, key, value)
+        return value
+
+    def lookup(self, namespace: str, key: Hashable) -> Any:
+        """Cópia do valor em cache, ou None se ausente/expirado (conta acerto ou falha)"""
+        if self.ttl_seconds <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry and entry[0] > time.monotonic():
+                self._hits += 1
+                return copy.deepcopy(entry[1])
+            self._misses += 1
+            return None
+
+    def store(self, namespace: str, key: Hashable, value: Any):
+        """Armazena um valor carregado fora de get_or_load (vazios são ignorados)"""
+        if self.ttl_seconds <= 0 or not value:
+            return
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._evict_oldest()
+            self._entries[(namespace, key)] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(value))
+
+    def invalidate(self, *namespaces: str):
+        """Remove as entradas dos namespaces informados (sem argumentos, limpa tudo)"""
+        with self._lock:
+            if not namespaces:
+                self._entries.clear()
+                return
+            for entry_key in [k for k in self._entries if k[0] in namespaces]:
+                del self._entries[entry_key]
+
+    def _evict_oldest(self):
+        oldest = sorted(self._entries.items(), key=lambda item: item[1][0])
+        for entry_key, _ in oldest[:max(1, len(oldest) // 10)]:
+            del self._entries[entry_key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de uso: acertos, falhas, taxa de acerto e entradas"""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / total, 4) if total else 0.0,
+                'entries': len(self._entries),
+                'ttl_seconds': self.ttl_seconds
+            }
+
+
+def create_reference_cache() -> TTLCache:
+    """Factory function para criar o cache de dados de referência"""
+    return TTLCache(ttl_seconds=float(os.getenv("REFERENCE_CACHE_TTL", "300")))
+
+
+# Instância global compartilhada entre sessões do Streamlit
+reference_cache = create_reference_cache()
@@ -606,56 +606,48 @@ class AnalyseDatabase(TinyDB):
         
         return len(result) > 0
     
-    def cleanup_orphaned_data(self) -> Dict[str, int]:
+    def cleanup_orphaned_data(self, dry_run: bool = False) -> Dict:
         """
         Limpa dados órfãos (sem relacionamentos válidos)
         
+        Anti-joins por conjunto: uma leitura por tabela para coletar as
+        referências e um único remove por tabela.
+        
+        Args:
+            dry_run: Apenas relata o que seria removido, sem remover
+        
         Returns:
-            Dict com contagem de registros removidos por tabela
+            Dict com contagem de registros removidos por tabela e os IDs em 'ids'
         """
-        cleanup_stats = {
-            'disciplinas_removidas': 0,
-            'tags_removidas': 0,
-            'ementas_removidas': 0
+        # Disciplinas sem curso
+        disciplinas_com_curso = {rel.get('disciplina_fk') for rel in self.cursos_disciplina.all()}
+        disciplinas_orfas = [d for d in self.disciplinas.all() if d.get('id_disciplina') not in disciplinas_com_curso]
+        
+        # Tags sem curso
+        tags_com_curso = {rel.get('tag_fk') for rel in self.curso_tags.all()}
+        tags_orfas = [t for t in self.tags.all() if t.get('id_tag') not in tags_com_curso]
+        
+        # Ementas sem disciplinas e sem análises
+        ementas_referenciadas = (
+            {rel.get('ementa_fk') for rel in self.ementa_disciplina.all()}
+            | {a.get('ementa_fk') for a in self.analise.all()}
+        )
+        ementas_orfas = [e for e in self.ementa.all() if e.get('id_ementa') not in ementas_referenciadas]
+        
+        if not dry_run:
+            for tabela, orfaos in ((self.disciplinas, disciplinas_orfas), (self.tags, tags_orfas),
+                                   (self.ementa, ementas_orfas)):
+                if orfaos:
+                    tabela.remove(doc_ids=[doc.doc_id for doc in orfaos])
+        
+        return {
+            'disciplinas_removidas': len(disciplinas_orfas),
+            'tags_removidas': len(tags_orfas),
+            'ementas_removidas': len(ementas_orfas),
+            'dry_run': dry_run,
+            'ids': {
+                'disciplinas': [d.get('id_disciplina') for d in disciplinas_orfas],
+                'tags': [t.get('id_tag') for t in tags_orfas],
+                'ementas': [e.get('id_ementa') for e in ementas_orfas]
+            }
         }
-        
-        # Remover disciplinas sem curso
-        disciplina = Query()
-        curso_disciplina = Query()
-        all_disciplinas = self.disciplinas.all()
-        
-        for disciplina_data in all_disciplinas:
-            disciplina_id = disciplina_data['id_disciplina']
-            has_curso = self.cursos_disciplina.search(curso_disciplina.disciplina_fk == disciplina_id)
-            
-            if not has_curso:
-                self.disciplinas.remove(disciplina.id_disciplina == disciplina_id)
-                cleanup_stats['disciplinas_removidas'] += 1
-        
-        # Remover tags sem curso
-        tag = Query()
-        curso_tags = Query()
-        all_tags = self.tags.all()
-        
-        for tag_data in all_tags:
-            tag_id = tag_data['id_tag']
-            has_curso = self.curso_tags.search(curso_tags.tag_fk == tag_id)
-            
-            if not has_curso:
-                self.tags.remove(tag.id_tag == tag_id)
-                cleanup_stats['tags_removidas'] += 1
-        
-        # Remover ementas sem disciplinas
-        ementa = Query()
-        ementa_disciplina = Query()
-        all_ementas = self.ementa.all()
-        
-        for ementa_data in all_ementas:
-            ementa_id = ementa_data['id_ementa']
-            has_disciplina = self.ementa_disciplina.search(ementa_disciplina.ementa_fk == ementa_id)
-            
-            if not has_disciplina:
-                self.ementa.remove(ementa.id_ementa == ementa_id)
-                cleanup_stats['ementas_removidas'] += 1
-        
-        return cleanup_stats
@@ -1,94 +1,135 @@
 """
 Sistema de banco de dados com arquivos separados para cada tabela
 """
-from tinydb import TinyDB, Query
+from tinydb import Query
 from typing import List, Dict, Optional
+from contextlib import ExitStack, contextmanager
 from datetime import datetime
 import os
 
+from core.database.indexed_tinydb import IndexedTinyDB
+from core.database.tinydb_storage import shared_write_behind_storage
+from core.utils.text_normalization import fold_accents
+
+# Campos com índice hash em memória (PKs e FKs), por arquivo de tabela
+CAMPOS_INDEXADOS = {
+    'professores.json': ('prontuario', 'email_educacional'),
+    'cursos.json': ('codigo_curso',),
+    'disciplinas.json': ('id_disciplina',),
+    'tags.json': ('id_tag',),
+    'ementas.json': ('id_ementa', 'drive_id', 'hash_conteudo'),
+    'analises.json': ('analise_id', 'ementa_fk', 'prontuario_professor', 'curso_fk'),
+    'professor_curso.json': ('prontuario_professor', 'curso_fk'),
+    'curso_tags.json': ('curso_fk', 'tag_fk'),
+    'cursos_disciplina.json': ('curso_fk', 'disciplina_fk'),
+    'ementa_disciplina.json': ('ementa_fk', 'disciplina_fk'),
+}
+
 class AnalyseDatabaseSeparado:
-    def __init__(self, dados_dir='src/data/database'):
+    def __init__(self, dados_dir='src/data/database', flush_interval: float = 1.0, max_pending_writes: int = 100):
+        """
+        Args:
+            dados_dir: Diretório dos arquivos JSON
+            flush_interval: Segundos até gravar escritas pendentes (write-behind)
+            max_pending_writes: Escritas acumuladas que forçam a gravação
+        """
         self.dados_dir = dados_dir
+        self.flush_interval = flush_interval
+        self.max_pending_writes = max_pending_writes
         
         # Criar diretório se não existir
         if not os.path.exists(dados_dir):
             os.makedirs(dados_dir)
         
         # Inicializar cada tabela com seu próprio arquivo
-        self.professor = TinyDB(os.path.join(dados_dir, 'professores.json'))
-        self.cursos = TinyDB(os.path.join(dados_dir, 'cursos.json'))
-        self.disciplinas = TinyDB(os.path.join(dados_dir, 'disciplinas.json'))
-        self.tags = TinyDB(os.path.join(dados_dir, 'tags.json'))
-        self.ementa = TinyDB(os.path.join(dados_dir, 'ementas.json'))
-        self.analise = TinyDB(os.path.join(dados_dir, 'analises.json'))
+        self.professor = self._open_table('professores.json')
+        self.cursos = self._open_table('cursos.json')
+        self.disciplinas = self._open_table('disciplinas.json')
+        self.tags = self._open_table('tags.json')
+        self.ementa = self._open_table('ementas.json')
+        self.analise = self._open_table('analises.json')
         
         # Tabelas de relacionamento
-        self.professor_curso = TinyDB(os.path.join(dados_dir, 'professor_curso.json'))
-        self.curso_tags = TinyDB(os.path.join(dados_dir, 'curso_tags.json'))
-        self.cursos_disciplina = TinyDB(os.path.join(dados_dir, 'cursos_disciplina.json'))
-        self.ementa_disciplina = TinyDB(os.path.join(dados_dir, 'ementa_disciplina.json'))
+        self.professor_curso = self._open_table('professor_curso.json')
+        self.curso_tags = self._open_table('curso_tags.json')
+        self.cursos_disciplina = self._open_table('cursos_disciplina.json')
+        self.ementa_disciplina = self._open_table('ementa_disciplina.json')
+    
+    def _open_table(self, arquivo: str) -> IndexedTinyDB:
+        """Abre o arquivo da tabela com índices nos campos de CAMPOS_INDEXADOS e escrita adiada"""
+        return IndexedTinyDB(
+            os.path.join(self.dados_dir, arquivo),
+            storage=shared_write_behind_storage,
+            flush_interval=self.flush_interval,
+            max_pending_writes=self.max_pending_writes,
+            indexed_fields=CAMPOS_INDEXADOS[arquivo]
+        )
+    
+    def _all_tables(self) -> List[IndexedTinyDB]:
+        return [
+            self.professor, self.cursos, self.disciplinas, self.tags, self.ementa, self.analise,
+            self.professor_curso, self.curso_tags, self.cursos_disciplina, self.ementa_disciplina
+        ]
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Agrupa as escritas do bloco: cada arquivo é regravado uma única vez ao final
+        
+        Se o bloco levantar exceção, as alterações feitas nele são descartadas
+        (arquivo por arquivo; não há atomicidade entre arquivos diferentes).
+        """
+        with ExitStack() as stack:
+            for tabela in self._all_tables():
+                stack.enter_context(tabela.storage.transaction())
+            yield self
+    
+    def flush(self):
+        """Grava imediatamente as escritas pendentes de todas as tabelas"""
+        for tabela in self._all_tables():
+            tabela.storage.flush()
     
     # ==================== AUTENTICAÇÃO E LOGIN ====================
     
     def get_professor_by_email(self, email_educacional: str) -> Optional[Dict]:
         """Busca professor por email educacional para autenticação"""
-        professor = Query()
-        result = self.professor.search(professor.email_educacional == email_educacional)
-        return result[0] if result else None
+        return self.professor.get_by('email_educacional', email_educacional)
     
     def get_professor(self, prontuario: str) -> Optional[Dict]:
         """Busca professor por prontuário"""
-        professor = Query()
-        result = self.professor.search(professor.prontuario == prontuario)
-        return result[0] if result else None
+        return self.professor.get_by('prontuario', prontuario)
     
     def authenticate_professor(self, email_educacional: str, senha: str) -> Optional[Dict]:
         """Autentica professor por email e senha"""
-        professor = Query()
-        result = self.professor.search(
-            (professor.email_educacional == email_educacional) & 
-            (professor.senha == senha)
-        )
+        result = [
+            professor for professor in self.professor.search_by('email_educacional', email_educacional)
+            if professor.get('senha') == senha
+        ]
         return result[0] if result else None
     
     def verify_email_exists(self, email_educacional: str) -> bool:
         """Verifica se email já existe para cadastro"""
-        professor = Query()
-        result = self.professor.search(professor.email_educacional == email_educacional)
-        return len(result) > 0
+        return self.professor.get_by('email_educacional', email_educacional) is not None
     
     def verify_prontuario_exists(self, prontuario: str) -> bool:
         """Verifica se prontuário já existe para cadastro"""
-        professor = Query()
-        result = self.professor.search(professor.prontuario == prontuario)
-        return len(result) > 0
+        return self.professor.get_by('prontuario', prontuario) is not None
     
     # ==================== CONFIGURAÇÕES DE PERFIL ====================
     
     def get_professor_profile(self, prontuario: str) -> Optional[Dict]:
         """Busca dados completos do perfil do professor"""
-        professor = Query()
-        professor_data = self.professor.search(professor.prontuario == prontuario)
+        professor_data = self.get_professor(prontuario)
         if not professor_data:
             return None
         
         # Buscar cursos associados ao professor
-        professor_curso = Query()
-        cursos_ids = self.professor_curso.search(professor_curso.prontuario_professor == prontuario)
-        
-        cursos = []
-        for curso_rel in cursos_ids:
-            curso_data = self.get_curso_by_codigo(curso_rel['curso_fk'])
-            if curso_data:
-                cursos.append(curso_data)
-        
-        professor_data[0]['cursos'] = cursos
-        return professor_data[0]
+        professor_data['cursos'] = self.get_professor_courses(prontuario)
+        return professor_data
     
     def get_professor_courses(self, prontuario: str) -> List[Dict]:
         """Busca todos os cursos associados ao professor"""
-        professor_curso = Query()
-        cursos_ids = self.professor_curso.search(professor_curso.prontuario_professor == prontuario)
+        cursos_ids = self.professor_curso.search_by('prontuario_professor', prontuario)
         
         cursos = []
         for curso_rel in cursos_ids:
@@ -106,10 +147,7 @@ class AnalyseDatabaseSeparado:
         disciplinas = []
         for curso in cursos_professor:
             # Para cada curso, busca as disciplinas
-            curso_disciplina = Query()
-            disciplina_ids = self.cursos_disciplina.search(
-                curso_disciplina.curso_fk == curso['codigo_curso']
-            )
+            disciplina_ids = self.cursos_disciplina.search_by('curso_fk', curso['codigo_curso'])
             
             for disc_rel in disciplina_ids:
                 disciplina_data = self.get_disciplina_by_id(disc_rel['disciplina_fk'])
@@ -123,9 +161,7 @@ class AnalyseDatabaseSeparado:
     
     def get_curso_by_codigo(self, codigo_curso: str) -> Optional[Dict]:
         """Busca curso por código"""
-        curso = Query()
-        result = self.cursos.search(curso.codigo_curso == codigo_curso)
-        return result[0] if result else None
+        return self.cursos.get_by('codigo_curso', codigo_curso)
     
     def get_all_cursos(self) -> List[Dict]:
         """Busca todos os cursos cadastrados"""
@@ -133,10 +169,7 @@ class AnalyseDatabaseSeparado:
     
     def get_curso_disciplines(self, codigo_curso: str) -> List[Dict]:
         """Busca todas as disciplinas de um curso"""
-        curso_disciplina = Query()
-        disciplina_ids = self.cursos_disciplina.search(
-            curso_disciplina.curso_fk == codigo_curso
-        )
+        disciplina_ids = self.cursos_disciplina.search_by('curso_fk', codigo_curso)
         
         disciplinas = []
         for disc_rel in disciplina_ids:
@@ -148,9 +181,7 @@ class AnalyseDatabaseSeparado:
     
     def get_disciplina_by_id(self, id_disciplina: str) -> Optional[Dict]:
         """Busca disciplina por ID"""
-        disciplina = Query()
-        result = self.disciplinas.search(disciplina.id_disciplina == id_disciplina)
-        return result[0] if result else None
+        return self.disciplinas.get_by('id_disciplina', id_disciplina)
     
     def get_all_disciplinas(self) -> List[Dict]:
         """Busca todas as disciplinas cadastradas"""
@@ -158,8 +189,7 @@ class AnalyseDatabaseSeparado:
     
     def get_curso_tags(self, codigo_curso: str) -> List[Dict]:
         """Busca todas as tags de um curso"""
-        curso_tags = Query()
-        tag_ids = self.curso_tags.search(curso_tags.curso_fk == codigo_curso)
+        tag_ids = self.curso_tags.search_by('curso_fk', codigo_curso)
         
         tags = []
         for tag_rel in tag_ids:
@@ -171,9 +201,7 @@ class AnalyseDatabaseSeparado:
     
     def get_tag_by_id(self, id_tag: int) -> Optional[Dict]:
         """Busca tag por ID"""
-        tag = Query()
-        result = self.tags.search(tag.id_tag == id_tag)
-        return result[0] if result else None
+        return self.tags.get_by('id_tag', id_tag)
     
     def get_all_tags(self) -> List[Dict]:
         """Busca todas as tags cadastradas"""
@@ -183,22 +211,22 @@ class AnalyseDatabaseSeparado:
     
     def get_ementa_by_id(self, id_ementa: int) -> Optional[Dict]:
         """Busca ementa por ID"""
-        ementa = Query()
-        result = self.ementa.search(ementa.id_ementa == id_ementa)
-        return result[0] if result else None
+        return self.ementa.get_by('id_ementa', id_ementa)
     
     def get_ementa_by_drive_id(self, drive_id: str) -> Optional[Dict]:
         """Busca ementa por drive_id"""
-        ementa = Query()
-        result = self.ementa.search(ementa.drive_id == drive_id)
+        return self.ementa.get_by('drive_id', drive_id)
+
+    def get_ementa_by_hash(self, hash_conteudo: str, professor_id: str = None) -> Optional[Dict]:
+        """Busca ementa pelo SHA256 do conteúdo do PDF"""
+        result = self.ementa.search_by('hash_conteudo', hash_conteudo)
+        if professor_id:
+            result = [ementa for ementa in result if ementa.get('professor_id') == professor_id]
         return result[0] if result else None
-    
+
     def get_ementa_disciplines(self, id_ementa: int) -> List[Dict]:
         """Busca todas as disciplinas associadas a uma ementa"""
-        ementa_disciplina = Query()
-        disciplina_ids = self.ementa_disciplina.search(
-            ementa_disciplina.ementa_fk == id_ementa
-        )
+        disciplina_ids = self.ementa_disciplina.search_by('ementa_fk', id_ementa)
         
         disciplinas = []
         for disc_rel in disciplina_ids:
@@ -221,46 +249,59 @@ class AnalyseDatabaseSeparado:
     
     def get_analise_by_id(self, analise_id: int) -> Optional[Dict]:
         """Busca análise por ID"""
-        analise = Query()
-        result = self.analise.search(analise.analise_id == analise_id)
-        return result[0] if result else None
+        return self.analise.get_by('analise_id', analise_id)
     
     def get_analises_by_ementa(self, ementa_fk: int) -> List[Dict]:
         """Busca todas as análises de uma ementa"""
-        analise = Query()
-        return self.analise.search(analise.ementa_fk == ementa_fk)
+        return self.analise.search_by('ementa_fk', ementa_fk)
     
     def get_analises_by_professor(self, prontuario_professor: str) -> List[Dict]:
         """Busca todas as análises feitas por um professor"""
-        analise = Query()
-        return self.analise.search(analise.prontuario_professor == prontuario_professor)
+        return self.analise.search_by('prontuario_professor', prontuario_professor)
     
     def get_analises_by_curso(self, codigo_curso: str) -> List[Dict]:
         """Busca todas as análises de um curso específico"""
-        # Buscar todas as análises
-        all_analyses = self.analise.all()
-        
-        # Filtrar análises que pertencem ao curso
+        # Professores (existentes) associados ao curso, calculados uma única vez
+        professores_do_curso = set()
+        if self.get_curso_by_codigo(codigo_curso):
+            for rel in self.professor_curso.search_by('curso_fk', codigo_curso):
+                if self.get_professor(rel['prontuario_professor']):
+                    professores_do_curso.add(rel['prontuario_professor'])
+        
+        # Uma passada sobre as análises com um teste de pertinência por linha
         curso_analyses = []
-        for analysis in all_analyses:
-            # Verificar se a análise tem prontuario_professor
-            if 'prontuario_professor' in analysis and analysis['prontuario_professor']:
-                # Buscar dados do professor
-                professor_data = self.get_professor(analysis['prontuario_professor'])
-                if professor_data:
-                    # Verificar se o professor tem o curso
-                    professor_cursos = self.get_professor_courses(analysis['prontuario_professor'])
-                    for curso in professor_cursos:
-                        if curso['codigo_curso'] == codigo_curso:
-                            curso_analyses.append(analysis)
-                            break
-            else:
-                # Se não tem prontuario_professor, assumir que pertence ao curso atual
-                # (para análises antigas ou sem essa informação)
+        for analysis in self.analise.all():
+            prontuario = analysis.get('prontuario_professor')
+            # Sem prontuario_professor, assumir que pertence ao curso atual
+            # (para análises antigas ou sem essa informação)
+            if not prontuario or prontuario in professores_do_curso:
                 curso_analyses.append(analysis)
         
         return curso_analyses
     
+    def _complete_analises(self, analises: List[Dict]) -> List[Dict]:
+        """
+        Anexa ementa completa e professor a cada análise (como get_analise_complete)
+        
+        Cada ementa e cada professor distintos são buscados uma única vez.
+        """
+        ementas = {}
+        professores = {}
+        for analise_data in analises:
+            ementa_fk = analise_data.get('ementa_fk')
+            if ementa_fk not in ementas:
+                ementas[ementa_fk] = self.get_ementa_complete(ementa_fk)
+            prontuario = analise_data.get('prontuario_professor')
+            if prontuario not in professores:
+                professores[prontuario] = self.get_professor(prontuario)
+            
+            ementa_data = ementas[ementa_fk]
+            professor_data = professores[prontuario]
+            analise_data['ementa'] = dict(ementa_data) if ementa_data else None
+            analise_data['professor'] = dict(professor_data) if professor_data else None
+        
+        return analises
+    
     def get_analise_complete(self, analise_id: int) -> Optional[Dict]:
         """Busca análise completa com dados da ementa e professor"""
         analise_data = self.get_analise_by_id(analise_id)
@@ -277,30 +318,84 @@ class AnalyseDatabaseSeparado:
         
         return analise_data
     
+    def list_analises_curso_professor(self, codigo_curso: str, prontuario_professor: str, limit: int = 50,
+                                      cursor: Optional[List] = None) -> Dict:
+        """Página do histórico do curso, mais recentes primeiro (keyset em created_at, analise_id)"""
+        colunas = ['analise_id', 'nome_aluno', 'score', 'adequado', 'materias_restantes',
+                   'ementa_fk', 'prontuario_professor', 'created_at']
+        itens = [
+            item for item in self.analise.search_by('prontuario_professor', prontuario_professor)
+            if item.get('curso_fk') == codigo_curso
+        ]
+        chave = lambda item: (item.get('created_at') or '', item.get('analise_id') or item.doc_id)
+        itens.sort(key=chave, reverse=True)
+        if cursor:
+            itens = [item for item in itens if chave(item) < (cursor[0] or '', cursor[1])]
+        
+        pagina = [{coluna: item.get(coluna) for coluna in colunas} for item in itens[:limit]]
+        for linha, item in zip(pagina, itens):
+            linha['analise_id'] = linha['analise_id'] or item.doc_id
+        
+        proximo_cursor = None
+        if len(itens) > limit:
+            ultima = pagina[-1]
+            proximo_cursor = [ultima['created_at'] or '', ultima['analise_id']]
+        return {'analises': pagina, 'proximo_cursor': proximo_cursor}
+    
+    def get_estatisticas_por_curso(self, prontuario_professor: str) -> List[Dict]:
+        """
+        Estatísticas das análises do professor agrupadas por curso (curso_fk da análise)
+        
+        Uma única passada sobre as análises, com acumuladores por curso.
+        """
+        acumulado = {}
+        for item in self.analise.search_by('prontuario_professor', prontuario_professor):
+            curso_fk = item.get('curso_fk')
+            if not curso_fk:
+                continue
+            stats = acumulado.setdefault(curso_fk, {
+                'total_analises': 0, 'soma': 0, 'score_minimo': None, 'score_maximo': None,
+                'adequadas': 0, 'inadequadas': 0
+            })
+            score = item.get('score', 0)
+            stats['total_analises'] += 1
+            stats['soma'] += score
+            stats['score_minimo'] = score if stats['score_minimo'] is None else min(stats['score_minimo'], score)
+            stats['score_maximo'] = score if stats['score_maximo'] is None else max(stats['score_maximo'], score)
+            if item.get('adequado'):
+                stats['adequadas'] += 1
+            else:
+                stats['inadequadas'] += 1
+        
+        estatisticas = []
+        for curso_fk, stats in acumulado.items():
+            curso = self.get_curso_by_codigo(curso_fk) or {}
+            estatisticas.append({
+                'codigo_curso': curso_fk,
+                'nome': curso.get('nome', curso_fk),
+                'descricao_curso': curso.get('descricao_curso', ''),
+                'total_analises': stats['total_analises'],
+                'media_score': round(stats['soma'] / stats['total_analises'], 2),
+                'score_minimo': stats['score_minimo'],
+                'score_maximo': stats['score_maximo'],
+                'adequadas': stats['adequadas'],
+                'inadequadas': stats['inadequadas']
+            })
+        
+        return sorted(estatisticas, key=lambda x: x['total_analises'], reverse=True)
+    
     # ==================== HISTÓRICO ====================
     
     def get_professor_history(self, prontuario_professor: str) -> List[Dict]:
         """Busca histórico completo de análises do professor"""
-        analises = self.get_analises_by_professor(prontuario_professor)
-        
-        historico = []
-        for analise in analises:
-            analise_completa = self.get_analise_complete(analise['analise_id'])
-            if analise_completa:
-                historico.append(analise_completa)
+        historico = self._complete_analises(self.get_analises_by_professor(prontuario_professor))
         
         # Ordenar por data (mais recente primeiro)
         return sorted(historico, key=lambda x: x.get('data_analise', ''), reverse=True)
     
     def get_ementa_history(self, ementa_fk: int) -> List[Dict]:
         """Busca histórico de análises de uma ementa específica"""
-        analises = self.get_analises_by_ementa(ementa_fk)
-        
-        historico = []
-        for analise in analises:
-            analise_completa = self.get_analise_complete(analise['analise_id'])
-            if analise_completa:
-                historico.append(analise_completa)
+        historico = self._complete_analises(self.get_analises_by_ementa(ementa_fk))
         
         return sorted(historico, key=lambda x: x.get('data_analise', ''), reverse=True)
     
@@ -313,15 +408,10 @@ class AnalyseDatabaseSeparado:
         disciplina_ids = [disc['id_disciplina'] for disc in disciplinas_curso]
         
         # Buscar ementas que contenham essas disciplinas
-        ementa_disciplina = Query()
         ementa_ids = []
-        for disciplina_id in disciplina_ids:
-            resultados = self.ementa_disciplina.search(
-                ementa_disciplina.disciplina_fk == disciplina_id
-            )
-            for resultado in resultados:
-                if resultado['ementa_fk'] not in ementa_ids:
-                    ementa_ids.append(resultado['ementa_fk'])
+        for resultado in self.ementa_disciplina.search_in('disciplina_fk', disciplina_ids):
+            if resultado['ementa_fk'] not in ementa_ids:
+                ementa_ids.append(resultado['ementa_fk'])
         
         # Retornar ementas completas
         ementas = []
@@ -334,10 +424,7 @@ class AnalyseDatabaseSeparado:
     
     def filter_ementas_by_disciplina(self, id_disciplina: str) -> List[Dict]:
         """Filtra ementas por disciplina"""
-        ementa_disciplina = Query()
-        ementa_ids = self.ementa_disciplina.search(
-            ementa_disciplina.disciplina_fk == id_disciplina
-        )
+        ementa_ids = self.ementa_disciplina.search_by('disciplina_fk', id_disciplina)
         
         ementas = []
         for rel in ementa_ids:
@@ -350,8 +437,7 @@ class AnalyseDatabaseSeparado:
     def filter_ementas_by_tag(self, tag_id: int) -> List[Dict]:
         """Filtra ementas por tag (através dos cursos)"""
         # Buscar cursos com essa tag
-        curso_tags = Query()
-        curso_ids = self.curso_tags.search(curso_tags.tag_fk == tag_id)
+        curso_ids = self.curso_tags.search_by('tag_fk', tag_id)
         
         ementas = []
         for curso_rel in curso_ids:
@@ -369,24 +455,17 @@ class AnalyseDatabaseSeparado:
         return unique_ementas
     
     def search_ementas_by_name(self, nome_disciplina: str) -> List[Dict]:
-        """Busca ementas por nome da disciplina"""
-        disciplina = Query()
-        disciplinas = self.disciplinas.search(disciplina.nome.matches(f'.*{nome_disciplina}.*', flags='i'))
-        
-        ementas = []
-        for disciplina_data in disciplinas:
-            ementas_disciplina = self.filter_ementas_by_disciplina(disciplina_data['id_disciplina'])
-            ementas.extend(ementas_disciplina)
-        
-        # Remover duplicatas
-        seen = set()
-        unique_ementas = []
-        for ementa in ementas:
-            if ementa['id_ementa'] not in seen:
-                seen.add(ementa['id_ementa'])
-                unique_ementas.append(ementa)
-        
-        return unique_ementas
+        """Busca ementas por nome da disciplina (sem diferenciar acentos e maiúsculas)"""
+        termo = fold_accents(nome_disciplina)
+        disciplina_ids = [
+            disciplina['id_disciplina'] for disciplina in self.disciplinas.all()
+            if termo in fold_accents(disciplina.get('nome', ''))
+        ]
+        
+        # Ementas distintas de todas as disciplinas encontradas, em uma consulta ao índice
+        ementa_ids = dict.fromkeys(rel['ementa_fk'] for rel in self.ementa_disciplina.search_in('disciplina_fk', disciplina_ids))
+        ementas = [self.get_ementa_complete(ementa_id) for ementa_id in ementa_ids]
+        return [ementa for ementa in ementas if ementa]
     
     def get_recent_ementas(self, limit: int = 10) -> List[Dict]:
         """Busca ementas mais recentes"""
@@ -397,17 +476,21 @@ class AnalyseDatabaseSeparado:
     
     # ==================== MÉTODOS DE DELETE ====================
     
+    def _professor_has_course(self, prontuario_professor: str, codigo_curso: str) -> bool:
+        """Verifica se o professor está associado ao curso (permissão para alterá-lo)"""
+        return any(
+            rel.get('curso_fk') == codigo_curso
+            for rel in self.professor_curso.search_by('prontuario_professor', prontuario_professor)
+        )
+    
     def delete_analise(self, analise_id: int, prontuario_professor: str) -> bool:
         """Deleta uma análise específica, verificando se o professor tem permissão"""
         analise = Query()
         
         # Verificar se a análise existe e pertence ao professor
-        analise_data = self.analise.search(
-            (analise.analise_id == analise_id) & 
-            (analise.prontuario_professor == prontuario_professor)
-        )
+        analise_data = self.get_analise_by_id(analise_id)
         
-        if not analise_data:
+        if not analise_data or analise_data.get('prontuario_professor') != prontuario_professor:
             return False
         
         # Deletar a análise
@@ -419,10 +502,10 @@ class AnalyseDatabaseSeparado:
         analise = Query()
         
         # Verificar se existem análises da ementa feitas pelo professor
-        analises = self.analise.search(
-            (analise.ementa_fk == ementa_fk) & 
-            (analise.prontuario_professor == prontuario_professor)
-        )
+        analises = [
+            item for item in self.analise.search_by('ementa_fk', ementa_fk)
+            if item.get('prontuario_professor') == prontuario_professor
+        ]
         
         if not analises:
             return False
@@ -457,51 +540,45 @@ class AnalyseDatabaseSeparado:
     def delete_curso(self, codigo_curso: str, prontuario_professor: str) -> bool:
         """Deleta um curso e todos seus relacionamentos"""
         # Verificar se o professor tem permissão para deletar o curso
-        professor_curso = Query()
-        permission = self.professor_curso.search(
-            (professor_curso.curso_fk == codigo_curso) & 
-            (professor_curso.prontuario_professor == prontuario_professor)
-        )
-        
-        if not permission:
+        if not self._professor_has_course(prontuario_professor, codigo_curso):
             return False
         
-        # Buscar todas as disciplinas do curso para deletar ementas relacionadas
-        disciplinas_curso = self.get_curso_disciplines(codigo_curso)
-        
-        # Para cada disciplina, buscar e deletar ementas relacionadas
-        for disciplina in disciplinas_curso:
-            ementa_disciplina = Query()
-            ementa_ids = self.ementa_disciplina.search(
-                ementa_disciplina.disciplina_fk == disciplina['id_disciplina']
+        # Todas as remoções em cascata gravam cada arquivo uma única vez
+        with self.transaction():
+            # Buscar todas as disciplinas do curso para deletar ementas relacionadas
+            disciplinas_curso = self.get_curso_disciplines(codigo_curso)
+            
+            # Para cada disciplina, buscar e deletar ementas relacionadas
+            for disciplina in disciplinas_curso:
+                ementa_ids = self.ementa_disciplina.search_by('disciplina_fk', disciplina['id_disciplina'])
+            
+                # Deletar ementas relacionadas à disciplina
+                for ementa_rel in ementa_ids:
+                    self.delete_ementa(ementa_rel['ementa_fk'], prontuario_professor)
+            
+            # Deletar relacionamentos curso_tags
+            curso_tags = Query()
+            self.curso_tags.remove(curso_tags.curso_fk == codigo_curso)
+            
+            # Deletar relacionamentos cursos_disciplina
+            cursos_disciplina = Query()
+            self.cursos_disciplina.remove(cursos_disciplina.curso_fk == codigo_curso)
+            
+            # Deletar relacionamento professor_curso
+            professor_curso = Query()
+            self.professor_curso.remove(
+                (professor_curso.curso_fk == codigo_curso) & 
+                (professor_curso.prontuario_professor == prontuario_professor)
             )
             
-            # Deletar ementas relacionadas à disciplina
-            for ementa_rel in ementa_ids:
-                self.delete_ementa(ementa_rel['ementa_fk'], prontuario_professor)
-        
-        # Deletar relacionamentos curso_tags
-        curso_tags = Query()
-        self.curso_tags.remove(curso_tags.curso_fk == codigo_curso)
-        
-        # Deletar relacionamentos cursos_disciplina
-        cursos_disciplina = Query()
-        self.cursos_disciplina.remove(cursos_disciplina.curso_fk == codigo_curso)
-        
-        # Deletar relacionamento professor_curso
-        self.professor_curso.remove(
-            (professor_curso.curso_fk == codigo_curso) & 
-            (professor_curso.prontuario_professor == prontuario_professor)
-        )
-        
-        # Deletar o curso (apenas se não houver mais professores associados)
-        remaining_professors = self.professor_curso.search(professor_curso.curso_fk == codigo_curso)
-        if not remaining_professors:
-            curso = Query()
-            result = self.cursos.remove(curso.codigo_curso == codigo_curso)
-            return len(result) > 0
-        
-        return True
+            # Deletar o curso (apenas se não houver mais professores associados)
+            remaining_professors = self.professor_curso.get_by('curso_fk', codigo_curso)
+            if not remaining_professors:
+                curso = Query()
+                result = self.cursos.remove(curso.codigo_curso == codigo_curso)
+                return len(result) > 0
+            
+            return True
     
     def delete_all_analises_professor(self, prontuario_professor: str) -> bool:
         """Deleta todas as análises de um professor"""
@@ -521,41 +598,29 @@ class AnalyseDatabaseSeparado:
     def delete_disciplina_from_curso(self, codigo_curso: str, id_disciplina: str, prontuario_professor: str) -> bool:
         """Remove uma disciplina de um curso"""
         # Verificar se o professor tem permissão para o curso
-        professor_curso = Query()
-        permission = self.professor_curso.search(
-            (professor_curso.curso_fk == codigo_curso) & 
-            (professor_curso.prontuario_professor == prontuario_professor)
-        )
-        
-        if not permission:
+        if not self._professor_has_course(prontuario_professor, codigo_curso):
             return False
         
-        # Deletar ementas relacionadas à disciplina
-        ementa_disciplina = Query()
-        ementa_ids = self.ementa_disciplina.search(ementa_disciplina.disciplina_fk == id_disciplina)
-        
-        for ementa_rel in ementa_ids:
-            self.delete_ementa(ementa_rel['ementa_fk'], prontuario_professor)
-        
-        # Remover relacionamento curso_disciplina
-        cursos_disciplina = Query()
-        result = self.cursos_disciplina.remove(
-            (cursos_disciplina.curso_fk == codigo_curso) & 
-            (cursos_disciplina.disciplina_fk == id_disciplina)
-        )
+        with self.transaction():
+            # Deletar ementas relacionadas à disciplina
+            ementa_ids = self.ementa_disciplina.search_by('disciplina_fk', id_disciplina)
+            
+            for ementa_rel in ementa_ids:
+                self.delete_ementa(ementa_rel['ementa_fk'], prontuario_professor)
+            
+            # Remover relacionamento curso_disciplina
+            cursos_disciplina = Query()
+            result = self.cursos_disciplina.remove(
+                (cursos_disciplina.curso_fk == codigo_curso) & 
+                (cursos_disciplina.disciplina_fk == id_disciplina)
+            )
         
         return len(result) > 0
     
     def delete_tag_from_curso(self, codigo_curso: str, tag_id: int, prontuario_professor: str) -> bool:
         """Remove uma tag de um curso"""
         # Verificar se o professor tem permissão para o curso
-        professor_curso = Query()
-        permission = self.professor_curso.search(
-            (professor_curso.curso_fk == codigo_curso) & 
-            (professor_curso.prontuario_professor == prontuario_professor)
-        )
-        
-        if not permission:
+        if not self._professor_has_course(prontuario_professor, codigo_curso):
             return False
         
         # Remover relacionamento curso_tags
@@ -567,51 +632,42 @@ class AnalyseDatabaseSeparado:
         
         return len(result) > 0
     
-    def cleanup_orphaned_data(self) -> Dict[str, int]:
-        """Limpa dados órfãos (sem relacionamentos válidos)"""
-        cleanup_stats = {
-            'disciplinas_removidas': 0,
-            'tags_removidas': 0,
-            'ementas_removidas': 0
+    def cleanup_orphaned_data(self, dry_run: bool = False) -> Dict:
+        """
+        Limpa dados órfãos (sem relacionamentos válidos)
+        
+        Args:
+            dry_run: Apenas relata o que seria removido, sem remover
+        
+        Returns:
+            Dict com contagem de registros removidos por tabela e os IDs em 'ids'
+        """
+        # Anti-joins pelos índices; cada tabela recebe um único remove
+        disciplinas_com_curso = self.cursos_disciplina.values_of('disciplina_fk')
+        disciplinas_orfas = [d for d in self.disciplinas.all() if d.get('id_disciplina') not in disciplinas_com_curso]
+        
+        tags_com_curso = self.curso_tags.values_of('tag_fk')
+        tags_orfas = [t for t in self.tags.all() if t.get('id_tag') not in tags_com_curso]
+        
+        # Ementas sem disciplinas e sem análises
+        ementas_referenciadas = self.ementa_disciplina.values_of('ementa_fk') | self.analise.values_of('ementa_fk')
+        ementas_orfas = [e for e in self.ementa.all() if e.get('id_ementa') not in ementas_referenciadas]
+        
+        if not dry_run:
+            with self.transaction():
+                for tabela, orfaos in ((self.disciplinas, disciplinas_orfas), (self.tags, tags_orfas),
+                                       (self.ementa, ementas_orfas)):
+                    if orfaos:
+                        tabela.remove(doc_ids=[doc.doc_id for doc in orfaos])
+        
+        return {
+            'disciplinas_removidas': len(disciplinas_orfas),
+            'tags_removidas': len(tags_orfas),
+            'ementas_removidas': len(ementas_orfas),
+            'dry_run': dry_run,
+            'ids': {
+                'disciplinas': [d.get('id_disciplina') for d in disciplinas_orfas],
+                'tags': [t.get('id_tag') for t in tags_orfas],
+                'ementas': [e.get('id_ementa') for e in ementas_orfas]
+            }
         }
-        
-        # Remover disciplinas sem curso
-        disciplina = Query()
-        curso_disciplina = Query()
-        all_disciplinas = self.disciplinas.all()
-        
-        for disciplina_data in all_disciplinas:
-            disciplina_id = disciplina_data['id_disciplina']
-            has_curso = self.cursos_disciplina.search(curso_disciplina.disciplina_fk == disciplina_id)
-            
-            if not has_curso:
-                self.disciplinas.remove(disciplina.id_disciplina == disciplina_id)
-                cleanup_stats['disciplinas_removidas'] += 1
-        
-        # Remover tags sem curso
-        tag = Query()
-        curso_tags = Query()
-        all_tags = self.tags.all()
-        
-        for tag_data in all_tags:
-            tag_id = tag_data['id_tag']
-            has_curso = self.curso_tags.search(curso_tags.tag_fk == tag_id)
-            
-            if not has_curso:
-                self.tags.remove(tag.id_tag == tag_id)
-                cleanup_stats['tags_removidas'] += 1
-        
-        # Remover ementas sem disciplinas
-        ementa = Query()
-        ementa_disciplina = Query()
-        all_ementas = self.ementa.all()
-        
-        for ementa_data in all_ementas:
-            ementa_id = ementa_data['id_ementa']
-            has_disciplina = self.ementa_disciplina.search(ementa_disciplina.ementa_fk == ementa_id)
-            
-            if not has_disciplina:
-                self.ementa.remove(ementa.id_ementa == ementa_id)
-                cleanup_stats['ementas_removidas'] += 1
-        
-        return cleanup_stats
\ No newline at end of file
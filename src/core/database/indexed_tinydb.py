@@ -0,0 +1,205 @@
+"""
+Índices secundários em memória para tabelas TinyDB
+
+Cada `Query()` do TinyDB lê o arquivo JSON inteiro e avalia a condição em
+todos os documentos. IndexedTable mantém, para os campos configurados, um
+mapa valor -> doc_ids e uma cópia dos documentos, de modo que buscas por
+igualdade nesses campos custam O(1) e percorrer um relacionamento custa O(k).
+
+O índice é construído na primeira busca (carga preguiçosa) e atualizado a
+cada insert/update/upsert/remove feito pela própria tabela. Se o arquivo for
+alterado por outra instância (tamanho ou mtime diferentes do registrado, ou
+outra geração do WriteBehindMiddleware), o índice é descartado e reconstruído
+na próxima busca.
+"""
+import os
+from contextlib import nullcontext
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from tinydb import TinyDB
+from tinydb.table import Document, Table
+
+
+class IndexedTable(Table):
+    """Tabela TinyDB com índices hash por igualdade nos campos informados"""
+
+    def __init__(self, *args, indexed_fields: Iterable[str] = (), path: Optional[str] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.indexed_fields: Tuple[str, ...] = tuple(indexed_fields)
+        self._path = path
+        # campo -> valor -> doc_ids; None enquanto o índice não foi carregado
+        self._indices: Optional[Dict[str, Dict[Any, Set[int]]]] = None
+        self._documentos: Dict[int, Dict] = {}
+        self._versao_arquivo: Optional[Any] = None
+        # Tabela resultante da última escrita, consumida por _reindexar
+        self._tabela_escrita: Optional[Dict[int, Dict]] = None
+
+    # ==================== CONSULTAS ====================
+
+    def search_by(self, field: str, value: Any) -> List[Document]:
+        """Documentos com `field == value` (O(k), k = resultados)"""
+        if field not in self.indexed_fields:
+            return [doc for doc in self.all() if doc.get(field) == value]
+        self._garantir_indices()
+        try:
+            doc_ids = self._indices[field].get(value, ())
+        except TypeError:
+            # Valor não hashable (lista, dict) nunca está no índice
+            return []
+        return [Document(dict(self._documentos[doc_id]), doc_id) for doc_id in sorted(doc_ids)]
+
+    def get_by(self, field: str, value: Any) -> Optional[Document]:
+        """Primeiro documento com `field == value`, ou None"""
+        result = self.search_by(field, value)
+        return result[0] if result else None
+
+    def search_in(self, field: str, values: Iterable[Any]) -> List[Document]:
+        """Documentos cujo `field` está em `values` (uma busca no índice por valor)"""
+        encontrados = {}
+        for value in values:
+            for doc in self.search_by(field, value):
+                encontrados[doc.doc_id] = doc
+        return [encontrados[doc_id] for doc_id in sorted(encontrados)]
+
+    def values_of(self, field: str) -> Set[Any]:
+        """Valores distintos presentes em um campo indexado"""
+        self._garantir_indices()
+        return {value for value, doc_ids in self._indices[field].items() if doc_ids}
+
+    # ==================== ESCRITAS ====================
+
+    def insert(self, document):
+        doc_id = super().insert(document)
+        self._reindexar([doc_id])
+        return doc_id
+
+    def insert_multiple(self, documents):
+        doc_ids = super().insert_multiple(documents)
+        self._reindexar(doc_ids)
+        return doc_ids
+
+    def update(self, fields, cond=None, doc_ids=None):
+        updated = super().update(fields, cond=cond, doc_ids=doc_ids)
+        self._reindexar(updated)
+        return updated
+
+    def update_multiple(self, updates):
+        updated = super().update_multiple(updates)
+        self._reindexar(updated)
+        return updated
+
+    def upsert(self, document, cond=None):
+        doc_ids = super().upsert(document, cond=cond)
+        self._reindexar(doc_ids)
+        return doc_ids
+
+    def remove(self, cond=None, doc_ids=None):
+        removed = super().remove(cond=cond, doc_ids=doc_ids)
+        self._reindexar(removed)
+        return removed
+
+    def truncate(self):
+        super().truncate()
+        self._descartar_indices()
+
+    def _update_table(self, updater):
+        def updater_indexado(table):
+            updater(table)
+            self._tabela_escrita = table
+
+        # Storages com write-behind exigem o lock durante o read-modify-write
+        with getattr(self._storage, 'lock', nullcontext()):
+            # Escrita externa desde a última leitura: o índice não a conhece
+            if self._indices is not None and self._versao_arquivo != self._ler_versao_arquivo():
+                self._descartar_indices()
+            super()._update_table(updater_indexado)
+            if self._indices is not None:
+                self._versao_arquivo = self._ler_versao_arquivo()
+
+    # ==================== MANUTENÇÃO DOS ÍNDICES ====================
+
+    def _ler_versao_arquivo(self) -> Optional[Any]:
+        # WriteBehindMiddleware versiona o conteúdo em memória, que pode estar à frente do arquivo
+        current_version = getattr(self._storage, 'current_version', None)
+        if current_version:
+            return current_version()
+        if not self._path:
+            return None
+        try:
+            stat = os.stat(self._path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _descartar_indices(self):
+        self._indices = None
+        self._documentos = {}
+        self._versao_arquivo = None
+
+    def _garantir_indices(self):
+        """Constrói o índice na primeira busca ou se o arquivo mudou por fora"""
+        if self._indices is not None and self._versao_arquivo == self._ler_versao_arquivo():
+            return
+
+        self._indices = {field: {} for field in self.indexed_fields}
+        self._documentos = {}
+        self._versao_arquivo = self._ler_versao_arquivo()
+        for doc_id, doc in self._read_table().items():
+            self._indexar(self.document_id_class(doc_id), doc)
+
+    def _indexar(self, doc_id: int, doc: Dict):
+        # Cópia: com MemoryStorage os updates alteram o mesmo dict em memória
+        doc = dict(doc)
+        self._documentos[doc_id] = doc
+        for field in self.indexed_fields:
+            value = doc.get(field)
+            if value is None:
+                continue
+            try:
+                self._indices[field].setdefault(value, set()).add(doc_id)
+            except TypeError:
+                continue
+
+    def _desindexar(self, doc_id: int):
+        doc = self._documentos.pop(doc_id, None)
+        if doc is None:
+            return
+        for field in self.indexed_fields:
+            value = doc.get(field)
+            if value is None:
+                continue
+            try:
+                doc_ids = self._indices[field].get(value)
+            except TypeError:
+                continue
+            if doc_ids:
+                doc_ids.discard(doc_id)
+                if not doc_ids:
+                    del self._indices[field][value]
+
+    def _reindexar(self, doc_ids: Iterable[int]):
+        """Aplica ao índice o resultado da última escrita para os doc_ids afetados"""
+        tabela, self._tabela_escrita = self._tabela_escrita, None
+        if self._indices is None or tabela is None:
+            return
+        for doc_id in doc_ids:
+            self._desindexar(doc_id)
+            if doc_id in tabela:
+                self._indexar(doc_id, tabela[doc_id])
+
+
+class IndexedTinyDB(TinyDB):
+    """TinyDB cujas tabelas são IndexedTable com os campos informados"""
+
+    table_class = IndexedTable
+
+    def __init__(self, *args, indexed_fields: Iterable[str] = (), **kwargs):
+        self.indexed_fields = tuple(indexed_fields)
+        # Caminho do arquivo JSON (None para MemoryStorage), usado para detectar escritas externas
+        self.path = os.fspath(args[0]) if args and isinstance(args[0], (str, os.PathLike)) else None
+        super().__init__(*args, **kwargs)
+
+    def table(self, name: str, **kwargs) -> IndexedTable:
+        kwargs.setdefault('indexed_fields', self.indexed_fields)
+        kwargs.setdefault('path', self.path)
+        return super().table(name, **kwargs)
@@ -0,0 +1,1214 @@
+"""
+Banco de dados local em SQLite (modo offline)
+
+Substitui os arquivos JSON do TinyDB como fallback do SupabaseDatabase: o
+esquema espelha o SUPABASE_SCHEMA.md (mesmas tabelas, colunas e índices em
+todas as chaves estrangeiras), o journal em WAL permite leituras enquanto há
+escrita e cada operação grava só as linhas afetadas. Também serve como banco
+local para testes e benchmarks.
+"""
+import json
+import math
+import os
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.utils.text_normalization import tokenize
+
+# Timestamp ISO 8601 em UTC, no mesmo formato devolvido pelo Supabase
+NOW_SQL = "(strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))"
+
+SCHEMA_SQL = f"""
+-- ==================== TABELAS PRINCIPAIS ====================
+
+CREATE TABLE IF NOT EXISTS professores (
+    prontuario VARCHAR(9) PRIMARY KEY,
+    nome VARCHAR(150) NOT NULL,
+    email_educacional VARCHAR(150) UNIQUE NOT NULL,
+    senha VARCHAR(255) NOT NULL,
+    user_id TEXT,
+    created_at TEXT DEFAULT {NOW_SQL},
+    updated_at TEXT DEFAULT {NOW_SQL}
+);
+
+CREATE TABLE IF NOT EXISTS cursos (
+    codigo_curso VARCHAR(50) PRIMARY KEY,
+    nome VARCHAR(150) NOT NULL,
+    descricao_curso TEXT NOT NULL DEFAULT '',
+    created_at TEXT DEFAULT {NOW_SQL},
+    updated_at TEXT DEFAULT {NOW_SQL}
+);
+
+CREATE TABLE IF NOT EXISTS disciplinas (
+    id_disciplina VARCHAR(15) PRIMARY KEY,
+    nome VARCHAR(150) NOT NULL,
+    carga_horaria INTEGER,
+    created_at TEXT DEFAULT {NOW_SQL},
+    updated_at TEXT DEFAULT {NOW_SQL}
+);
+
+CREATE TABLE IF NOT EXISTS tags (
+    id_tag INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome VARCHAR(150) NOT NULL UNIQUE,
+    created_at TEXT DEFAULT {NOW_SQL}
+);
+
+CREATE TABLE IF NOT EXISTS ementas (
+    id_ementa INTEGER PRIMARY KEY AUTOINCREMENT,
+    drive_id VARCHAR(255),
+    file_path TEXT,
+    file_name VARCHAR(255),
+    file_size BIGINT,
+    hash_conteudo VARCHAR(64),
+    professor_id VARCHAR(9) REFERENCES professores(prontuario) ON DELETE CASCADE,
+    data_upload TEXT DEFAULT {NOW_SQL},
+    created_at TEXT DEFAULT {NOW_SQL}
+);
+
+CREATE TABLE IF NOT EXISTS artefatos_analise (
+    hash_conteudo VARCHAR(64) PRIMARY KEY,
+    conteudo_gzip TEXT NOT NULL,
+    tamanho_original INTEGER NOT NULL,
+    created_at TEXT DEFAULT {NOW_SQL}
+);
+
+CREATE TABLE IF NOT EXISTS analises (
+    analise_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome_aluno VARCHAR(255) NOT NULL,
+    ementa_fk INTEGER NOT NULL REFERENCES ementas(id_ementa) ON DELETE CASCADE,
+    adequado BOOLEAN NOT NULL,
+    score INTEGER NOT NULL CHECK (score >= 0 AND score <= 100),
+    texto_analise TEXT NOT NULL,
+    materias_restantes TEXT,
+    professor_id VARCHAR(9) REFERENCES professores(prontuario) ON DELETE CASCADE,
+    dados_estruturados_json TEXT,
+    artefato_hash VARCHAR(64) REFERENCES artefatos_analise(hash_conteudo),
+    comentario TEXT,
+    created_at TEXT DEFAULT {NOW_SQL},
+    updated_at TEXT DEFAULT {NOW_SQL}
+);
+
+-- ==================== TABELAS DE RELACIONAMENTO ====================
+
+CREATE TABLE IF NOT EXISTS professor_curso (
+    pc_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    prontuario_professor VARCHAR(9) NOT NULL REFERENCES professores(prontuario) ON DELETE CASCADE,
+    curso_fk VARCHAR(50) NOT NULL REFERENCES cursos(codigo_curso) ON DELETE CASCADE,
+    created_at TEXT DEFAULT {NOW_SQL},
+    UNIQUE(prontuario_professor, curso_fk)
+);
+
+CREATE TABLE IF NOT EXISTS curso_tags (
+    ct_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    curso_fk VARCHAR(50) NOT NULL REFERENCES cursos(codigo_curso) ON DELETE CASCADE,
+    tag_fk INTEGER NOT NULL REFERENCES tags(id_tag) ON DELETE CASCADE,
+    created_at TEXT DEFAULT {NOW_SQL},
+    UNIQUE(curso_fk, tag_fk)
+);
+
+CREATE TABLE IF NOT EXISTS cursos_disciplina (
+    cd_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    curso_fk VARCHAR(50) NOT NULL REFERENCES cursos(codigo_curso) ON DELETE CASCADE,
+    disciplina_fk VARCHAR(15) NOT NULL REFERENCES disciplinas(id_disciplina) ON DELETE CASCADE,
+    created_at TEXT DEFAULT {NOW_SQL},
+    UNIQUE(curso_fk, disciplina_fk)
+);
+
+CREATE TABLE IF NOT EXISTS ementa_disciplina (
+    ed_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ementa_fk INTEGER NOT NULL REFERENCES ementas(id_ementa) ON DELETE CASCADE,
+    disciplina_fk VARCHAR(15) NOT NULL REFERENCES disciplinas(id_disciplina) ON DELETE CASCADE,
+    created_at TEXT DEFAULT {NOW_SQL},
+    UNIQUE(ementa_fk, disciplina_fk)
+);
+
+CREATE TABLE IF NOT EXISTS analise_curso (
+    ac_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    analise_fk INTEGER NOT NULL REFERENCES analises(analise_id) ON DELETE CASCADE,
+    curso_fk VARCHAR(50) NOT NULL REFERENCES cursos(codigo_curso) ON DELETE CASCADE,
+    created_at TEXT DEFAULT {NOW_SQL},
+    UNIQUE(analise_fk, curso_fk)
+);
+
+-- ==================== ÍNDICES ====================
+
+CREATE INDEX IF NOT EXISTS idx_professores_email ON professores(email_educacional);
+CREATE INDEX IF NOT EXISTS idx_analises_ementa ON analises(ementa_fk);
+CREATE INDEX IF NOT EXISTS idx_analises_professor ON analises(professor_id);
+CREATE INDEX IF NOT EXISTS idx_analises_professor_created ON analises(professor_id, created_at DESC, analise_id DESC);
+CREATE INDEX IF NOT EXISTS idx_analises_artefato ON analises(artefato_hash);
+CREATE INDEX IF NOT EXISTS idx_ementas_professor ON ementas(professor_id);
+CREATE INDEX IF NOT EXISTS idx_ementas_data_upload ON ementas(data_upload);
+CREATE INDEX IF NOT EXISTS idx_ementas_hash_conteudo ON ementas(professor_id, hash_conteudo);
+CREATE INDEX IF NOT EXISTS idx_ementas_drive_id ON ementas(drive_id);
+CREATE INDEX IF NOT EXISTS idx_professor_curso_professor ON professor_curso(prontuario_professor);
+CREATE INDEX IF NOT EXISTS idx_professor_curso_curso ON professor_curso(curso_fk);
+CREATE INDEX IF NOT EXISTS idx_curso_tags_curso ON curso_tags(curso_fk);
+CREATE INDEX IF NOT EXISTS idx_curso_tags_tag ON curso_tags(tag_fk);
+CREATE INDEX IF NOT EXISTS idx_cursos_disciplina_curso ON cursos_disciplina(curso_fk);
+CREATE INDEX IF NOT EXISTS idx_cursos_disciplina_disciplina ON cursos_disciplina(disciplina_fk);
+CREATE INDEX IF NOT EXISTS idx_ementa_disciplina_ementa ON ementa_disciplina(ementa_fk);
+CREATE INDEX IF NOT EXISTS idx_ementa_disciplina_disciplina ON ementa_disciplina(disciplina_fk);
+CREATE INDEX IF NOT EXISTS idx_analise_curso_analise ON analise_curso(analise_fk);
+CREATE INDEX IF NOT EXISTS idx_analise_curso_curso ON analise_curso(curso_fk);
+
+-- ==================== ESTATÍSTICAS DO DASHBOARD ====================
+
+-- Agregados por (professor, curso) mantidos pelos gatilhos abaixo: o dashboard
+-- lê uma linha em vez de recalcular sobre todas as análises. histograma é um
+-- array JSON com 10 faixas de score (0-9, 10-19, ..., 90-100).
+CREATE TABLE IF NOT EXISTS estatisticas_curso_professor (
+    professor_id VARCHAR(9) NOT NULL REFERENCES professores(prontuario) ON DELETE CASCADE,
+    curso_fk VARCHAR(50) NOT NULL REFERENCES cursos(codigo_curso) ON DELETE CASCADE,
+    total_analises INTEGER NOT NULL DEFAULT 0,
+    soma_score INTEGER NOT NULL DEFAULT 0,
+    soma_quadrados INTEGER NOT NULL DEFAULT 0,
+    score_minimo INTEGER,
+    score_maximo INTEGER,
+    adequadas INTEGER NOT NULL DEFAULT 0,
+    histograma TEXT NOT NULL DEFAULT '[0,0,0,0,0,0,0,0,0,0]',
+    updated_at TEXT DEFAULT {NOW_SQL},
+    PRIMARY KEY (professor_id, curso_fk)
+);
+
+CREATE INDEX IF NOT EXISTS idx_estatisticas_curso ON estatisticas_curso_professor(curso_fk);
+
+-- Vínculo análise-curso criado: soma a análise aos agregados do curso
+CREATE TRIGGER IF NOT EXISTS trg_estatisticas_vinculo_insert AFTER INSERT ON analise_curso
+WHEN (SELECT professor_id FROM analises WHERE analise_id = NEW.analise_fk) IS NOT NULL
+BEGIN
+    INSERT OR IGNORE INTO estatisticas_curso_professor (professor_id, curso_fk)
+    SELECT professor_id, NEW.curso_fk FROM analises WHERE analise_id = NEW.analise_fk;
+
+    UPDATE estatisticas_curso_professor SET
+        total_analises = total_analises + 1,
+        soma_score = soma_score + a.score,
+        soma_quadrados = soma_quadrados + a.score * a.score,
+        score_minimo = MIN(COALESCE(score_minimo, a.score), a.score),
+        score_maximo = MAX(COALESCE(score_maximo, a.score), a.score),
+        adequadas = adequadas + (CASE WHEN a.adequado THEN 1 ELSE 0 END),
+        histograma = json_set(
+            histograma, '$[' || MIN(a.score / 10, 9) || ']',
+            json_extract(histograma, '$[' || MIN(a.score / 10, 9) || ']') + 1
+        ),
+        updated_at = {NOW_SQL}
+    FROM (SELECT professor_id, score, adequado FROM analises WHERE analise_id = NEW.analise_fk) AS a
+    WHERE estatisticas_curso_professor.professor_id = a.professor_id
+      AND estatisticas_curso_professor.curso_fk = NEW.curso_fk;
+END;
+
+-- Análise removida (inclusive em cascata): desconta de todos os cursos vinculados.
+-- Mínimo e máximo só são recalculados quando a análise removida era o extremo.
+CREATE TRIGGER IF NOT EXISTS trg_estatisticas_analises_delete BEFORE DELETE ON analises
+WHEN OLD.professor_id IS NOT NULL
+BEGIN
+    UPDATE estatisticas_curso_professor SET
+        total_analises = total_analises - 1,
+        soma_score = soma_score - OLD.score,
+        soma_quadrados = soma_quadrados - OLD.score * OLD.score,
+        score_minimo = CASE WHEN OLD.score > score_minimo THEN score_minimo ELSE (
+            SELECT MIN(a.score) FROM analises a JOIN analise_curso ac ON ac.analise_fk = a.analise_id
+            WHERE a.professor_id = OLD.professor_id AND ac.curso_fk = estatisticas_curso_professor.curso_fk
+              AND a.analise_id <> OLD.analise_id
+        ) END,
+        score_maximo = CASE WHEN OLD.score < score_maximo THEN score_maximo ELSE (
+            SELECT MAX(a.score) FROM analises a JOIN analise_curso ac ON ac.analise_fk = a.analise_id
+            WHERE a.professor_id = OLD.professor_id AND ac.curso_fk = estatisticas_curso_professor.curso_fk
+              AND a.analise_id <> OLD.analise_id
+        ) END,
+        adequadas = adequadas - (CASE WHEN OLD.adequado THEN 1 ELSE 0 END),
+        histograma = json_set(
+            histograma, '$[' || MIN(OLD.score / 10, 9) || ']',
+            json_extract(histograma, '$[' || MIN(OLD.score / 10, 9) || ']') - 1
+        ),
+        updated_at = {NOW_SQL}
+    WHERE professor_id = OLD.professor_id
+      AND curso_fk IN (SELECT curso_fk FROM analise_curso WHERE analise_fk = OLD.analise_id);
+END;
+
+-- Vínculo removido com a análise mantida (quando a análise é removida, o gatilho acima já descontou)
+CREATE TRIGGER IF NOT EXISTS trg_estatisticas_vinculo_delete AFTER DELETE ON analise_curso
+WHEN (SELECT professor_id FROM analises WHERE analise_id = OLD.analise_fk) IS NOT NULL
+BEGIN
+    UPDATE estatisticas_curso_professor SET
+        total_analises = total_analises - 1,
+        soma_score = soma_score - a.score,
+        soma_quadrados = soma_quadrados - a.score * a.score,
+        score_minimo = CASE WHEN a.score > score_minimo THEN score_minimo ELSE (
+            SELECT MIN(a2.score) FROM analises a2 JOIN analise_curso ac ON ac.analise_fk = a2.analise_id
+            WHERE a2.professor_id = a.professor_id AND ac.curso_fk = OLD.curso_fk
+        ) END,
+        score_maximo = CASE WHEN a.score < score_maximo THEN score_maximo ELSE (
+            SELECT MAX(a2.score) FROM analises a2 JOIN analise_curso ac ON ac.analise_fk = a2.analise_id
+            WHERE a2.professor_id = a.professor_id AND ac.curso_fk = OLD.curso_fk
+        ) END,
+        adequadas = adequadas - (CASE WHEN a.adequado THEN 1 ELSE 0 END),
+        histograma = json_set(
+            histograma, '$[' || MIN(a.score / 10, 9) || ']',
+            json_extract(histograma, '$[' || MIN(a.score / 10, 9) || ']') - 1
+        ),
+        updated_at = {NOW_SQL}
+    FROM (SELECT professor_id, score, adequado FROM analises WHERE analise_id = OLD.analise_fk) AS a
+    WHERE estatisticas_curso_professor.professor_id = a.professor_id
+      AND estatisticas_curso_professor.curso_fk = OLD.curso_fk;
+END;
+
+-- ==================== BUSCA (ÍNDICE INVERTIDO) ====================
+
+-- Termos sem acento (text_normalization.tokenize) com peso por campo;
+-- tipo 'analise' (aluno, disciplinas da ementa, texto) ou 'ementa' (disciplinas)
+CREATE TABLE IF NOT EXISTS busca_termos (
+    tipo TEXT NOT NULL,
+    termo TEXT NOT NULL,
+    doc_id INTEGER NOT NULL,
+    peso REAL NOT NULL,
+    PRIMARY KEY (tipo, termo, doc_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_busca_termos_doc ON busca_termos(tipo, doc_id);
+
+CREATE TRIGGER IF NOT EXISTS trg_busca_analises_delete AFTER DELETE ON analises BEGIN
+    DELETE FROM busca_termos WHERE tipo = 'analise' AND doc_id = OLD.analise_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_busca_ementas_delete AFTER DELETE ON ementas BEGIN
+    DELETE FROM busca_termos WHERE tipo = 'ementa' AND doc_id = OLD.id_ementa;
+END;
+"""
+
+# Colunas BOOLEAN (SQLite devolve 0/1)
+BOOLEAN_COLUMNS = {'adequado'}
+
+# Colunas usadas nas listagens/grids de análises (mesmas do ANALISE_LIST_COLUMNS do Supabase)
+ANALISE_LIST_COLUMNS = "a.analise_id, a.nome_aluno, a.score, a.adequado, a.materias_restantes, a.ementa_fk, a.professor_id, a.created_at"
+
+# Peso de cada campo na busca de análises (nome do aluno pesa mais que o texto da análise)
+PESOS_BUSCA_ANALISE = (('nome_aluno', 3.0), ('disciplinas', 2.0), ('texto_analise', 1.0))
+# Termo da consulta que é só prefixo do termo indexado ("calc" -> "calculo") vale menos
+PESO_PREFIXO = 0.5
+
+# Faixas de score do histograma em estatisticas_curso_professor (0-9, ..., 90-100)
+FAIXAS_HISTOGRAMA = 10
+
+
+def _pesos_termos(campos: Iterable[Tuple[str, float]]) -> Dict[str, float]:
+    """Termo -> peso (peso do campo x (1 + log tf)), somado entre os campos"""
+    pesos: Dict[str, float] = {}
+    for texto, peso in campos:
+        for termo, ocorrencias in Counter(tokenize(texto or '', keep_numbers=True)).items():
+            pesos[termo] = pesos.get(termo, 0.0) + peso * (1.0 + math.log(ocorrencias))
+    return pesos
+
+
+class SQLiteDatabase:
+    """Banco local com a mesma interface usada pelo SupabaseDatabase no modo offline"""
+
+    def __init__(self, db_path: str = 'src/data/database/nexus.db'):
+        """
+        Abre (ou cria) o banco
+
+        Args:
+            db_path: Caminho do arquivo SQLite (":memory:" para um banco temporário)
+        """
+        self.db_path = db_path
+        if db_path != ':memory:':
+            os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+
+        # Uma conexão compartilhada entre as threads do Streamlit, serializada pelo lock
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA_SQL)
+        self._columns: Dict[str, List[str]] = {}
+
+        # Bancos criados antes do índice de busca: indexar o que já existe
+        if not self._row("SELECT 1 FROM busca_termos LIMIT 1") and self._row("SELECT 1 FROM analises LIMIT 1"):
+            self.reindex_search()
+        if not self._row("SELECT 1 FROM estatisticas_curso_professor LIMIT 1") and self._row("SELECT 1 FROM analise_curso LIMIT 1"):
+            self.rebuild_course_stats()
+
+    # ==================== INFRAESTRUTURA ====================
+
+    @contextmanager
+    def transaction(self):
+        """Agrupa várias escritas em uma única transação (um único fsync)"""
+        with self._lock:
+            if self.conn.in_transaction:
+                yield self.conn
+                return
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def _to_dict(self, row: sqlite3.Row) -> Dict:
+        data = dict(row)
+        for column in BOOLEAN_COLUMNS & data.keys():
+            if data[column] is not None:
+                data[column] = bool(data[column])
+        return data
+
+    def _rows(self, sql: str, params: Iterable = ()) -> List[Dict]:
+        with self._lock:
+            return [self._to_dict(row) for row in self.conn.execute(sql, tuple(params)).fetchall()]
+
+    def _row(self, sql: str, params: Iterable = ()) -> Optional[Dict]:
+        rows = self._rows(sql, params)
+        return rows[0] if rows else None
+
+    def _execute(self, sql: str, params: Iterable = ()) -> int:
+        """Executa uma escrita e devolve o número de linhas afetadas"""
+        with self.transaction():
+            return self.conn.execute(sql, tuple(params)).rowcount
+
+    def _table_columns(self, table: str) -> List[str]:
+        if table not in self._columns:
+            with self._lock:
+                self._columns[table] = [row['name'] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+        return self._columns[table]
+
+    def _insert(self, table: str, data: Dict, or_ignore: bool = False) -> Optional[Dict]:
+        """Insere uma linha (ignorando chaves que não são colunas) e devolve a linha gravada"""
+        columns = [column for column in data if column in self._table_columns(table)]
+        sql = (
+            f"INSERT {'OR IGNORE ' if or_ignore else ''}INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})"
+        )
+        with self.transaction():
+            cursor = self.conn.execute(sql, [data[column] for column in columns])
+            if cursor.rowcount == 0:
+                return None
+            return self._to_dict(self.conn.execute(
+                f"SELECT * FROM {table} WHERE rowid = ?", (cursor.lastrowid,)
+            ).fetchone())
+
+    # ==================== AUTENTICAÇÃO E LOGIN ====================
+
+    def get_professor_by_email(self, email_educacional: str) -> Optional[Dict]:
+        """Busca professor por email educacional para autenticação"""
+        return self._row("SELECT * FROM professores WHERE email_educacional = ?", (email_educacional,))
+
+    def get_professor(self, prontuario: str) -> Optional[Dict]:
+        """Busca professor por prontuário"""
+        return self._row("SELECT * FROM professores WHERE prontuario = ?", (prontuario,))
+
+    def authenticate_professor(self, email_educacional: str, senha: str) -> Optional[Dict]:
+        """Autentica professor por email e senha"""
+        return self._row(
+            "SELECT * FROM professores WHERE email_educacional = ? AND senha = ?", (email_educacional, senha)
+        )
+
+    def verify_email_exists(self, email_educacional: str) -> bool:
+        """Verifica se email já existe para cadastro"""
+        return self.get_professor_by_email(email_educacional) is not None
+
+    def verify_prontuario_exists(self, prontuario: str) -> bool:
+        """Verifica se prontuário já existe para cadastro"""
+        return self.get_professor(prontuario) is not None
+
+    def create_professor(self, professor_data: Dict) -> Optional[Dict]:
+        """Cria um novo professor"""
+        return self._insert("professores", professor_data)
+
+    # ==================== CONFIGURAÇÕES DE PERFIL ====================
+
+    def get_professor_profile(self, prontuario: str) -> Optional[Dict]:
+        """Busca dados completos do perfil do professor"""
+        professor = self.get_professor(prontuario)
+        if not professor:
+            return None
+        professor['cursos'] = self.get_professor_courses(prontuario)
+        return professor
+
+    def get_professor_courses(self, prontuario: str) -> List[Dict]:
+        """Busca todos os cursos associados ao professor"""
+        return self._rows(
+            """
+            SELECT c.* FROM professor_curso pc
+            JOIN cursos c ON c.codigo_curso = pc.curso_fk
+            WHERE pc.prontuario_professor = ?
+            ORDER BY pc.pc_id
+            """,
+            (prontuario,)
+        )
+
+    def get_professor_disciplines(self, prontuario: str) -> List[Dict]:
+        """Busca todas as disciplinas ministradas pelo professor"""
+        return self._rows(
+            """
+            SELECT d.*, c.nome AS curso FROM professor_curso pc
+            JOIN cursos c ON c.codigo_curso = pc.curso_fk
+            JOIN cursos_disciplina cd ON cd.curso_fk = pc.curso_fk
+            JOIN disciplinas d ON d.id_disciplina = cd.disciplina_fk
+            WHERE pc.prontuario_professor = ?
+            ORDER BY pc.pc_id, cd.cd_id
+            """,
+            (prontuario,)
+        )
+
+    # ==================== CURSOS E DISCIPLINAS ====================
+
+    def get_curso_by_codigo(self, codigo_curso: str) -> Optional[Dict]:
+        """Busca curso por código"""
+        return self._row("SELECT * FROM cursos WHERE codigo_curso = ?", (codigo_curso,))
+
+    def get_all_cursos(self) -> List[Dict]:
+        """Busca todos os cursos cadastrados"""
+        return self._rows("SELECT * FROM cursos ORDER BY codigo_curso")
+
+    def create_curso(self, curso_data: Dict) -> Optional[Dict]:
+        """Cria um novo curso"""
+        return self._insert("cursos", curso_data)
+
+    def get_curso_disciplines(self, codigo_curso: str) -> List[Dict]:
+        """Busca todas as disciplinas de um curso"""
+        return self._rows(
+            """
+            SELECT d.* FROM cursos_disciplina cd
+            JOIN disciplinas d ON d.id_disciplina = cd.disciplina_fk
+            WHERE cd.curso_fk = ?
+            ORDER BY cd.cd_id
+            """,
+            (codigo_curso,)
+        )
+
+    def get_disciplina_by_id(self, id_disciplina: str) -> Optional[Dict]:
+        """Busca disciplina por ID"""
+        return self._row("SELECT * FROM disciplinas WHERE id_disciplina = ?", (id_disciplina,))
+
+    def get_all_disciplinas(self) -> List[Dict]:
+        """Busca todas as disciplinas cadastradas"""
+        return self._rows("SELECT * FROM disciplinas ORDER BY id_disciplina")
+
+    def create_disciplina(self, disciplina_data: Dict) -> Optional[Dict]:
+        """Cria uma nova disciplina"""
+        return self._insert("disciplinas", disciplina_data)
+
+    def get_curso_tags(self, codigo_curso: str) -> List[Dict]:
+        """Busca todas as tags de um curso"""
+        return self._rows(
+            "SELECT t.* FROM curso_tags ct JOIN tags t ON t.id_tag = ct.tag_fk WHERE ct.curso_fk = ? ORDER BY ct.ct_id",
+            (codigo_curso,)
+        )
+
+    def get_tag_by_id(self, id_tag: int) -> Optional[Dict]:
+        """Busca tag por ID"""
+        return self._row("SELECT * FROM tags WHERE id_tag = ?", (id_tag,))
+
+    def get_all_tags(self) -> List[Dict]:
+        """Busca todas as tags cadastradas"""
+        return self._rows("SELECT * FROM tags ORDER BY id_tag")
+
+    # ==================== EMENTAS ====================
+
+    def get_ementa_by_id(self, id_ementa: int) -> Optional[Dict]:
+        """Busca ementa por ID"""
+        return self._row("SELECT * FROM ementas WHERE id_ementa = ?", (id_ementa,))
+
+    def get_ementa_by_drive_id(self, drive_id: str) -> Optional[Dict]:
+        """Busca ementa por drive_id"""
+        return self._row("SELECT * FROM ementas WHERE drive_id = ? LIMIT 1", (drive_id,))
+
+    def get_ementa_by_hash(self, hash_conteudo: str, professor_id: str = None) -> Optional[Dict]:
+        """Busca ementa pelo SHA256 do conteúdo do PDF (usa idx_ementas_hash_conteudo)"""
+        if professor_id:
+            return self._row(
+                "SELECT * FROM ementas WHERE professor_id = ? AND hash_conteudo = ? LIMIT 1",
+                (professor_id, hash_conteudo)
+            )
+        return self._row("SELECT * FROM ementas WHERE hash_conteudo = ? LIMIT 1", (hash_conteudo,))
+
+    def create_ementa(self, ementa_data: Dict) -> Optional[Dict]:
+        """Cria uma nova ementa"""
+        return self._insert("ementas", ementa_data)
+
+    def get_ementa_disciplines(self, id_ementa: int) -> List[Dict]:
+        """Busca todas as disciplinas associadas a uma ementa"""
+        return self._rows(
+            """
+            SELECT d.* FROM ementa_disciplina ed
+            JOIN disciplinas d ON d.id_disciplina = ed.disciplina_fk
+            WHERE ed.ementa_fk = ?
+            ORDER BY ed.ed_id
+            """,
+            (id_ementa,)
+        )
+
+    def get_ementa_complete(self, id_ementa: int) -> Optional[Dict]:
+        """Busca ementa completa com suas disciplinas"""
+        ementa_data = self.get_ementa_by_id(id_ementa)
+        if not ementa_data:
+            return None
+        ementa_data['disciplinas'] = self.get_ementa_disciplines(id_ementa)
+        return ementa_data
+
+    # ==================== ANÁLISES ====================
+
+    def get_analise_by_id(self, analise_id: int) -> Optional[Dict]:
+        """Busca análise por ID"""
+        return self._row("SELECT * FROM analises WHERE analise_id = ?", (analise_id,))
+
+    def get_analises_by_ementa(self, ementa_fk: int) -> List[Dict]:
+        """Busca todas as análises de uma ementa"""
+        return self._rows("SELECT * FROM analises WHERE ementa_fk = ? ORDER BY analise_id", (ementa_fk,))
+
+    def get_analises_by_professor(self, prontuario_professor: str) -> List[Dict]:
+        """Busca todas as análises feitas por um professor"""
+        return self._rows("SELECT * FROM analises WHERE professor_id = ? ORDER BY analise_id", (prontuario_professor,))
+
+    def list_analises_indexaveis(self, prontuario_professor: str, limit: int = 500,
+                                 cursor: Optional[int] = None) -> Dict:
+        """Página das análises do professor para o índice de similaridade (keyset em analise_id)"""
+        analises = self._rows(
+            """
+            SELECT analise_id, ementa_fk, nome_aluno, artefato_hash,
+                   CASE WHEN artefato_hash IS NULL THEN dados_estruturados_json END AS dados_estruturados_json
+            FROM analises
+            WHERE professor_id = ? AND analise_id > ?
+            ORDER BY analise_id
+            LIMIT ?
+            """,
+            (prontuario_professor, int(cursor) if cursor is not None else 0, limit)
+        )
+        proximo_cursor = analises[-1]['analise_id'] if len(analises) == limit else None
+        return {'analises': analises, 'proximo_cursor': proximo_cursor}
+
+    def get_all_analises(self) -> List[Dict]:
+        """Busca todas as análises"""
+        return self._rows("SELECT * FROM analises ORDER BY analise_id")
+
+    def get_analises_by_curso(self, codigo_curso: str) -> List[Dict]:
+        """Busca todas as análises vinculadas a um curso (tabela analise_curso)"""
+        return self._rows(
+            """
+            SELECT a.* FROM analise_curso ac
+            JOIN analises a ON a.analise_id = ac.analise_fk
+            WHERE ac.curso_fk = ?
+            ORDER BY a.analise_id
+            """,
+            (codigo_curso,)
+        )
+
+    def get_analises_by_curso_and_professor(self, codigo_curso: str, prontuario_professor: str) -> List[Dict]:
+        """Busca análises de um curso feitas por um professor, com dados da ementa"""
+        analises = self._rows(
+            """
+            SELECT a.*, e.file_name, e.data_upload FROM analise_curso ac
+            JOIN analises a ON a.analise_id = ac.analise_fk
+            LEFT JOIN ementas e ON e.id_ementa = a.ementa_fk
+            WHERE ac.curso_fk = ? AND a.professor_id = ?
+            ORDER BY a.created_at DESC, a.analise_id DESC
+            """,
+            (codigo_curso, prontuario_professor)
+        )
+        # Mesmo formato do embed do PostgREST (ementas!analises_ementa_fk_fkey)
+        for analise in analises:
+            analise['ementas'] = {'file_name': analise.pop('file_name'), 'data_upload': analise.pop('data_upload')}
+        return analises
+
+    def get_analise_complete(self, analise_id: int) -> Optional[Dict]:
+        """Busca análise completa com dados da ementa e professor"""
+        analise_data = self.get_analise_by_id(analise_id)
+        if not analise_data:
+            return None
+        analise_data['ementa'] = self.get_ementa_complete(analise_data['ementa_fk'])
+        analise_data['professor'] = self.get_professor(analise_data['professor_id'])
+        return analise_data
+
+    def create_analise(self, analise_data: Dict, curso_codigo: str = None) -> Optional[Dict]:
+        """Cria uma análise e, se informado, o vínculo com o curso (na mesma transação)"""
+        criadas = self.create_analises_bulk([analise_data], curso_codigo)
+        return criadas[0] if criadas else None
+
+    def create_analises_bulk(self, rows: List[Dict], curso_codigo: str = None) -> List[Dict]:
+        """Cria várias análises e seus vínculos com o curso em uma única transação"""
+        with self.transaction():
+            criadas = [self._insert("analises", row) for row in rows]
+            if curso_codigo:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO analise_curso (analise_fk, curso_fk) VALUES (?, ?)",
+                    [(analise['analise_id'], curso_codigo) for analise in criadas]
+                )
+            self._index_analises([analise['analise_id'] for analise in criadas])
+        return criadas
+
+    def create_analise_curso_relacionamento(self, analise_id: int, curso_codigo: str) -> bool:
+        """Cria relacionamento entre análise e curso (idempotente)"""
+        self._execute(
+            "INSERT OR IGNORE INTO analise_curso (analise_fk, curso_fk) VALUES (?, ?)", (analise_id, curso_codigo)
+        )
+        return True
+
+    def get_analise_cursos(self, analise_id: int) -> List[Dict]:
+        """Busca todos os cursos relacionados a uma análise"""
+        return self._rows(
+            """
+            SELECT c.codigo_curso, c.nome, c.descricao_curso FROM analise_curso ac
+            JOIN cursos c ON c.codigo_curso = ac.curso_fk
+            WHERE ac.analise_fk = ?
+            ORDER BY ac.ac_id
+            """,
+            (analise_id,)
+        )
+
+    def find_existing_analises(self, ementa_ids: List[int], curso_codigo: str) -> Dict[int, Dict]:
+        """ementa_id -> análise mais recente vinculada ao curso, para as ementas informadas"""
+        ementa_ids = list(dict.fromkeys(ementa_ids))
+        existentes = {}
+        # Limite de variáveis do SQLite: consultas em lotes
+        for start in range(0, len(ementa_ids), 500):
+            chunk = ementa_ids[start:start + 500]
+            for analise in self._rows(
+                f"""
+                SELECT a.analise_id, a.ementa_fk, a.nome_aluno, a.score, a.adequado, a.professor_id, a.created_at
+                FROM analises a
+                JOIN analise_curso ac ON ac.analise_fk = a.analise_id AND ac.curso_fk = ?
+                WHERE a.ementa_fk IN ({', '.join('?' for _ in chunk)})
+                ORDER BY a.created_at DESC, a.analise_id DESC
+                """,
+                [curso_codigo, *chunk]
+            ):
+                existentes.setdefault(analise['ementa_fk'], analise)
+        return existentes
+
+    def list_analises_curso_professor(self, codigo_curso: str, prontuario_professor: str, limit: int = 50,
+                                      cursor: Optional[List] = None) -> Dict:
+        """Página do histórico do curso, mais recentes primeiro (keyset em created_at, analise_id)"""
+        params: List[Any] = [codigo_curso, prontuario_professor]
+        keyset = ""
+        if cursor:
+            keyset = "AND (a.created_at < ? OR (a.created_at = ? AND a.analise_id < ?))"
+            params += [cursor[0], cursor[0], int(cursor[1])]
+
+        analises = self._rows(
+            f"""
+            SELECT {ANALISE_LIST_COLUMNS} FROM analises a
+            JOIN analise_curso ac ON ac.analise_fk = a.analise_id AND ac.curso_fk = ?
+            WHERE a.professor_id = ? {keyset}
+            ORDER BY a.created_at DESC, a.analise_id DESC
+            LIMIT ?
+            """,
+            params + [limit]
+        )
+
+        proximo_cursor = None
+        if len(analises) == limit:
+            ultima = analises[-1]
+            proximo_cursor = [ultima['created_at'], ultima['analise_id']]
+        return {'analises': analises, 'proximo_cursor': proximo_cursor}
+
+    def get_estatisticas_por_curso(self, prontuario_professor: str) -> List[Dict]:
+        """Estatísticas das análises do professor agrupadas por curso (mesmas colunas da RPC do Supabase)"""
+        return self._rows(
+            """
+            SELECT c.codigo_curso, c.nome, c.descricao_curso,
+                   e.total_analises,
+                   ROUND(CAST(e.soma_score AS REAL) / e.total_analises, 2) AS media_score,
+                   e.score_minimo,
+                   e.score_maximo,
+                   e.adequadas,
+                   e.total_analises - e.adequadas AS inadequadas
+            FROM estatisticas_curso_professor e
+            JOIN cursos c ON c.codigo_curso = e.curso_fk
+            WHERE e.professor_id = ? AND e.total_analises > 0
+            ORDER BY e.total_analises DESC
+            """,
+            (prontuario_professor,)
+        )
+
+    def get_course_dashboard_stats(self, codigo_curso: str, prontuario_professor: str) -> Optional[Dict]:
+        """Agregados do professor no curso (linha de estatisticas_curso_professor), com o histograma como lista"""
+        linha = self._row(
+            "SELECT * FROM estatisticas_curso_professor WHERE professor_id = ? AND curso_fk = ?",
+            (prontuario_professor, codigo_curso)
+        )
+        if linha:
+            linha['histograma'] = json.loads(linha['histograma'])
+        return linha
+
+    def rebuild_course_stats(self):
+        """Recalcula estatisticas_curso_professor a partir das análises (os gatilhos mantêm dali em diante)"""
+        histograma = ", ".join(
+            f"SUM(CASE WHEN MIN(a.score / 10, {FAIXAS_HISTOGRAMA - 1}) = {faixa} THEN 1 ELSE 0 END)"
+            for faixa in range(FAIXAS_HISTOGRAMA)
+        )
+        with self.transaction():
+            self.conn.execute("DELETE FROM estatisticas_curso_professor")
+            self.conn.execute(
+                f"""
+                INSERT INTO estatisticas_curso_professor (
+                    professor_id, curso_fk, total_analises, soma_score, soma_quadrados,
+                    score_minimo, score_maximo, adequadas, histograma
+                )
+                SELECT a.professor_id, ac.curso_fk, COUNT(*), SUM(a.score), SUM(a.score * a.score),
+                       MIN(a.score), MAX(a.score), SUM(CASE WHEN a.adequado THEN 1 ELSE 0 END),
+                       json_array({histograma})
+                FROM analises a
+                JOIN analise_curso ac ON ac.analise_fk = a.analise_id
+                WHERE a.professor_id IS NOT NULL
+                GROUP BY a.professor_id, ac.curso_fk
+                """
+            )
+
+    def update_analise_comentario(self, analise_id: int, comentario: str, prontuario_professor: str) -> bool:
+        """Atualiza o comentário de uma análise do professor"""
+        return self._execute(
+            f"UPDATE analises SET comentario = ?, updated_at = {NOW_SQL} WHERE analise_id = ? AND professor_id = ?",
+            (comentario or None, analise_id, prontuario_professor)
+        ) > 0
+
+    # ==================== HISTÓRICO ====================
+
+    def get_professor_history(self, prontuario_professor: str) -> List[Dict]:
+        """Busca histórico completo de análises do professor (mais recente primeiro)"""
+        historico = [
+            self.get_analise_complete(analise['analise_id'])
+            for analise in self._rows(
+                "SELECT analise_id FROM analises WHERE professor_id = ? ORDER BY created_at DESC, analise_id DESC",
+                (prontuario_professor,)
+            )
+        ]
+        return [analise for analise in historico if analise]
+
+    def get_ementa_history(self, ementa_fk: int) -> List[Dict]:
+        """Busca histórico de análises de uma ementa específica (mais recente primeiro)"""
+        historico = [
+            self.get_analise_complete(analise['analise_id'])
+            for analise in self._rows(
+                "SELECT analise_id FROM analises WHERE ementa_fk = ? ORDER BY created_at DESC, analise_id DESC",
+                (ementa_fk,)
+            )
+        ]
+        return [analise for analise in historico if analise]
+
+    # ==================== FILTRAGEM AMPLA ====================
+
+    def _ementas_completas(self, sql: str, params: Iterable = ()) -> List[Dict]:
+        ementas = [self.get_ementa_complete(row['id_ementa']) for row in self._rows(sql, params)]
+        return [ementa for ementa in ementas if ementa]
+
+    def filter_ementas_by_curso(self, codigo_curso: str) -> List[Dict]:
+        """Filtra ementas por curso (através das disciplinas do curso)"""
+        return self._ementas_completas(
+            """
+            SELECT DISTINCT ed.ementa_fk AS id_ementa FROM cursos_disciplina cd
+            JOIN ementa_disciplina ed ON ed.disciplina_fk = cd.disciplina_fk
+            WHERE cd.curso_fk = ?
+            ORDER BY ed.ementa_fk
+            """,
+            (codigo_curso,)
+        )
+
+    def filter_ementas_by_disciplina(self, id_disciplina: str) -> List[Dict]:
+        """Filtra ementas por disciplina"""
+        return self._ementas_completas(
+            "SELECT ementa_fk AS id_ementa FROM ementa_disciplina WHERE disciplina_fk = ? ORDER BY ed_id",
+            (id_disciplina,)
+        )
+
+    def filter_ementas_by_tag(self, tag_id: int) -> List[Dict]:
+        """Filtra ementas por tag (através dos cursos)"""
+        return self._ementas_completas(
+            """
+            SELECT DISTINCT ed.ementa_fk AS id_ementa FROM curso_tags ct
+            JOIN cursos_disciplina cd ON cd.curso_fk = ct.curso_fk
+            JOIN ementa_disciplina ed ON ed.disciplina_fk = cd.disciplina_fk
+            WHERE ct.tag_fk = ?
+            ORDER BY ed.ementa_fk
+            """,
+            (tag_id,)
+        )
+
+    def search_ementas_by_name(self, nome_disciplina: str, limit: int = 50) -> List[Dict]:
+        """Busca ementas por nome da disciplina (índice invertido, sem acento, mais relevantes primeiro)"""
+        ranking = self._search_ids('ementa', nome_disciplina, limit)
+        ementas = [self.get_ementa_complete(id_ementa) for id_ementa, _ in ranking]
+        return [ementa for ementa in ementas if ementa]
+
+    def get_recent_ementas(self, limit: int = 10) -> List[Dict]:
+        """Busca ementas mais recentes"""
+        return self._rows("SELECT * FROM ementas ORDER BY data_upload DESC LIMIT ?", (limit,))
+
+    # ==================== RELACIONAMENTOS ====================
+
+    def create_professor_curso_relationship(self, prontuario_professor: str, codigo_curso: str) -> bool:
+        """Cria relacionamento entre professor e curso (False se já existia)"""
+        return self._insert(
+            "professor_curso", {'prontuario_professor': prontuario_professor, 'curso_fk': codigo_curso}, or_ignore=True
+        ) is not None
+
+    def create_curso_disciplina_relationship(self, codigo_curso: str, id_disciplina: str) -> bool:
+        """Cria relacionamento entre curso e disciplina"""
+        return self._insert(
+            "cursos_disciplina", {'curso_fk': codigo_curso, 'disciplina_fk': id_disciplina}, or_ignore=True
+        ) is not None
+
+    def create_ementa_disciplina_relationship(self, id_ementa: int, id_disciplina: str) -> bool:
+        """Cria relacionamento entre ementa e disciplina"""
+        with self.transaction():
+            criado = self._insert(
+                "ementa_disciplina", {'ementa_fk': id_ementa, 'disciplina_fk': id_disciplina}, or_ignore=True
+            ) is not None
+            if criado:
+                # Os nomes das disciplinas entram nos termos da ementa e das suas análises
+                self._index_ementas([id_ementa])
+                self._index_analises([
+                    row['analise_id'] for row in self._rows(
+                        "SELECT analise_id FROM analises WHERE ementa_fk = ?", (id_ementa,)
+                    )
+                ])
+        return criado
+
+    # ==================== BUSCA ====================
+
+    def _replace_terms(self, tipo: str, documentos: Dict[int, Dict[str, float]]):
+        self.conn.executemany(
+            "DELETE FROM busca_termos WHERE tipo = ? AND doc_id = ?", [(tipo, doc_id) for doc_id in documentos]
+        )
+        self.conn.executemany(
+            "INSERT INTO busca_termos (tipo, termo, doc_id, peso) VALUES (?, ?, ?, ?)",
+            [(tipo, termo, doc_id, peso) for doc_id, pesos in documentos.items() for termo, peso in pesos.items()]
+        )
+
+    def _index_analises(self, analise_ids: Optional[List[int]] = None):
+        """(Re)indexa análises para a busca; None reindexa todas"""
+        if analise_ids is not None and not analise_ids:
+            return
+        filtro, params = "", []
+        if analise_ids is not None:
+            filtro = f"WHERE a.analise_id IN ({', '.join('?' for _ in analise_ids)})"
+            params = list(analise_ids)
+        linhas = self._rows(
+            f"""
+            SELECT a.analise_id, a.nome_aluno, a.texto_analise, GROUP_CONCAT(d.nome, ' ') AS disciplinas
+            FROM analises a
+            LEFT JOIN ementa_disciplina ed ON ed.ementa_fk = a.ementa_fk
+            LEFT JOIN disciplinas d ON d.id_disciplina = ed.disciplina_fk
+            {filtro}
+            GROUP BY a.analise_id
+            """,
+            params
+        )
+        with self.transaction():
+            self._replace_terms('analise', {
+                linha['analise_id']: _pesos_termos((linha[campo], peso) for campo, peso in PESOS_BUSCA_ANALISE)
+                for linha in linhas
+            })
+
+    def _index_ementas(self, ementa_ids: Optional[List[int]] = None):
+        """(Re)indexa ementas pelos nomes das suas disciplinas; None reindexa todas"""
+        if ementa_ids is not None and not ementa_ids:
+            return
+        filtro, params = "", []
+        if ementa_ids is not None:
+            filtro = f"WHERE e.id_ementa IN ({', '.join('?' for _ in ementa_ids)})"
+            params = list(ementa_ids)
+        linhas = self._rows(
+            f"""
+            SELECT e.id_ementa, GROUP_CONCAT(d.nome, ' ') AS disciplinas
+            FROM ementas e
+            LEFT JOIN ementa_disciplina ed ON ed.ementa_fk = e.id_ementa
+            LEFT JOIN disciplinas d ON d.id_disciplina = ed.disciplina_fk
+            {filtro}
+            GROUP BY e.id_ementa
+            """,
+            params
+        )
+        with self.transaction():
+            self._replace_terms('ementa', {
+                linha['id_ementa']: _pesos_termos([(linha['disciplinas'], 1.0)]) for linha in linhas
+            })
+
+    def reindex_search(self):
+        """Reconstrói todo o índice de busca"""
+        with self.transaction():
+            self.conn.execute("DELETE FROM busca_termos")
+            self._index_analises()
+            self._index_ementas()
+
+    def _search_sql(self, tipo: str, consulta: str) -> Tuple[str, List, int]:
+        """
+        CTE `ranking(doc_id, relevancia)` com os documentos que contêm todos os termos da consulta
+
+        Cada termo casa por igualdade ou como prefixo de um termo indexado
+        (faixa [termo, termo + '{') na chave primária).
+        """
+        termos = list(dict.fromkeys(tokenize(consulta or '', keep_numbers=True)))
+        partes, params = [], []
+        for termo in termos:
+            partes.append(
+                "SELECT doc_id, MAX(peso * CASE WHEN termo = ? THEN 1.0 ELSE ? END) AS relevancia "
+                "FROM busca_termos WHERE tipo = ? AND termo >= ? AND termo < ? GROUP BY doc_id"
+            )
+            params += [termo, PESO_PREFIXO, tipo, termo, termo + '{']
+        sql = (
+            f"casamentos AS ({' UNION ALL '.join(partes)}), "
+            "ranking AS (SELECT doc_id, SUM(relevancia) AS relevancia FROM casamentos "
+            "GROUP BY doc_id HAVING COUNT(*) = ?)"
+        )
+        return sql, params + [len(termos)], len(termos)
+
+    def _search_ids(self, tipo: str, consulta: str, limit: int) -> List[Tuple[int, float]]:
+        cte, params, total_termos = self._search_sql(tipo, consulta)
+        if not total_termos:
+            return []
+        return [
+            (row['doc_id'], row['relevancia']) for row in self._rows(
+                f"WITH {cte} SELECT doc_id, relevancia FROM ranking ORDER BY relevancia DESC, doc_id DESC LIMIT ?",
+                params + [limit]
+            )
+        ]
+
+    def search_analises(self, prontuario_professor: str, consulta: str, curso_codigo: str = None,
+                        limit: int = 20) -> List[Dict]:
+        """
+        Busca análises do professor por nome do aluno, disciplinas da ementa e texto da análise
+
+        Uma única consulta: casamento no índice invertido, filtro por professor/curso
+        e ordenação por relevância. Devolve as colunas da listagem e `relevancia`.
+        """
+        cte, params, total_termos = self._search_sql('analise', consulta)
+        if not total_termos:
+            return []
+        filtro_curso = ""
+        if curso_codigo:
+            filtro_curso = "AND EXISTS (SELECT 1 FROM analise_curso ac WHERE ac.analise_fk = a.analise_id AND ac.curso_fk = ?)"
+            params = params + [prontuario_professor, curso_codigo, limit]
+        else:
+            params = params + [prontuario_professor, limit]
+        return self._rows(
+            f"""
+            WITH {cte}
+            SELECT {ANALISE_LIST_COLUMNS}, ROUND(r.relevancia, 4) AS relevancia
+            FROM ranking r
+            JOIN analises a ON a.analise_id = r.doc_id
+            WHERE a.professor_id = ? {filtro_curso}
+            ORDER BY r.relevancia DESC, a.analise_id DESC
+            LIMIT ?
+            """,
+            params
+        )
+
+    # ==================== MÉTODOS DE DELETE ====================
+
+    def delete_analise(self, analise_id: int, prontuario_professor: str) -> bool:
+        """Deleta uma análise específica, verificando se o professor tem permissão"""
+        return self._execute(
+            "DELETE FROM analises WHERE analise_id = ? AND professor_id = ?", (analise_id, prontuario_professor)
+        ) > 0
+
+    def delete_analise_by_ementa(self, ementa_fk: int, prontuario_professor: str) -> bool:
+        """Deleta todas as análises de uma ementa feitas pelo professor"""
+        return self._execute(
+            "DELETE FROM analises WHERE ementa_fk = ? AND professor_id = ?", (ementa_fk, prontuario_professor)
+        ) > 0
+
+    def delete_ementa(self, id_ementa: int, prontuario_professor: str) -> bool:
+        """Deleta uma ementa do professor (análises e relacionamentos saem em cascata)"""
+        return self._execute(
+            "DELETE FROM ementas WHERE id_ementa = ? AND (professor_id = ? OR professor_id IS NULL)",
+            (id_ementa, prontuario_professor)
+        ) > 0
+
+    def delete_curso(self, codigo_curso: str, prontuario_professor: str) -> bool:
+        """Deleta um curso do professor e as ementas das suas disciplinas"""
+        with self.transaction():
+            if not self._row(
+                "SELECT 1 FROM professor_curso WHERE curso_fk = ? AND prontuario_professor = ?",
+                (codigo_curso, prontuario_professor)
+            ):
+                return False
+
+            self.conn.execute(
+                """
+                DELETE FROM ementas WHERE (professor_id = ? OR professor_id IS NULL) AND id_ementa IN (
+                    SELECT ed.ementa_fk FROM ementa_disciplina ed
+                    JOIN cursos_disciplina cd ON cd.disciplina_fk = ed.disciplina_fk
+                    WHERE cd.curso_fk = ?
+                )
+                """,
+                (prontuario_professor, codigo_curso)
+            )
+            self.conn.execute("DELETE FROM curso_tags WHERE curso_fk = ?", (codigo_curso,))
+            self.conn.execute("DELETE FROM cursos_disciplina WHERE curso_fk = ?", (codigo_curso,))
+            self.conn.execute(
+                "DELETE FROM professor_curso WHERE curso_fk = ? AND prontuario_professor = ?",
+                (codigo_curso, prontuario_professor)
+            )
+            # O curso só é removido quando não há mais professores associados
+            self.conn.execute(
+                "DELETE FROM cursos WHERE codigo_curso = ? AND NOT EXISTS "
+                "(SELECT 1 FROM professor_curso WHERE curso_fk = ?)",
+                (codigo_curso, codigo_curso)
+            )
+        return True
+
+    def delete_all_analises_professor(self, prontuario_professor: str) -> bool:
+        """Deleta todas as análises de um professor"""
+        return self._execute("DELETE FROM analises WHERE professor_id = ?", (prontuario_professor,)) > 0
+
+    def delete_professor_course_relationship(self, prontuario_professor: str, codigo_curso: str) -> bool:
+        """Remove a associação entre um professor e um curso"""
+        return self._execute(
+            "DELETE FROM professor_curso WHERE prontuario_professor = ? AND curso_fk = ?",
+            (prontuario_professor, codigo_curso)
+        ) > 0
+
+    def delete_disciplina_from_curso(self, codigo_curso: str, id_disciplina: str, prontuario_professor: str) -> bool:
+        """Remove uma disciplina de um curso (e as ementas da disciplina feitas pelo professor)"""
+        with self.transaction():
+            if not self._row(
+                "SELECT 1 FROM professor_curso WHERE curso_fk = ? AND prontuario_professor = ?",
+                (codigo_curso, prontuario_professor)
+            ):
+                return False
+            self.conn.execute(
+                """
+                DELETE FROM ementas WHERE (professor_id = ? OR professor_id IS NULL) AND id_ementa IN (
+                    SELECT ementa_fk FROM ementa_disciplina WHERE disciplina_fk = ?
+                )
+                """,
+                (prontuario_professor, id_disciplina)
+            )
+            return self.conn.execute(
+                "DELETE FROM cursos_disciplina WHERE curso_fk = ? AND disciplina_fk = ?", (codigo_curso, id_disciplina)
+            ).rowcount > 0
+
+    def delete_tag_from_curso(self, codigo_curso: str, tag_id: int, prontuario_professor: str) -> bool:
+        """Remove uma tag de um curso"""
+        with self.transaction():
+            if not self._row(
+                "SELECT 1 FROM professor_curso WHERE curso_fk = ? AND prontuario_professor = ?",
+                (codigo_curso, prontuario_professor)
+            ):
+                return False
+            return self.conn.execute(
+                "DELETE FROM curso_tags WHERE curso_fk = ? AND tag_fk = ?", (codigo_curso, tag_id)
+            ).rowcount > 0
+
+    # Anti-joins de órfãos: tabela, coluna de ID e condição NOT EXISTS
+    ORFAOS = {
+        'disciplinas': ('disciplinas', 'id_disciplina',
+                        "NOT EXISTS (SELECT 1 FROM cursos_disciplina cd WHERE cd.disciplina_fk = disciplinas.id_disciplina)"),
+        'tags': ('tags', 'id_tag',
+                 "NOT EXISTS (SELECT 1 FROM curso_tags ct WHERE ct.tag_fk = tags.id_tag)"),
+        'ementas': ('ementas', 'id_ementa',
+                    "NOT EXISTS (SELECT 1 FROM ementa_disciplina ed WHERE ed.ementa_fk = ementas.id_ementa)"
+                    " AND NOT EXISTS (SELECT 1 FROM analises a WHERE a.ementa_fk = ementas.id_ementa)"),
+    }
+
+    def cleanup_orphaned_data(self, dry_run: bool = False) -> Dict:
+        """
+        Limpa dados órfãos (sem relacionamentos válidos)
+
+        Ementas com análises são mantidas: o DELETE levaria as análises junto (ON DELETE CASCADE).
+
+        Args:
+            dry_run: Apenas relata o que seria removido, sem remover
+        """
+        ids = {}
+        with self.transaction():
+            for nome, (tabela, coluna, condicao) in self.ORFAOS.items():
+                ids[nome] = [linha[coluna] for linha in self._rows(f"SELECT {coluna} FROM {tabela} WHERE {condicao}")]
+                if ids[nome] and not dry_run:
+                    self.conn.execute(f"DELETE FROM {tabela} WHERE {condicao}")
+        return {
+            'disciplinas_removidas': len(ids['disciplinas']),
+            'tags_removidas': len(ids['tags']),
+            'ementas_removidas': len(ids['ementas']),
+            'dry_run': dry_run,
+            'ids': ids
+        }
+
+    # ==================== IMPORTAÇÃO ====================
+
+    def import_tinydb(self, dados_dir: str = 'src/data/database') -> Dict[str, int]:
+        """
+        Importa os arquivos JSON do banco TinyDB anterior (AnalyseDatabaseSeparado)
+
+        Linhas já existentes são mantidas. Em análises, `prontuario_professor`
+        vira `professor_id` e `curso_fk` vira um vínculo em analise_curso.
+
+        Returns:
+            Dict[str, int]: Linhas importadas por tabela
+        """
+        arquivos = [
+            ('professores.json', 'professores'), ('cursos.json', 'cursos'),
+            ('disciplinas.json', 'disciplinas'), ('tags.json', 'tags'), ('ementas.json', 'ementas'),
+            ('analises.json', 'analises'), ('professor_curso.json', 'professor_curso'),
+            ('curso_tags.json', 'curso_tags'), ('cursos_disciplina.json', 'cursos_disciplina'),
+            ('ementa_disciplina.json', 'ementa_disciplina')
+        ]
+        importados = {}
+        # Dados antigos podem ter referências quebradas: FKs desligadas durante a importação
+        self.conn.execute("PRAGMA foreign_keys=OFF")
+        try:
+            with self.transaction():
+                for arquivo, tabela in arquivos:
+                    caminho = os.path.join(dados_dir, arquivo)
+                    if not os.path.exists(caminho):
+                        continue
+                    with open(caminho, 'r', encoding='utf-8') as f:
+                        texto = f.read().strip()
+                    # Tabelas TinyDB nunca usadas ficam com o arquivo vazio
+                    conteudo = json.loads(texto) if texto else {}
+
+                    total = 0
+                    for doc_id, linha in conteudo.get('_default', {}).items():
+                        linha = dict(linha)
+                        if tabela == 'analises':
+                            linha.setdefault('analise_id', int(doc_id))
+                            linha.setdefault('professor_id', linha.get('prontuario_professor'))
+                        try:
+                            inserida = self._insert(tabela, linha, or_ignore=True)
+                        except sqlite3.IntegrityError as e:
+                            print(f"⚠️ Linha ignorada em {tabela}: {e}")
+                            continue
+                        if not inserida:
+                            continue
+                        total += 1
+                        if tabela == 'analises' and linha.get('curso_fk'):
+                            self.conn.execute(
+                                "INSERT OR IGNORE INTO analise_curso (analise_fk, curso_fk) VALUES (?, ?)",
+                                (inserida['analise_id'], linha['curso_fk'])
+                            )
+                    importados[tabela] = total
+                self.reindex_search()
+                self.rebuild_course_stats()
+        finally:
+            self.conn.execute("PRAGMA foreign_keys=ON")
+        return importados
+
+    def close(self):
+        """Fecha a conexão"""
+        with self._lock:
+            self.conn.close()
+
+
+def create_sqlite_database() -> SQLiteDatabase:
+    """
+    Factory function para criar o banco local
+
+    Usa SQLITE_DB_PATH (padrão: src/data/database/nexus.db). Na primeira
+    execução importa os dados do TinyDB, se existirem.
+    """
+    db_path = os.getenv("SQLITE_DB_PATH", "src/data/database/nexus.db")
+    novo = db_path == ':memory:' or not os.path.exists(db_path)
+    database = SQLiteDatabase(db_path)
+    if novo and db_path != ':memory:':
+        try:
+            importados = database.import_tinydb(os.path.dirname(db_path) or '.')
+            if any(importados.values()):
+                print(f"📦 Dados do TinyDB importados para o SQLite: {importados}")
+        except Exception as e:
+            print(f"⚠️ Erro ao importar dados do TinyDB: {e}")
+    return database
@@ -1,20 +1,58 @@
 """
 Sistema de banco de dados Supabase para o projeto Nexus Education
 """
-from typing import List, Dict, Optional
+from typing import Any, Callable, List, Dict, Optional
 from datetime import datetime
 import hashlib
+import json
+import math
+import time
+import uuid
 from supabase import Client
 
 from core.config.supabase_config import supabase_config
+from core.database.cache import reference_cache
+from core.database.async_supabase_database import async_database
+from core.database.artifacts import pack_structured_data, unpack_structured_data
+from core.database.write_queue import create_write_queue, is_connection_error
+
+# Intervalo mínimo entre tentativas automáticas de reaplicar a fila de escritas (segundos)
+SYNC_INTERVAL = 30
+
+# Colunas usadas nas listagens/grids de análises (sem os textos longos)
+ANALISE_LIST_COLUMNS = "analise_id, nome_aluno, score, adequado, materias_restantes, ementa_fk, professor_id, created_at"
+
 
 class SupabaseDatabase:
     """Classe para operações com banco de dados Supabase"""
     
-    def __init__(self):
+    def __init__(self, client: Optional[Client] = None, cache=None):
+        """
+        Args:
+            client: Cliente já criado, usado para leitura e escrita (ex.: o PostgREST
+                falso dos benchmarks). Sem ele, os clientes vêm de supabase_config.
+            cache: Cache de dados de referência (padrão: o global, compartilhado entre sessões)
+        """
+        # Cache de dados de referência, compartilhado entre sessões
+        self.cache = cache if cache is not None else reference_cache
+        # Fachada assíncrona (consultas independentes em paralelo); None no modo offline
+        self.aio = None
+        # Fila durável das escritas que falharam por rede; None no modo offline
+        self.write_queue = None
+        self._ultima_tentativa_sync = 0.0
+        # Banco sem a coluna chave_idempotencia (migração 9): gravações com insert simples
+        self._sem_chave_idempotencia = False
+        
+        # Cliente injetado: sem fachada assíncrona nem fila de escritas
+        if client is not None:
+            self.client = client
+            self.service_client = client
+            self.use_supabase = True
+            return
+        
         # Verificar se Supabase está configurado
         if supabase_config.offline_mode:
-            self._init_tinydb_fallback()
+            self._init_offline_fallback()
             return
             
         try:
@@ -25,24 +63,31 @@ class SupabaseDatabase:
             if self.client:
                 # Marcar que estamos usando Supabase
                 self.use_supabase = True
+                self.aio = async_database
                 if not self.service_client:
                     print("⚠️ SUPABASE_SERVICE_ROLE_KEY não configurada - usando anon key (algumas operações podem ter limitações)")
+                try:
+                    self.write_queue = create_write_queue()
+                except Exception as e:
+                    print(f"⚠️ Fila de escritas offline indisponível: {e}")
             else:
-                self._init_tinydb_fallback()
+                self._init_offline_fallback()
                 return
                 
         except Exception as e:
             print(f"⚠️ Erro ao inicializar Supabase: {e}")
-            self._init_tinydb_fallback()
+            self._init_offline_fallback()
     
-    def _init_tinydb_fallback(self):
-        """Inicializa TinyDB como fallback quando Supabase não está disponível"""
+    def _init_offline_fallback(self):
+        """Inicializa o banco local (SQLite) como fallback quando Supabase não está disponível"""
         try:
-            from core.database.database_separado import AnalyseDatabaseSeparado
-            self.tinydb = AnalyseDatabaseSeparado()
+            from core.database.sqlite_database import create_sqlite_database
+            self.local_db = create_sqlite_database()
+            self.client = None
+            self.service_client = None
             self.use_supabase = False
         except Exception as e:
-            print(f"❌ Erro ao inicializar TinyDB: {e}")
+            print(f"❌ Erro ao inicializar banco local: {e}")
             raise
     
     def _get_client(self, prefer_service_role: bool = False) -> Optional[Client]:
@@ -53,12 +98,143 @@ class SupabaseDatabase:
             return self.service_client
         return self.client if self.client else self.service_client
     
+    def _get_async_client(self, prefer_service_role: bool = False):
+        """Cliente assíncrono equivalente ao que _get_client devolveria"""
+        if prefer_service_role or (self.client is not None and self.client is self.service_client):
+            return self.aio.get_client(prefer_service_role=True)
+        return self.aio.get_client()
+    
+    def _execute_queries(self, queries: Dict[str, Callable], prefer_service_role: bool = False) -> Dict[str, Any]:
+        """
+        Executa consultas independentes e devolve nome -> dados (ou a exceção)
+        
+        Cada consulta é uma função que recebe um cliente e monta a requisição;
+        a mesma função serve ao cliente síncrono e ao assíncrono. Com a fachada
+        assíncrona as requisições saem juntas pelo pool de conexões; sem ela,
+        uma após a outra.
+        """
+        if self.aio:
+            client = self._get_async_client(prefer_service_role)
+            return self.aio.run_concurrently({
+                name: self.aio.fetch(build(client)) for name, build in queries.items()
+            })
+        
+        client = self._get_client(prefer_service_role)
+        resultados = {}
+        for name, build in queries.items():
+            try:
+                resultados[name] = build(client).execute().data
+            except Exception as e:
+                resultados[name] = e
+        return resultados
+    
+    def _select_in(self, table: str, column: str, values: List, columns: str = "*", chunk_size: int = 200) -> List[Dict]:
+        """Busca linhas cujo `column` está em `values` com filtro in_() (em lotes, para não estourar a URL)"""
+        unique_values = list(dict.fromkeys(values))
+        lotes = {
+            f"lote_{start}": (lambda client, chunk=unique_values[start:start + chunk_size]:
+                              client.table(table).select(columns).in_(column, chunk))
+            for start in range(0, len(unique_values), chunk_size)
+        }
+        rows = []
+        for dados in self._execute_queries(lotes).values():
+            if isinstance(dados, Exception):
+                raise dados
+            rows.extend(dados or [])
+        return rows
+    
+    def invalidate_reference_cache(self, *namespaces: str):
+        """Invalida o cache de dados de referência após escritas feitas fora desta classe"""
+        self.cache.invalidate(*namespaces)
+    
+    def get_cache_stats(self) -> Dict:
+        """Métricas do cache de dados de referência (hits, misses, hit_rate)"""
+        return self.cache.stats()
+    
+    # ==================== FILA DE ESCRITAS ====================
+    
+    def _pending_reference(self, dados: Dict) -> bool:
+        """True se `dados` aponta para uma ementa/análise que ainda está na fila de escritas"""
+        return self.write_queue is not None and self.write_queue.resolve_row(dados) is None
+    
+    def _resolve_references(self, dados: Dict) -> Dict:
+        """Troca ids provisórios já reaplicados pelos ids definitivos"""
+        if self.write_queue is None:
+            return dados
+        return self.write_queue.resolve_row(dados) or dados
+    
+    def _can_queue(self, erro: Exception) -> bool:
+        return self.write_queue is not None and is_connection_error(erro)
+    
+    def _com_chave_idempotencia(self, dados: Dict) -> Dict:
+        """
+        Cópia de `dados` com chave_idempotencia (mantém a existente)
+        
+        A chave é criada antes da primeira tentativa online e segue com a escrita
+        para a fila se a resposta se perder: a reaplicação encontra a linha já
+        gravada em vez de duplicá-la.
+        """
+        return dict(dados, chave_idempotencia=dados.get('chave_idempotencia') or str(uuid.uuid4()))
+    
+    def _insert_idempotente(self, client: Client, tabela: str, linhas: List[Dict]) -> List[Dict]:
+        """Grava as linhas com upsert em chave_idempotencia; sem a migração 9, insert simples sem a coluna"""
+        if not self._sem_chave_idempotencia:
+            try:
+                response = client.table(tabela).upsert(linhas, on_conflict="chave_idempotencia").execute()
+                return response.data or []
+            except Exception as e:
+                if is_connection_error(e) or "chave_idempotencia" not in str(e):
+                    raise
+                print("⚠️ Coluna chave_idempotencia não encontrada; execute a migração 9 do SUPABASE_SCHEMA.md")
+                self._sem_chave_idempotencia = True
+        response = client.table(tabela).insert(
+            [{k: v for k, v in linha.items() if k != 'chave_idempotencia'} for linha in linhas]
+        ).execute()
+        return response.data or []
+    
+    def _queue_relationship(self, tabela: str, dados: Dict, on_conflict: str) -> bool:
+        """Guarda um relacionamento na fila de escritas (gravado com upsert na reaplicação)"""
+        print(f"⏳ Relacionamento {tabela} {dados} na fila de escritas")
+        self.write_queue.enqueue_vinculo(tabela, dados, on_conflict)
+        return True
+    
+    def sync_pending_writes(self, force: bool = False, batch_size: int = 100) -> Optional[Dict]:
+        """
+        Reaplica no Supabase as escritas que ficaram na fila durante uma falha de rede
+        
+        Sem `force`, tenta no máximo a cada SYNC_INTERVAL segundos (é chamada a
+        cada página e antes de novas gravações, para preservar a ordem).
+        
+        Returns:
+            Optional[Dict]: métricas da fila (get_write_queue_stats); None no modo offline
+        """
+        if self.write_queue is None:
+            return None
+        agora = time.time()
+        if self.write_queue.has_pending() and (force or agora - self._ultima_tentativa_sync >= SYNC_INTERVAL):
+            self._ultima_tentativa_sync = agora
+            client = self._get_client(prefer_service_role=True)
+            try:
+                resultado = self.write_queue.replay(client, self._store_artifacts, batch_size)
+                if resultado['aplicadas']:
+                    print(f"✅ {resultado['aplicadas']} escrita(s) pendente(s) reaplicada(s) no Supabase")
+                    self.cache.invalidate("professor_cursos", "curso_disciplinas")
+            except Exception as e:
+                print(f"Erro ao reaplicar escritas pendentes: {e}")
+        return self.get_write_queue_stats()
+    
+    def get_write_queue_stats(self) -> Optional[Dict]:
+        """Métricas da fila de escritas (pendentes, falhas, aplicadas, atraso_segundos, ultimo_erro)"""
+        if self.write_queue is None:
+            return None
+        return self.write_queue.stats()
+    
     # ==================== AUTENTICAÇÃO E LOGIN ====================
     
     def get_professor_by_email(self, email_educacional: str) -> Optional[Dict]:
         """Busca professor por email educacional para autenticação"""
         if not self.use_supabase:
-            return self.tinydb.get_professor_by_email(email_educacional)
+            return self.local_db.get_professor_by_email(email_educacional)
             
         try:
             response = self.client.table("professores").select("*").eq("email_educacional", email_educacional).execute()
@@ -69,8 +245,12 @@ class SupabaseDatabase:
     
     def get_professor(self, prontuario: str) -> Optional[Dict]:
         """Busca professor por prontuário"""
+        return self.cache.get_or_load("professor", prontuario, lambda: self._fetch_professor(prontuario))
+    
+    def _fetch_professor(self, prontuario: str) -> Optional[Dict]:
+        """Busca professor por prontuário (consulta direta, sem cache)"""
         if not self.use_supabase:
-            return self.tinydb.get_professor(prontuario)
+            return self.local_db.get_professor(prontuario)
             
         try:
             response = self.client.table("professores").select("*").eq("prontuario", prontuario).execute()
@@ -89,6 +269,9 @@ class SupabaseDatabase:
             else:
                 senha_hash = hashlib.sha256(senha.encode()).hexdigest()
             
+            if not self.use_supabase:
+                return self.local_db.authenticate_professor(email_educacional, senha_hash)
+            
             response = self.client.table("professores").select("*").eq("email_educacional", email_educacional).eq("senha", senha_hash).execute()
             return response.data[0] if response.data else None
         except Exception as e:
@@ -99,12 +282,15 @@ class SupabaseDatabase:
         """Autentica professor por prontuário e senha"""
         try:
             # Buscar professor por prontuário
-            response = self.client.table("professores").select("*").eq("prontuario", prontuario).execute()
+            if not self.use_supabase:
+                professor = self.local_db.get_professor(prontuario)
+            else:
+                response = self.client.table("professores").select("*").eq("prontuario", prontuario).execute()
+                professor = response.data[0] if response.data else None
             
-            if not response.data:
+            if not professor:
                 return None
             
-            professor = response.data[0]
             senha_armazenada = professor['senha']
             
             # Verificar se a senha armazenada é bcrypt ou SHA256
@@ -127,6 +313,9 @@ class SupabaseDatabase:
     def verify_email_exists(self, email_educacional: str) -> bool:
         """Verifica se email já existe para cadastro"""
         try:
+            if not self.use_supabase:
+                return self.local_db.verify_email_exists(email_educacional)
+
             response = self.client.table("professores").select("prontuario").eq("email_educacional", email_educacional).execute()
             return len(response.data) > 0
         except Exception as e:
@@ -136,6 +325,9 @@ class SupabaseDatabase:
     def verify_prontuario_exists(self, prontuario: str) -> bool:
         """Verifica se prontuário já existe para cadastro"""
         try:
+            if not self.use_supabase:
+                return self.local_db.verify_prontuario_exists(prontuario)
+
             response = self.client.table("professores").select("prontuario").eq("prontuario", prontuario).execute()
             return len(response.data) > 0
         except Exception as e:
@@ -148,6 +340,11 @@ class SupabaseDatabase:
         IMPORTANTE: Requer SERVICE_ROLE_KEY para bypassar RLS policies
         """
         try:
+            if not self.use_supabase:
+                professor = self.local_db.create_professor(professor_data)
+                self.cache.invalidate("professor")
+                return professor
+
             # Usar service_client para operações de escrita (bypass RLS)
             client = self._get_client(prefer_service_role=True)
             if not client:
@@ -157,6 +354,7 @@ class SupabaseDatabase:
                 return None
             
             response = client.table("professores").insert(professor_data).execute()
+            self.cache.invalidate("professor")
             return response.data[0] if response.data else None
         except Exception as e:
             print(f"Erro ao criar professor: {e}")
@@ -185,20 +383,23 @@ class SupabaseDatabase:
     
     def get_professor_courses(self, prontuario: str) -> List[Dict]:
         """Busca todos os cursos associados ao professor"""
+        return self.cache.get_or_load("professor_cursos", prontuario, lambda: self._fetch_professor_courses(prontuario))
+    
+    def _fetch_professor_courses(self, prontuario: str) -> List[Dict]:
+        """Busca todos os cursos associados ao professor (consulta direta, sem cache)"""
         if not self.use_supabase:
-            return self.tinydb.get_professor_courses(prontuario)
+            return self.local_db.get_professor_courses(prontuario)
             
         try:
             response = self.client.table("professor_curso").select("curso_fk").eq("prontuario_professor", prontuario).execute()
             curso_codes = [rel['curso_fk'] for rel in response.data]
             
-            cursos = []
-            for codigo in curso_codes:
-                curso = self.get_curso_by_codigo(codigo)
-                if curso:
-                    cursos.append(curso)
-            
-            return cursos
+            # Uma única consulta para todos os cursos, mantendo a ordem dos relacionamentos
+            cursos_por_codigo = {
+                curso['codigo_curso']: curso
+                for curso in self._select_in("cursos", "codigo_curso", curso_codes)
+            }
+            return [cursos_por_codigo[codigo] for codigo in dict.fromkeys(curso_codes) if codigo in cursos_por_codigo]
         except Exception as e:
             print(f"Erro ao buscar cursos do professor: {e}")
             return []
@@ -208,14 +409,34 @@ class SupabaseDatabase:
         try:
             # Primeiro busca os cursos do professor
             cursos_professor = self.get_professor_courses(prontuario)
+            if not self.use_supabase:
+                disciplinas = []
+                for curso in cursos_professor:
+                    for disciplina in self.get_curso_disciplines(curso['codigo_curso']):
+                        disciplina['curso'] = curso['nome']
+                        disciplinas.append(disciplina)
+                return disciplinas
+            
+            # Relacionamentos e disciplinas de todos os cursos em duas consultas
+            relacionamentos = self._select_in(
+                "cursos_disciplina", "curso_fk",
+                [curso['codigo_curso'] for curso in cursos_professor],
+                columns="curso_fk, disciplina_fk"
+            )
+            disciplinas_por_id = {
+                disciplina['id_disciplina']: disciplina
+                for disciplina in self._select_in(
+                    "disciplinas", "id_disciplina", [rel['disciplina_fk'] for rel in relacionamentos]
+                )
+            }
             
             disciplinas = []
             for curso in cursos_professor:
-                # Para cada curso, busca as disciplinas
-                curso_disciplinas = self.get_curso_disciplines(curso['codigo_curso'])
-                for disciplina in curso_disciplinas:
-                    disciplina['curso'] = curso['nome']
-                    disciplinas.append(disciplina)
+                for rel in relacionamentos:
+                    if rel['curso_fk'] == curso['codigo_curso'] and rel['disciplina_fk'] in disciplinas_por_id:
+                        disciplina = dict(disciplinas_por_id[rel['disciplina_fk']])
+                        disciplina['curso'] = curso['nome']
+                        disciplinas.append(disciplina)
             
             return disciplinas
         except Exception as e:
@@ -226,8 +447,12 @@ class SupabaseDatabase:
     
     def get_curso_by_codigo(self, codigo_curso: str) -> Optional[Dict]:
         """Busca curso por código"""
+        return self.cache.get_or_load("curso", codigo_curso, lambda: self._fetch_curso_by_codigo(codigo_curso))
+    
+    def _fetch_curso_by_codigo(self, codigo_curso: str) -> Optional[Dict]:
+        """Busca curso por código (consulta direta, sem cache)"""
         if not self.use_supabase:
-            return self.tinydb.get_curso_by_codigo(codigo_curso)
+            return self.local_db.get_curso_by_codigo(codigo_curso)
             
         try:
             response = self.client.table("cursos").select("*").eq("codigo_curso", codigo_curso).execute()
@@ -238,7 +463,14 @@ class SupabaseDatabase:
     
     def get_all_cursos(self) -> List[Dict]:
         """Busca todos os cursos cadastrados"""
+        return self.cache.get_or_load("cursos", None, self._fetch_all_cursos)
+    
+    def _fetch_all_cursos(self) -> List[Dict]:
+        """Busca todos os cursos cadastrados (consulta direta, sem cache)"""
         try:
+            if not self.use_supabase:
+                return self.local_db.get_all_cursos()
+
             response = self.client.table("cursos").select("*").execute()
             return response.data
         except Exception as e:
@@ -251,11 +483,17 @@ class SupabaseDatabase:
         IMPORTANTE: Requer SERVICE_ROLE_KEY para bypassar RLS policies
         """
         try:
+            if not self.use_supabase:
+                curso = self.local_db.create_curso(curso_data)
+                self.cache.invalidate("cursos", "curso")
+                return curso
+
             client = self._get_client(prefer_service_role=True)
             if not client:
                 print("❌ SERVICE_ROLE_KEY não configurada para criar curso!")
                 return None
             response = client.table("cursos").insert(curso_data).execute()
+            self.cache.invalidate("cursos", "curso")
             return response.data[0] if response.data else None
         except Exception as e:
             print(f"Erro ao criar curso: {e}")
@@ -263,36 +501,54 @@ class SupabaseDatabase:
     
     def get_curso_disciplines(self, codigo_curso: str) -> List[Dict]:
         """Busca todas as disciplinas de um curso"""
+        return self.cache.get_or_load("curso_disciplinas", codigo_curso, lambda: self._fetch_curso_disciplines(codigo_curso))
+    
+    def _fetch_curso_disciplines(self, codigo_curso: str) -> List[Dict]:
+        """Busca todas as disciplinas de um curso (consulta direta, sem cache)"""
         if not self.use_supabase:
-            return self.tinydb.get_curso_disciplines(codigo_curso)
+            return self.local_db.get_curso_disciplines(codigo_curso)
             
         try:
             response = self.client.table("cursos_disciplina").select("disciplina_fk").eq("curso_fk", codigo_curso).execute()
-            disciplina_ids = [rel['disciplina_fk'] for rel in response.data]
-            
-            disciplinas = []
-            for disciplina_id in disciplina_ids:
-                disciplina = self.get_disciplina_by_id(disciplina_id)
-                if disciplina:
-                    disciplinas.append(disciplina)
-            
-            return disciplinas
+            return self._get_disciplinas_by_ids([rel['disciplina_fk'] for rel in response.data])
         except Exception as e:
             print(f"Erro ao buscar disciplinas do curso: {e}")
             return []
     
     def get_disciplina_by_id(self, id_disciplina: str) -> Optional[Dict]:
         """Busca disciplina por ID"""
+        return self.cache.get_or_load("disciplina", id_disciplina, lambda: self._fetch_disciplina_by_id(id_disciplina))
+    
+    def _fetch_disciplina_by_id(self, id_disciplina: str) -> Optional[Dict]:
+        """Busca disciplina por ID (consulta direta, sem cache)"""
         try:
+            if not self.use_supabase:
+                return self.local_db.get_disciplina_by_id(id_disciplina)
+
             response = self.client.table("disciplinas").select("*").eq("id_disciplina", id_disciplina).execute()
             return response.data[0] if response.data else None
         except Exception as e:
             print(f"Erro ao buscar disciplina: {e}")
             return None
     
+    def _get_disciplinas_by_ids(self, disciplina_ids: List[str]) -> List[Dict]:
+        """Busca várias disciplinas em uma consulta, na ordem dos ids informados"""
+        disciplinas_por_id = {
+            disciplina['id_disciplina']: disciplina
+            for disciplina in self._select_in("disciplinas", "id_disciplina", disciplina_ids)
+        }
+        return [disciplinas_por_id[i] for i in dict.fromkeys(disciplina_ids) if i in disciplinas_por_id]
+    
     def get_all_disciplinas(self) -> List[Dict]:
         """Busca todas as disciplinas cadastradas"""
+        return self.cache.get_or_load("disciplinas", None, self._fetch_all_disciplinas)
+    
+    def _fetch_all_disciplinas(self) -> List[Dict]:
+        """Busca todas as disciplinas cadastradas (consulta direta, sem cache)"""
         try:
+            if not self.use_supabase:
+                return self.local_db.get_all_disciplinas()
+
             response = self.client.table("disciplinas").select("*").execute()
             return response.data
         except Exception as e:
@@ -305,11 +561,17 @@ class SupabaseDatabase:
         IMPORTANTE: Requer SERVICE_ROLE_KEY para bypassar RLS policies
         """
         try:
+            if not self.use_supabase:
+                disciplina = self.local_db.create_disciplina(disciplina_data)
+                self.cache.invalidate("disciplinas", "disciplina")
+                return disciplina
+
             client = self._get_client(prefer_service_role=True)
             if not client:
                 print("❌ SERVICE_ROLE_KEY não configurada para criar disciplina!")
                 return None
             response = client.table("disciplinas").insert(disciplina_data).execute()
+            self.cache.invalidate("disciplinas", "disciplina")
             return response.data[0] if response.data else None
         except Exception as e:
             print(f"Erro ao criar disciplina: {e}")
@@ -321,6 +583,12 @@ class SupabaseDatabase:
     def get_ementa_by_id(self, id_ementa: int) -> Optional[Dict]:
         """Busca ementa por ID"""
         try:
+            if not self.use_supabase:
+                return self.local_db.get_ementa_by_id(id_ementa)
+
+            if self._pending_reference({'ementa_fk': id_ementa}):
+                return self.write_queue.get_pending_ementa(id_ementa)
+            id_ementa = self._resolve_references({'ementa_fk': id_ementa})['ementa_fk']
             response = self.client.table("ementas").select("*").eq("id_ementa", id_ementa).execute()
             return response.data[0] if response.data else None
         except Exception as e:
@@ -330,35 +598,82 @@ class SupabaseDatabase:
     def get_ementa_by_drive_id(self, drive_id: str) -> Optional[Dict]:
         """Busca ementa por drive_id"""
         try:
+            if not self.use_supabase:
+                return self.local_db.get_ementa_by_drive_id(drive_id)
+
             response = self.client.table("ementas").select("*").eq("drive_id", drive_id).execute()
             return response.data[0] if response.data else None
         except Exception as e:
             print(f"Erro ao buscar ementa por drive_id: {e}")
             return None
-    
+
+    def get_ementa_by_hash(self, hash_conteudo: str, professor_id: str = None) -> Optional[Dict]:
+        """Busca ementa pelo SHA256 do conteúdo do PDF (usa idx_ementas_hash_conteudo)"""
+        if not self.use_supabase:
+            return self.local_db.get_ementa_by_hash(hash_conteudo, professor_id)
+
+        try:
+            query = self.client.table("ementas").select("*").eq("hash_conteudo", hash_conteudo)
+            if professor_id:
+                query = query.eq("professor_id", professor_id)
+            response = query.limit(1).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            print(f"Erro ao buscar ementa por hash: {e}")
+            return None
+
+    def get_dados_estruturados_by_ementa(self, id_ementa: int) -> Optional[Dict]:
+        """Retorna a extração (dados estruturados) já armazenada para uma ementa, se houver"""
+        try:
+            if not self.use_supabase:
+                analises = self.local_db.get_analises_by_ementa(id_ementa)
+            else:
+                response = self.client.table("analises").select("artefato_hash").eq(
+                    "ementa_fk", id_ementa
+                ).not_.is_("artefato_hash", "null").limit(1).execute()
+                analises = response.data
+                if not analises:
+                    # Análises anteriores aos artefatos: coluna inline legada
+                    response = self.client.table("analises").select("dados_estruturados_json").eq(
+                        "ementa_fk", id_ementa
+                    ).not_.is_("dados_estruturados_json", "null").limit(1).execute()
+                    analises = response.data
+
+            for analise in analises:
+                dados = self.get_dados_estruturados_analise(analise)
+                if dados is not None:
+                    return dados
+            return None
+        except Exception as e:
+            print(f"Erro ao buscar extração armazenada da ementa: {e}")
+            return None
+
     def create_ementa(self, ementa_data: Dict) -> Optional[Dict]:
         """Cria uma nova ementa"""
         try:
+            if not self.use_supabase:
+                return self.local_db.create_ementa(ementa_data)
+
+            self.sync_pending_writes()
+            ementa_data = self._com_chave_idempotencia(ementa_data)
             client = self._get_client(prefer_service_role=True) or self.client
-            response = client.table("ementas").insert(ementa_data).execute()
-            return response.data[0] if response.data else None
+            criadas = self._insert_idempotente(client, "ementas", [ementa_data])
+            return criadas[0] if criadas else None
         except Exception as e:
+            if self._can_queue(e):
+                print(f"⏳ Sem conexão com o Supabase; ementa guardada na fila de escritas: {e}")
+                return self.write_queue.enqueue_ementa(ementa_data)
             print(f"Erro ao criar ementa: {e}")
             return None
     
     def get_ementa_disciplines(self, id_ementa: int) -> List[Dict]:
         """Busca todas as disciplinas associadas a uma ementa"""
         try:
+            if not self.use_supabase:
+                return self.local_db.get_ementa_disciplines(id_ementa)
+
             response = self.client.table("ementa_disciplina").select("disciplina_fk").eq("ementa_fk", id_ementa).execute()
-            disciplina_ids = [rel['disciplina_fk'] for rel in response.data]
-            
-            disciplinas = []
-            for disciplina_id in disciplina_ids:
-                disciplina = self.get_disciplina_by_id(disciplina_id)
-                if disciplina:
-                    disciplinas.append(disciplina)
-            
-            return disciplinas
+            return self._get_disciplinas_by_ids([rel['disciplina_fk'] for rel in response.data])
         except Exception as e:
             print(f"Erro ao buscar disciplinas da ementa: {e}")
             return []
@@ -376,13 +691,48 @@ class SupabaseDatabase:
             print(f"Erro ao buscar ementa completa: {e}")
             return None
     
+    def _get_ementas_complete(self, ementa_ids: List[int]) -> List[Dict]:
+        """
+        Versão em lote de get_ementa_complete, na ordem dos ids informados
+        
+        Três consultas no total (ementas, ementa_disciplina, disciplinas), em vez
+        de duas ou mais por ementa.
+        """
+        ementa_ids = list(dict.fromkeys(ementa_ids))
+        if not ementa_ids:
+            return []
+        
+        ementas_por_id = {ementa['id_ementa']: ementa for ementa in self._select_in("ementas", "id_ementa", ementa_ids)}
+        relacoes = self._select_in("ementa_disciplina", "ementa_fk", list(ementas_por_id), "ementa_fk, disciplina_fk")
+        disciplinas_por_id = {
+            disciplina['id_disciplina']: disciplina
+            for disciplina in self._get_disciplinas_by_ids([rel['disciplina_fk'] for rel in relacoes])
+        }
+        for ementa in ementas_por_id.values():
+            ementa['disciplinas'] = []
+        for rel in relacoes:
+            if rel['disciplina_fk'] in disciplinas_por_id:
+                ementas_por_id[rel['ementa_fk']]['disciplinas'].append(disciplinas_por_id[rel['disciplina_fk']])
+        
+        return [ementas_por_id[ementa_id] for ementa_id in ementa_ids if ementa_id in ementas_por_id]
+    
     # ==================== ANÁLISES ====================
     
     def get_analise_by_id(self, analise_id: int) -> Optional[Dict]:
-        """Busca análise por ID"""
+        """Busca análise por ID (com os dados estruturados, carregados do artefato sob demanda)"""
         try:
+            if not self.use_supabase:
+                return self.local_db.get_analise_by_id(analise_id)
+
             response = self.client.table("analises").select("*").eq("analise_id", analise_id).execute()
-            return response.data[0] if response.data else None
+            if not response.data:
+                return None
+            analise = response.data[0]
+            if analise.get('artefato_hash') and not analise.get('dados_estruturados_json'):
+                dados = self.get_dados_estruturados_analise(analise)
+                if dados is not None:
+                    analise['dados_estruturados_json'] = json.dumps(dados, ensure_ascii=False)
+            return analise
         except Exception as e:
             print(f"Erro ao buscar análise: {e}")
             return None
@@ -390,6 +740,9 @@ class SupabaseDatabase:
     def get_analises_by_ementa(self, ementa_fk: int) -> List[Dict]:
         """Busca todas as análises de uma ementa"""
         try:
+            if not self.use_supabase:
+                return self.local_db.get_analises_by_ementa(ementa_fk)
+
             response = self.client.table("analises").select("*").eq("ementa_fk", ementa_fk).execute()
             return response.data
         except Exception as e:
@@ -399,16 +752,66 @@ class SupabaseDatabase:
     def get_analises_by_professor(self, professor_id: str) -> List[Dict]:
         """Busca todas as análises feitas por um professor"""
         try:
+            if not self.use_supabase:
+                return self.local_db.get_analises_by_professor(professor_id)
+
             response = self.client.table("analises").select("*").eq("professor_id", professor_id).execute()
             print(f"Buscando análises para professor {professor_id}: {len(response.data)} encontradas")
             return response.data
         except Exception as e:
             print(f"Erro ao buscar análises do professor: {e}")
             return []
-    
+
+    def list_analises_indexaveis(self, professor_id: str, limit: int = 500, cursor: Optional[int] = None) -> Dict:
+        """
+        Página das análises do professor com o necessário para indexá-las por similaridade
+
+        Keyset em analise_id e só as colunas ementa_fk, nome_aluno e artefato_hash: sem
+        texto_analise nem dados estruturados. Linhas antigas, sem artefato, recebem
+        dados_estruturados_json em uma segunda consulta restrita a elas.
+
+        Args:
+            professor_id: Prontuário do professor
+            limit: Tamanho da página
+            cursor: `proximo_cursor` da página anterior (último analise_id)
+
+        Returns:
+            Dict: {'analises': [...], 'proximo_cursor': analise_id ou None}
+        """
+        vazio = {'analises': [], 'proximo_cursor': None}
+        try:
+            if not self.use_supabase:
+                return self.local_db.list_analises_indexaveis(professor_id, limit, cursor)
+
+            query = self.client.table("analises").select(
+                "analise_id, ementa_fk, nome_aluno, artefato_hash"
+            ).eq("professor_id", professor_id)
+            if cursor is not None:
+                query = query.gt("analise_id", int(cursor))
+            analises = query.order("analise_id").limit(limit).execute().data or []
+
+            legadas = [analise['analise_id'] for analise in analises if not analise.get('artefato_hash')]
+            if legadas:
+                dados = {
+                    row['analise_id']: row.get('dados_estruturados_json')
+                    for row in self._select_in("analises", "analise_id", legadas, "analise_id, dados_estruturados_json")
+                }
+                for analise in analises:
+                    if analise['analise_id'] in dados:
+                        analise['dados_estruturados_json'] = dados[analise['analise_id']]
+
+            proximo_cursor = analises[-1]['analise_id'] if len(analises) == limit else None
+            return {'analises': analises, 'proximo_cursor': proximo_cursor}
+        except Exception as e:
+            print(f"Erro ao listar análises para indexação: {e}")
+            return vazio
+
     def get_all_analises(self) -> List[Dict]:
         """Busca todas as análises (para debug)"""
         try:
+            if not self.use_supabase:
+                return self.local_db.get_all_analises()
+
             client = self._get_client(prefer_service_role=True)
             if not client:
                 return []
@@ -424,6 +827,9 @@ class SupabaseDatabase:
     def get_analises_by_curso(self, codigo_curso: str) -> List[Dict]:
         """Busca todas as análises de um curso específico"""
         try:
+            if not self.use_supabase:
+                return self.local_db.get_analises_by_curso(codigo_curso)
+
             # Buscar professores do curso
             response = self.client.table("professor_curso").select("prontuario_professor").eq("curso_fk", codigo_curso).execute()
             professor_ids = [rel['prontuario_professor'] for rel in response.data]
@@ -444,6 +850,9 @@ class SupabaseDatabase:
         try:
             print(f"Buscando análises para professor {professor_id} no curso {codigo_curso}")
             
+            if not self.use_supabase:
+                return self.local_db.get_analises_by_curso_and_professor(codigo_curso, professor_id)
+            
             # Primeiro verificar se o professor leciona o curso
             curso_check = self.client.table("professor_curso").select("pc_id").eq("prontuario_professor", professor_id).eq("curso_fk", codigo_curso).execute()
             
@@ -471,11 +880,79 @@ class SupabaseDatabase:
             print(f"Traceback: {traceback.format_exc()}")
             return []
     
+    # ==================== BUSCA ====================
+    
+    def search_analises(self, professor_id: str, termo: str, curso_codigo: str = None, limit: int = 20) -> List[Dict]:
+        """
+        Busca análises do professor por nome do aluno, disciplinas da ementa e texto da análise
+        
+        A ordenação por relevância roda no banco (função buscar_analises, com
+        índices de texto completo e trigramas sem acento); as linhas vêm em uma
+        segunda consulta com as colunas da listagem, acrescidas de `relevancia`.
+        """
+        try:
+            if not termo or not termo.strip():
+                return []
+            
+            if not self.use_supabase:
+                return self.local_db.search_analises(professor_id, termo, curso_codigo, limit)
+            
+            try:
+                response = self.client.rpc("buscar_analises", {
+                    "p_professor_id": professor_id,
+                    "p_termo": termo,
+                    "p_curso_codigo": curso_codigo,
+                    "p_limite": limit
+                }).execute()
+                ranking = {row['analise_id']: row['relevancia'] for row in response.data or []}
+            except Exception as e:
+                if "buscar_analises" not in str(e) and "PGRST202" not in str(e):
+                    raise
+                print("⚠️ Função buscar_analises não encontrada; buscando por nome do aluno e texto")
+                return self._search_analises_ilike(professor_id, termo, curso_codigo, limit)
+            
+            if not ranking:
+                return []
+            
+            analises = {
+                row['analise_id']: row
+                for row in self._select_in("analises", "analise_id", list(ranking), ANALISE_LIST_COLUMNS)
+            }
+            return [
+                {**analises[analise_id], 'relevancia': relevancia}
+                for analise_id, relevancia in ranking.items() if analise_id in analises
+            ]
+        except Exception as e:
+            print(f"Erro ao buscar análises: {e}")
+            return []
+    
+    def _search_analises_ilike(self, professor_id: str, termo: str, curso_codigo: str, limit: int) -> List[Dict]:
+        """Busca sem a função buscar_analises: ilike no nome do aluno e no texto, mais recentes primeiro"""
+        # Vírgulas e parênteses têm significado no filtro or_() do PostgREST
+        padrao = "*" + "".join(c for c in termo.strip() if c not in ",()") + "*"
+        colunas = f"{ANALISE_LIST_COLUMNS}, analise_curso!inner(curso_fk)" if curso_codigo else ANALISE_LIST_COLUMNS
+        query = self.client.table("analises").select(colunas).eq("professor_id", professor_id).or_(
+            f"nome_aluno.ilike.{padrao},texto_analise.ilike.{padrao}"
+        )
+        if curso_codigo:
+            query = query.eq("analise_curso.curso_fk", curso_codigo)
+        
+        response = query.order("created_at", desc=True).limit(limit).execute()
+        analises = []
+        for analise in response.data or []:
+            analise.pop('analise_curso', None)
+            analise['relevancia'] = None
+            analises.append(analise)
+        return analises
+    
     # ==================== MÉTODOS ANALISE_CURSO ====================
     
     def create_analise_curso_relacionamento(self, analise_id: int, curso_codigo: str) -> bool:
         """Cria relacionamento entre análise e curso"""
         try:
+            if not self.use_supabase:
+                return self.local_db.create_analise_curso_relacionamento(analise_id, curso_codigo)
+
             print(f"\n{'='*60}")
             print(f"🔗 CRIANDO RELACIONAMENTO ANÁLISE-CURSO")
             print(f"{'='*60}")
@@ -487,66 +964,43 @@ class SupabaseDatabase:
                 print(f"❌ Dados inválidos: analise_id={analise_id}, curso_codigo={curso_codigo}")
                 return False
             
-            # Verificar se o relacionamento já existe
+            # Análise ainda na fila de escritas: o vínculo espera na fila também
+            if self._pending_reference({'analise_fk': analise_id}):
+                return self._queue_relationship(
+                    "analise_curso", {'analise_fk': analise_id, 'curso_fk': curso_codigo}, "analise_fk,curso_fk"
+                )
+            analise_id = self._resolve_references({'analise_fk': analise_id})['analise_fk']
+            
             client = self._get_client(prefer_service_role=True)
             if not client:
                 print("❌ Nenhum cliente Supabase disponível!")
                 return False
             
-            print(f"Usando service_client: {self.service_client is not None}")
-            
-            # Verificar se relacionamento já existe
-            try:
-                existing = client.table("analise_curso").select("*").eq("analise_fk", analise_id).eq("curso_fk", curso_codigo).execute()
-                if existing.data and len(existing.data) > 0:
-                    print(f"ℹ️ Relacionamento já existe: {existing.data[0]}")
-                    print(f"{'='*60}\n")
-                    return True
-            except Exception as e:
-                print(f"⚠️ Erro ao verificar relacionamento existente: {e}")
-                # Continuar mesmo se houver erro na verificação
-            
             relacionamento_data = {
                 'analise_fk': analise_id,
                 'curso_fk': curso_codigo
             }
             
-            print(f"Dados do relacionamento: {relacionamento_data}")
-            
-            # Tentar inserir o relacionamento
+            # Upsert na chave única (analise_fk, curso_fk): idempotente em uma única ida, sem
+            # consulta prévia nem tratamento de "duplicate". Sem ignore_duplicates, o vínculo que
+            # já existia também volta na resposta, que serve de confirmação
             try:
-                response = client.table("analise_curso").insert(relacionamento_data).execute()
-                
-                print(f"Status da resposta: {response.status_code if hasattr(response, 'status_code') else 'N/A'}")
-                print(f"Dados retornados: {response.data}")
-                
-                if response.data and len(response.data) > 0:
-                    print(f"✅ Relacionamento criado com sucesso!")
-                    print(f"   ID do relacionamento: {response.data[0].get('ac_id', response.data[0].get('id', 'N/A'))}")
-                    print(f"{'='*60}\n")
-                    return True
-                else:
-                    print(f"❌ Erro: Nenhum dado retornado")
-                    if hasattr(response, 'error') and response.error:
-                        print(f"   Erro do Supabase: {response.error}")
-                    # Verificar se é erro de UNIQUE (relacionamento já existe)
-                    if hasattr(response, 'error') and response.error:
-                        error_str = str(response.error)
-                        if 'unique' in error_str.lower() or 'duplicate' in error_str.lower():
-                            print(f"ℹ️ Relacionamento já existe (erro de UNIQUE), considerando sucesso")
-                            print(f"{'='*60}\n")
-                            return True
-                    print(f"{'='*60}\n")
-                    return False
-            except Exception as insert_error:
-                error_str = str(insert_error)
-                print(f"❌ Erro ao inserir relacionamento: {error_str}")
-                # Verificar se é erro de UNIQUE (relacionamento já existe)
-                if 'unique' in error_str.lower() or 'duplicate' in error_str.lower() or '23505' in error_str:
-                    print(f"ℹ️ Relacionamento já existe (erro de UNIQUE), considerando sucesso")
-                    print(f"{'='*60}\n")
-                    return True
-                raise  # Re-raise se não for erro de UNIQUE
+                response = client.table("analise_curso").upsert(
+                    relacionamento_data, on_conflict="analise_fk,curso_fk"
+                ).execute()
+            except Exception as upsert_error:
+                if self._can_queue(upsert_error):
+                    return self._queue_relationship("analise_curso", relacionamento_data, "analise_fk,curso_fk")
+                raise
+            
+            if response.data:
+                print(f"✅ Relacionamento confirmado: {response.data[0]}")
+                print(f"{'='*60}\n")
+                return True
+            
+            print(f"❌ Erro: Nenhum dado retornado")
+            print(f"{'='*60}\n")
+            return False
                 
         except Exception as e:
             print(f"❌ ERRO ao criar relacionamento: {e}")
@@ -558,49 +1012,62 @@ class SupabaseDatabase:
     
     def check_analise_exists_for_ementa_and_curso(self, ementa_id: int, curso_codigo: str) -> Optional[Dict]:
         """Verifica se já existe uma análise para uma ementa e curso específicos"""
+        return self.find_existing_analises([ementa_id], curso_codigo).get(ementa_id)
+    
+    def find_existing_analises(self, ementa_ids: List[int], curso_codigo: str, chunk_size: int = 200) -> Dict[int, Dict]:
+        """
+        Verifica de uma vez quais ementas já possuem análise vinculada ao curso
+        
+        Uma única consulta (por lote de até `chunk_size` ementas) sobre analises
+        com join em analise_curso, em vez de uma busca por ementa e por análise.
+        
+        Returns:
+            Dict[int, Dict]: ementa_id -> análise mais recente vinculada ao curso
+        """
+        ementa_ids = [ementa_id for ementa_id in dict.fromkeys(ementa_ids) if ementa_id is not None]
+        if not ementa_ids:
+            return {}
+        
+        if not self.use_supabase:
+            return self.local_db.find_existing_analises(ementa_ids, curso_codigo)
+        
         try:
-            print(f"🔍 [DEBUG] Verificando se existe análise para ementa {ementa_id} e curso {curso_codigo}")
-            
-            client = self._get_client(prefer_service_role=False)
-            if not client:
-                client = self._get_client(prefer_service_role=True)
-            if not client:
+            if not self._get_client():
                 print("❌ Nenhum cliente Supabase disponível!")
-                return None
-            
-            # Buscar análises da ementa
-            analises_ementa = self.get_analises_by_ementa(ementa_id)
+                return {}
+            
+            # Os lotes são independentes: saem em paralelo quando há fachada assíncrona
+            lotes = {
+                f"lote_{start}": (lambda c, chunk=ementa_ids[start:start + chunk_size]: c.table("analises").select(
+                    "analise_id, ementa_fk, nome_aluno, score, adequado, professor_id, created_at, "
+                    "analise_curso!inner(curso_fk)"
+                ).in_("ementa_fk", chunk).eq(
+                    "analise_curso.curso_fk", curso_codigo
+                ).order("created_at", desc=True))
+                for start in range(0, len(ementa_ids), chunk_size)
+            }
             
-            if not analises_ementa or len(analises_ementa) == 0:
-                print(f"🔍 [DEBUG] Nenhuma análise encontrada para ementa {ementa_id}")
-                return None
+            existentes = {}
+            for dados in self._execute_queries(lotes).values():
+                if isinstance(dados, Exception):
+                    raise dados
+                for analise in dados or []:
+                    analise.pop('analise_curso', None)
+                    existentes.setdefault(analise['ementa_fk'], analise)
             
-            # Para cada análise, verificar se está relacionada ao curso
-            for analise in analises_ementa:
-                analise_id = analise.get('analise_id')
-                if analise_id:
-                    # Buscar cursos relacionados a esta análise
-                    analise_cursos = self.get_analise_cursos(analise_id)
-                    
-                    # Verificar se algum curso relacionado corresponde ao curso_codigo
-                    for curso_rel in analise_cursos:
-                        curso_cod = curso_rel.get('codigo_curso') or curso_rel.get('curso_fk')
-                        if curso_cod == curso_codigo:
-                            print(f"✅ Análise existente encontrada: ID {analise_id} para ementa {ementa_id} e curso {curso_codigo}")
-                            return analise
-            
-            print(f"🔍 [DEBUG] Nenhuma análise encontrada para ementa {ementa_id} relacionada ao curso {curso_codigo}")
-            return None
+            print(f"🔍 [DEBUG] {len(existentes)} de {len(ementa_ids)} ementa(s) já possuem análise para o curso {curso_codigo}")
+            return existentes
             
         except Exception as e:
-            print(f"❌ Erro ao verificar análise existente: {e}")
-            import traceback
-            print(f"Traceback: {traceback.format_exc()}")
-            return None
+            print(f"❌ Erro ao verificar análises existentes: {e}")
+            return {}
     
     def get_analise_cursos(self, analise_id: int) -> List[Dict]:
         """Busca todos os cursos relacionados a uma análise"""
         try:
+            if not self.use_supabase:
+                return self.local_db.get_analise_cursos(analise_id)
+
             print(f"🔍 [DEBUG] Buscando cursos para análise ID: {analise_id}")
             client = self._get_client(prefer_service_role=False)
             if not client:
@@ -663,6 +1130,9 @@ class SupabaseDatabase:
         Para manter a privacidade dos dados, prefira usar get_analises_by_curso_and_professor_usando_relacionamento.
         """
         try:
+            if not self.use_supabase:
+                return self.local_db.get_analises_by_curso(curso_codigo)
+
             print(f"Buscando análises do curso {curso_codigo} usando relacionamento")
             
             # Query com JOIN usando a tabela de relacionamento
@@ -720,6 +1190,9 @@ class SupabaseDatabase:
             
             print(f"✅ ACESSO AUTORIZADO: Professor tem permissão para acessar curso {curso_codigo}")
             
+            if not self.use_supabase:
+                return self.local_db.get_analises_by_curso_and_professor(curso_codigo, professor_id)
+            
             # Query com JOIN usando a tabela de relacionamento
             # Especificar qual relacionamento usar com ementas para evitar ambiguidade
             response = self.client.table("analises").select(
@@ -757,128 +1230,109 @@ class SupabaseDatabase:
             print(f"{'='*60}\n")
             return []
     
-    def get_cursos_com_analises_do_professor(self, professor_id: str) -> List[Dict]:
-        """Lista todos os cursos que têm análises feitas por um professor"""
+    def list_analises_curso_professor(self, curso_codigo: str, professor_id: str, limit: int = 50,
+                                      cursor: Optional[List] = None) -> Dict:
+        """
+        Lista uma página do histórico de análises de um curso (mais recentes primeiro)
+        
+        Paginação por keyset em (created_at, analise_id) e apenas as colunas da
+        listagem: o custo de cada página não depende do tamanho do histórico nem
+        do tamanho dos relatórios. Textos completos (texto_analise,
+        dados_estruturados_json) devem ser buscados com get_analise_by_id ao abrir a linha.
+        
+        Args:
+            curso_codigo: Código do curso
+            professor_id: Prontuário do professor
+            limit: Tamanho da página
+            cursor: `proximo_cursor` da página anterior ([created_at, analise_id])
+            
+        Returns:
+            Dict: {'analises': [...], 'proximo_cursor': [created_at, analise_id] ou None}
+        """
+        vazio = {'analises': [], 'proximo_cursor': None}
         try:
-            print(f"Buscando cursos com análises do professor {professor_id}")
+            # VALIDAÇÃO DE SEGURANÇA: Verificar se o professor tem acesso a este curso
+            curso_codes = [curso['codigo_curso'] for curso in self.get_professor_courses(professor_id)]
+            if curso_codigo not in curso_codes:
+                print(f"🚫 ACESSO NEGADO: Professor {professor_id} não tem permissão para acessar curso {curso_codigo}")
+                return vazio
             
-            # Query para buscar cursos distintos que têm análises do professor
-            response = self.client.table("analise_curso").select(
-                """
-                curso_fk,
-                cursos!inner(
-                    codigo_curso,
-                    nome,
-                    descricao_curso
-                ),
-                analises!inner(
-                    analise_id,
-                    professor_id
-                )
-                """
-            ).eq("analises.professor_id", professor_id).execute()
+            if not self.use_supabase:
+                return self.local_db.list_analises_curso_professor(curso_codigo, professor_id, limit, cursor)
+            
+            response = self._query_analises_page(self.client, curso_codigo, professor_id, limit, cursor).execute()
+            return self._montar_pagina(response.data, limit)
             
-            if response.data:
-                # Agrupar por curso e contar análises
-                cursos_dict = {}
-                for item in response.data:
-                    curso_info = item['cursos']
-                    curso_codigo = curso_info['codigo_curso']
-                    
-                    if curso_codigo not in cursos_dict:
-                        cursos_dict[curso_codigo] = {
-                            'codigo_curso': curso_codigo,
-                            'nome': curso_info['nome'],
-                            'descricao_curso': curso_info['descricao_curso'],
-                            'total_analises': 0
-                        }
-                    cursos_dict[curso_codigo]['total_analises'] += 1
-                
-                cursos_lista = list(cursos_dict.values())
-                print(f"Encontrados {len(cursos_lista)} cursos com análises do professor {professor_id}")
-                return cursos_lista
-            else:
-                print(f"Nenhum curso com análises encontrado para o professor {professor_id}")
-                return []
-                
         except Exception as e:
-            print(f"Erro ao buscar cursos com análises do professor: {e}")
-            import traceback
-            print(f"Traceback: {traceback.format_exc()}")
-            return []
+            print(f"❌ ERRO ao listar análises: {e}")
+            return vazio
+    
+    def _query_analises_page(self, client, curso_codigo: str, professor_id: str, limit: int, cursor: Optional[List]):
+        """Monta a consulta de uma página do histórico (cliente síncrono ou assíncrono)"""
+        query = client.table("analises").select(
+            f"{ANALISE_LIST_COLUMNS}, analise_curso!inner(curso_fk)"
+        ).eq("analise_curso.curso_fk", curso_codigo).eq("professor_id", professor_id)
+        
+        if cursor:
+            created_at, analise_id = cursor
+            query = query.or_(
+                f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",analise_id.lt.{int(analise_id)})'
+            )
+        
+        return query.order("created_at", desc=True).order("analise_id", desc=True).limit(limit)
+    
+    def _montar_pagina(self, analises: Optional[List[Dict]], limit: int) -> Dict:
+        """Remove o join das linhas e calcula o cursor da próxima página"""
+        analises = analises or []
+        for analise in analises:
+            analise.pop('analise_curso', None)
+        
+        proximo_cursor = None
+        if len(analises) == limit:
+            ultima = analises[-1]
+            proximo_cursor = [ultima['created_at'], ultima['analise_id']]
+        
+        return {'analises': analises, 'proximo_cursor': proximo_cursor}
+    
+    def get_cursos_com_analises_do_professor(self, professor_id: str) -> List[Dict]:
+        """Lista todos os cursos que têm análises feitas por um professor"""
+        return [
+            {
+                'codigo_curso': estatistica['codigo_curso'],
+                'nome': estatistica['nome'],
+                'descricao_curso': estatistica.get('descricao_curso', ''),
+                'total_analises': estatistica['total_analises']
+            }
+            for estatistica in self.get_estatisticas_por_curso_do_professor(professor_id)
+        ]
     
     def get_estatisticas_por_curso_do_professor(self, professor_id: str) -> List[Dict]:
-        """Obtém estatísticas de análises por curso para um professor"""
+        """
+        Obtém estatísticas de análises por curso para um professor
+        
+        A agregação roda no banco (função estatisticas_cursos_professor): o custo
+        depende do número de cursos, não do número de análises.
+        """
         try:
             print(f"Buscando estatísticas por curso do professor {professor_id}")
             
-            # Query para buscar análises agrupadas por curso
-            response = self.client.table("analise_curso").select(
-                """
-                curso_fk,
-                cursos!inner(
-                    codigo_curso,
-                    nome
-                ),
-                analises!inner(
-                    analise_id,
-                    score,
-                    adequado,
-                    professor_id
-                )
-                """
-            ).eq("analises.professor_id", professor_id).execute()
-            
-            if response.data:
-                # Agrupar por curso e calcular estatísticas
-                cursos_dict = {}
-                for item in response.data:
-                    curso_info = item['cursos']
-                    analise_info = item['analises']
-                    curso_codigo = curso_info['codigo_curso']
-                    
-                    if curso_codigo not in cursos_dict:
-                        cursos_dict[curso_codigo] = {
-                            'codigo_curso': curso_codigo,
-                            'nome': curso_info['nome'],
-                            'total_analises': 0,
-                            'scores': [],
-                            'adequadas': 0,
-                            'inadequadas': 0
-                        }
-                    
-                    cursos_dict[curso_codigo]['total_analises'] += 1
-                    cursos_dict[curso_codigo]['scores'].append(analise_info['score'])
-                    
-                    if analise_info['adequado']:
-                        cursos_dict[curso_codigo]['adequadas'] += 1
-                    else:
-                        cursos_dict[curso_codigo]['inadequadas'] += 1
-                
-                # Calcular estatísticas finais
-                estatisticas = []
-                for curso_data in cursos_dict.values():
-                    scores = curso_data['scores']
-                    estatisticas.append({
-                        'codigo_curso': curso_data['codigo_curso'],
-                        'nome': curso_data['nome'],
-                        'total_analises': curso_data['total_analises'],
-                        'media_score': round(sum(scores) / len(scores), 2) if scores else 0,
-                        'score_maximo': max(scores) if scores else 0,
-                        'score_minimo': min(scores) if scores else 0,
-                        'adequadas': curso_data['adequadas'],
-                        'inadequadas': curso_data['inadequadas'],
-                        'taxa_adequacao': f"{(curso_data['adequadas']/curso_data['total_analises'])*100:.1f}%" if curso_data['total_analises'] > 0 else "0%"
-                    })
-                
-                # Ordenar por total de análises (decrescente)
-                estatisticas.sort(key=lambda x: x['total_analises'], reverse=True)
-                
-                print(f"Estatísticas calculadas para {len(estatisticas)} cursos")
-                return estatisticas
+            if not self.use_supabase:
+                linhas = self.local_db.get_estatisticas_por_curso(professor_id)
             else:
-                print(f"Nenhuma estatística encontrada para o professor {professor_id}")
-                return []
+                try:
+                    response = self.client.rpc(
+                        "estatisticas_cursos_professor", {"p_professor_id": professor_id}
+                    ).execute()
+                    linhas = response.data or []
+                except Exception as e:
+                    if "estatisticas_cursos_professor" not in str(e) and "PGRST202" not in str(e):
+                        raise
+                    print("⚠️ Função estatisticas_cursos_professor não encontrada; agregando no cliente")
+                    linhas = self._agregar_estatisticas_por_curso(professor_id)
+            
+            estatisticas = self._formatar_estatisticas(linhas)
+            print(f"Estatísticas calculadas para {len(estatisticas)} cursos")
+            return estatisticas
                 
         except Exception as e:
             print(f"Erro ao buscar estatísticas por curso: {e}")
@@ -886,6 +1340,214 @@ class SupabaseDatabase:
             print(f"Traceback: {traceback.format_exc()}")
             return []
     
+    def _formatar_estatisticas(self, linhas: List[Dict]) -> List[Dict]:
+        """Converte as linhas agregadas (RPC, cliente ou banco local) no formato exibido no dashboard"""
+        estatisticas = []
+        for linha in linhas:
+            total = linha['total_analises']
+            estatisticas.append({
+                'codigo_curso': linha['codigo_curso'],
+                'nome': linha['nome'],
+                'descricao_curso': linha.get('descricao_curso', ''),
+                'total_analises': total,
+                'media_score': round(float(linha['media_score'] or 0), 2),
+                'score_maximo': linha['score_maximo'] or 0,
+                'score_minimo': linha['score_minimo'] or 0,
+                'adequadas': linha['adequadas'],
+                'inadequadas': linha['inadequadas'],
+                'taxa_adequacao': f"{(linha['adequadas']/total)*100:.1f}%" if total > 0 else "0%"
+            })
+        
+        # Ordenar por total de análises (decrescente)
+        estatisticas.sort(key=lambda x: x['total_analises'], reverse=True)
+        return estatisticas
+    
+    def _agregar_estatisticas_por_curso(self, professor_id: str) -> List[Dict]:
+        """Agregação no cliente, para bancos sem a função estatisticas_cursos_professor"""
+        response = self.client.table("analise_curso").select(
+            """
+            curso_fk,
+            cursos!inner(
+                codigo_curso,
+                nome,
+                descricao_curso
+            ),
+            analises!inner(
+                score,
+                adequado,
+                professor_id
+            )
+            """
+        ).eq("analises.professor_id", professor_id).execute()
+        
+        cursos_dict = {}
+        for item in response.data or []:
+            curso_info = item['cursos']
+            analise_info = item['analises']
+            linha = cursos_dict.setdefault(curso_info['codigo_curso'], {
+                'codigo_curso': curso_info['codigo_curso'],
+                'nome': curso_info['nome'],
+                'descricao_curso': curso_info.get('descricao_curso', ''),
+                'total_analises': 0,
+                'soma': 0,
+                'score_minimo': None,
+                'score_maximo': None,
+                'adequadas': 0,
+                'inadequadas': 0
+            })
+            score = analise_info['score']
+            linha['total_analises'] += 1
+            linha['soma'] += score
+            linha['score_minimo'] = score if linha['score_minimo'] is None else min(linha['score_minimo'], score)
+            linha['score_maximo'] = score if linha['score_maximo'] is None else max(linha['score_maximo'], score)
+            if analise_info['adequado']:
+                linha['adequadas'] += 1
+            else:
+                linha['inadequadas'] += 1
+        
+        for linha in cursos_dict.values():
+            linha['media_score'] = linha.pop('soma') / linha['total_analises']
+        return list(cursos_dict.values())
+    
+    def get_course_dashboard_stats(self, curso_codigo: str, professor_id: str) -> Optional[Dict]:
+        """
+        Indicadores do dashboard do curso, lidos de estatisticas_curso_professor
+        
+        Os agregados são mantidos por gatilhos a cada análise criada ou removida,
+        então a leitura é uma linha, independente do número de análises.
+        
+        Returns:
+            Optional[Dict]: indicadores (ver _formatar_painel); None se não há análises
+            ou a tabela ainda não existe (o dashboard calcula sobre o histórico carregado)
+        """
+        try:
+            if not self.use_supabase:
+                return self._formatar_painel(self.local_db.get_course_dashboard_stats(curso_codigo, professor_id))
+            
+            response = self._query_painel(self.client, curso_codigo, professor_id).execute()
+            return self._formatar_painel(response.data[0] if response.data else None)
+        except Exception as e:
+            print(f"Erro ao buscar estatísticas do dashboard: {e}")
+            return None
+    
+    def _query_painel(self, client, curso_codigo: str, professor_id: str):
+        """Consulta da linha de agregados do professor no curso (cliente síncrono ou assíncrono)"""
+        return client.table("estatisticas_curso_professor").select(
+            "total_analises, soma_score, soma_quadrados, score_minimo, score_maximo, adequadas, histograma"
+        ).eq("professor_id", professor_id).eq("curso_fk", curso_codigo)
+    
+    def _formatar_painel(self, linha: Optional[Dict]) -> Optional[Dict]:
+        """Deriva média, desvio padrão e contagens por faixa a partir dos agregados"""
+        if not linha or not linha.get('total_analises'):
+            return None
+        
+        total = linha['total_analises']
+        media = linha['soma_score'] / total
+        # Desvio padrão amostral (mesmo do pandas Series.std())
+        variancia = (linha['soma_quadrados'] - total * media ** 2) / (total - 1) if total > 1 else 0.0
+        histograma = [int(quantidade) for quantidade in linha['histograma']]
+        return {
+            'total_analises': total,
+            'adequadas': linha['adequadas'],
+            'inadequadas': total - linha['adequadas'],
+            'media_score': media,
+            'desvio_padrao': math.sqrt(max(variancia, 0.0)),
+            'score_minimo': linha['score_minimo'],
+            'score_maximo': linha['score_maximo'],
+            # histograma[i]: scores de 10*i a 10*i+9 (a última faixa inclui o 100)
+            'histograma': histograma,
+            'scores_acima_70': sum(histograma[7:]),
+            'scores_abaixo_50': sum(histograma[:5])
+        }
+
+    def load_course_overview(self, curso_codigo: str, professor_id: str, historico_limit: int = 50) -> Dict:
+        """
+        Carrega de uma vez os dados independentes da página do curso
+
+        Curso, disciplinas, primeira página do histórico e estatísticas por
+        curso não dependem uns dos outros: as consultas saem juntas (fachada
+        assíncrona) em vez de uma após a outra. Dados de referência já em
+        cache não geram consulta. Uma consulta que falha (inclusive função RPC
+        ausente) é refeita pelo método síncrono equivalente, que trata cada caso.
+
+        Returns:
+            Dict: {'curso', 'disciplinas', 'historico' (página de list_analises_curso_professor), 'estatisticas',
+                   'painel' (get_course_dashboard_stats)}
+        """
+        if not self.use_supabase:
+            return {
+                'curso': self.get_curso_by_codigo(curso_codigo),
+                'disciplinas': self.get_curso_disciplines(curso_codigo),
+                'historico': self.list_analises_curso_professor(curso_codigo, professor_id, limit=historico_limit),
+                'estatisticas': self.get_estatisticas_por_curso_do_professor(professor_id),
+                'painel': self.get_course_dashboard_stats(curso_codigo, professor_id)
+            }
+
+        curso = self.cache.lookup("curso", curso_codigo)
+        disciplinas = self.cache.lookup("curso_disciplinas", curso_codigo)
+        # VALIDAÇÃO DE SEGURANÇA (mesma de list_analises_curso_professor)
+        acesso = curso_codigo in [curso_prof['codigo_curso'] for curso_prof in self.get_professor_courses(professor_id)]
+
+        consultas = {
+            'estatisticas': lambda c: c.rpc("estatisticas_cursos_professor", {"p_professor_id": professor_id})
+        }
+        if curso is None:
+            consultas['curso'] = lambda c: c.table("cursos").select("*").eq("codigo_curso", curso_codigo)
+        if disciplinas is None:
+            consultas['curso_disciplinas'] = lambda c: c.table("cursos_disciplina").select("disciplina_fk").eq("curso_fk", curso_codigo)
+        if acesso:
+            consultas['historico'] = lambda c: self._query_analises_page(c, curso_codigo, professor_id, historico_limit, None)
+            consultas['painel'] = lambda c: self._query_painel(c, curso_codigo, professor_id)
+
+        resultados = self._execute_queries(consultas)
+
+        if curso is None:
+            dados = resultados['curso']
+            if isinstance(dados, Exception):
+                curso = self.get_curso_by_codigo(curso_codigo)
+            else:
+                curso = dados[0] if dados else None
+                self.cache.store("curso", curso_codigo, curso)
+
+        if disciplinas is None:
+            relacionamentos = resultados['curso_disciplinas']
+            if isinstance(relacionamentos, Exception):
+                disciplinas = self.get_curso_disciplines(curso_codigo)
+            else:
+                try:
+                    disciplinas = self._get_disciplinas_by_ids([rel['disciplina_fk'] for rel in relacionamentos or []])
+                    self.cache.store("curso_disciplinas", curso_codigo, disciplinas)
+                except Exception as e:
+                    print(f"Erro ao buscar disciplinas do curso: {e}")
+                    disciplinas = []
+
+        historico = resultados.get('historico')
+        if historico is None or isinstance(historico, Exception):
+            historico = self.list_analises_curso_professor(curso_codigo, professor_id, limit=historico_limit)
+        else:
+            historico = self._montar_pagina(historico, historico_limit)
+
+        linhas = resultados['estatisticas']
+        if isinstance(linhas, Exception):
+            estatisticas = self.get_estatisticas_por_curso_do_professor(professor_id)
+        else:
+            estatisticas = self._formatar_estatisticas(linhas or [])
+
+        painel = resultados.get('painel')
+        if isinstance(painel, Exception):
+            print(f"⚠️ Agregados do dashboard indisponíveis ({painel}); calculando sobre o histórico")
+            painel = None
+        else:
+            painel = self._formatar_painel(painel[0] if painel else None)
+
+        return {
+            'curso': curso,
+            'disciplinas': disciplinas,
+            'historico': historico,
+            'estatisticas': estatisticas,
+            'painel': painel
+        }
+
     def test_analises_table(self) -> bool:
         """Testa se a tabela analises existe e está acessível"""
         try:
@@ -897,6 +1559,8 @@ class SupabaseDatabase:
             print("✅ Tabela 'analises' existe e está acessível")
             return True
         except Exception as e:
+            if is_connection_error(e):
+                raise
             print(f"❌ Erro ao acessar tabela 'analises': {e}")
             # Verificar se é erro de tabela não encontrada
             if "relation" in str(e).lower() and "does not exist" in str(e).lower():
@@ -959,12 +1623,212 @@ class SupabaseDatabase:
                 print(f"❌ Tabela 'analises' não existe e não pode ser criada: {e2}")
                 return False
     
+    def _clean_analise_data(self, analise_data: Dict) -> Optional[Dict]:
+        """Valida campos obrigatórios e remove campos opcionais vazios de uma análise"""
+        required_fields = ['nome_aluno', 'ementa_fk', 'adequado', 'score', 'texto_analise', 'professor_id']
+        for field in required_fields:
+            if field not in analise_data:
+                print(f"❌ Campo obrigatório '{field}' não encontrado nos dados")
+                print(f"🔍 [DEBUG] Campos disponíveis: {list(analise_data.keys())}")
+                return None
+        
+        # Limpar dados antes de inserir (remover campos None ou vazios, mas manter campos opcionais válidos)
+        clean_data = {}
+        for k, v in analise_data.items():
+            # Manter campos obrigatórios mesmo se vazios (exceto None)
+            if k in required_fields:
+                if v is not None:
+                    clean_data[k] = v
+            # Manter campos opcionais se tiverem valor
+            elif v is not None and v != "":
+                clean_data[k] = v
+        
+        # Garantir que todos os campos obrigatórios estão presentes
+        for field in required_fields:
+            if field not in clean_data:
+                print(f"❌ Campo obrigatório '{field}' está faltando após limpeza")
+                return None
+        
+        return clean_data
+    
+    def _store_artifacts(self, client: Client, rows: List[Dict]):
+        """
+        Move `dados_estruturados_json` das linhas para a tabela artefatos_analise
+        
+        Grava todos os artefatos do lote em um único upsert (hashes repetidos são
+        ignorados) e troca o campo por `artefato_hash`. Se a tabela ainda não existir,
+        as linhas ficam como estão (coluna inline legada).
+        """
+        artefatos = {}
+        hashes = []
+        for row in rows:
+            dados_json = row.get('dados_estruturados_json')
+            if not dados_json:
+                hashes.append(None)
+                continue
+            content_hash, encoded, tamanho = pack_structured_data(json.loads(dados_json))
+            artefatos[content_hash] = {
+                'hash_conteudo': content_hash,
+                'conteudo_gzip': encoded,
+                'tamanho_original': tamanho
+            }
+            hashes.append(content_hash)
+        
+        if not artefatos:
+            return
+        
+        try:
+            client.table("artefatos_analise").upsert(
+                list(artefatos.values()), on_conflict="hash_conteudo", ignore_duplicates=True
+            ).execute()
+        except Exception as e:
+            print(f"⚠️ Não foi possível gravar artefatos (mantendo dados estruturados na análise): {e}")
+            return
+        
+        for row, content_hash in zip(rows, hashes):
+            if content_hash:
+                row.pop('dados_estruturados_json', None)
+                row['artefato_hash'] = content_hash
+    
+    def get_artefatos(self, hashes: List[str]) -> Dict[str, Dict]:
+        """Busca e descomprime vários artefatos de uma vez (hash -> dados estruturados)"""
+        hashes = [h for h in hashes if h]
+        if not hashes or not self.use_supabase:
+            return {}
+        try:
+            client = self._get_client(prefer_service_role=True)
+            artefatos = {}
+            for start in range(0, len(hashes), 100):
+                response = client.table("artefatos_analise").select("hash_conteudo, conteudo_gzip").in_(
+                    "hash_conteudo", list(dict.fromkeys(hashes[start:start + 100]))
+                ).execute()
+                for artefato in response.data or []:
+                    artefatos[artefato['hash_conteudo']] = unpack_structured_data(artefato['conteudo_gzip'])
+            return artefatos
+        except Exception as e:
+            print(f"Erro ao buscar artefatos: {e}")
+            return {}
+    
+    def get_dados_estruturados_analise(self, analise: Dict) -> Optional[Dict]:
+        """Dados estruturados de uma análise: artefato (se houver) ou coluna inline legada"""
+        if analise.get('artefato_hash'):
+            return self.get_artefatos([analise['artefato_hash']]).get(analise['artefato_hash'])
+        if analise.get('dados_estruturados_json'):
+            return json.loads(analise['dados_estruturados_json'])
+        return None
+    
+    def create_analises_bulk(self, rows: List[Dict], curso_codigo: str = None) -> List[Dict]:
+        """
+        Cria várias análises e seus vínculos com o curso em uma única ida ao banco
+        
+        Usa a função `criar_analises_em_lote` (ver SUPABASE_SCHEMA.md), que insere
+        análises e analise_curso na mesma transação. Se a função ainda não existir
+        no banco, faz dois inserts em lote e remove as análises caso os vínculos falhem.
+        
+        Args:
+            rows: Dados das análises (mesmo formato de create_analise)
+            curso_codigo: Curso ao qual todas as análises serão vinculadas
+            
+        Returns:
+            List[Dict]: Análises criadas (com analise_id); lista vazia em caso de erro
+        """
+        if not rows:
+            return []
+        
+        if not self.use_supabase:
+            try:
+                clean_rows = [self._clean_analise_data(row) for row in rows]
+                return self.local_db.create_analises_bulk([row for row in clean_rows if row], curso_codigo)
+            except Exception as e:
+                print(f"❌ Erro ao salvar análises no banco local: {e}")
+                return []
+        
+        # Linhas inválidas são descartadas (como no banco local); as demais seguem, cada uma
+        # com sua chave_idempotencia (a mesma se o lote acabar na fila de escritas)
+        clean_rows = [
+            self._com_chave_idempotencia(row) for row in (self._clean_analise_data(row) for row in rows) if row
+        ]
+        if not clean_rows:
+            return []
+        
+        # Ementas ainda na fila de escritas: as análises esperam na fila também
+        self.sync_pending_writes()
+        if any(self._pending_reference(row) for row in clean_rows):
+            print(f"⏳ Ementa ainda não gravada no Supabase; {len(clean_rows)} análise(s) na fila de escritas")
+            return self.write_queue.enqueue_analises(clean_rows, curso_codigo)
+        clean_rows = [self._resolve_references(row) for row in clean_rows]
+        
+        client = self._get_client(prefer_service_role=True)
+        if not client:
+            print("❌ Nenhum cliente Supabase disponível!")
+            return []
+        
+        self._store_artifacts(client, clean_rows)
+        
+        try:
+            response = client.rpc("criar_analises_em_lote", {
+                "p_analises": clean_rows,
+                "p_curso_codigo": curso_codigo
+            }).execute()
+            print(f"✅ {len(response.data or [])} análise(s) criada(s) em lote")
+            return response.data or []
+        except Exception as e:
+            if self._can_queue(e):
+                print(f"⏳ Sem conexão com o Supabase; {len(clean_rows)} análise(s) na fila de escritas: {e}")
+                return self.write_queue.enqueue_analises(clean_rows, curso_codigo)
+            if "criar_analises_em_lote" not in str(e) and "PGRST202" not in str(e):
+                print(f"❌ Erro ao criar análises em lote: {e}")
+                return []
+            print("⚠️ Função criar_analises_em_lote não encontrada; usando inserts em lote")
+        
+        try:
+            criadas = self._insert_idempotente(client, "analises", clean_rows)
+        except Exception as e:
+            if self._can_queue(e):
+                print(f"⏳ Sem conexão com o Supabase; {len(clean_rows)} análise(s) na fila de escritas: {e}")
+                return self.write_queue.enqueue_analises(clean_rows, curso_codigo)
+            print(f"❌ Erro ao criar análises em lote: {e}")
+            return []
+        
+        if curso_codigo and criadas:
+            try:
+                client.table("analise_curso").upsert(
+                    [{'analise_fk': analise['analise_id'], 'curso_fk': curso_codigo} for analise in criadas],
+                    on_conflict="analise_fk,curso_fk",
+                    ignore_duplicates=True
+                ).execute()
+            except Exception as e:
+                # Sem vínculo a análise fica invisível no curso: desfazer os inserts
+                print(f"❌ Erro ao vincular análises ao curso {curso_codigo}: {e}")
+                try:
+                    client.table("analises").delete().in_(
+                        "analise_id", [analise['analise_id'] for analise in criadas]
+                    ).execute()
+                except Exception as rollback_error:
+                    print(f"❌ Erro ao desfazer análises sem vínculo: {rollback_error}")
+                return []
+        
+        print(f"✅ {len(criadas)} análise(s) criada(s) em lote")
+        return criadas
+    
     def create_analise(self, analise_data: Dict, curso_codigo: str = None) -> Optional[Dict]:
-        """Cria uma nova análise e opcionalmente vincula a um curso"""
+        """
+        Cria uma nova análise e opcionalmente vincula a um curso
+        
+        Com curso_codigo, a análise devolvida traz `curso_vinculado` (resposta do upsert do
+        vínculo). No banco local e na fila de escritas o vínculo é gravado junto com a análise.
+        """
         try:
-            # Se não estamos usando Supabase, usar TinyDB
+            # Se não estamos usando Supabase, usar o banco local
             if not self.use_supabase:
-                return self._create_analise_tinydb(analise_data, curso_codigo)
+                clean_data = self._clean_analise_data(analise_data)
+                return self.local_db.create_analise(clean_data, curso_codigo) if clean_data else None
+            
+            # Ementa ainda na fila de escritas: a análise espera na fila também
+            if self._pending_reference(analise_data):
+                clean_data = self._clean_analise_data(analise_data)
+                return self.write_queue.enqueue_analises([clean_data], curso_codigo)[0] if clean_data else None
+            analise_data = self._com_chave_idempotencia(self._resolve_references(analise_data))
             
             # Verificar se algum cliente está disponível
             client = self._get_client(prefer_service_role=True)
@@ -980,45 +1844,24 @@ class SupabaseDatabase:
                 print("❌ Tabela 'analises' não existe ou não está acessível")
                 return None
             
-            # Validar dados obrigatórios
-            required_fields = ['nome_aluno', 'ementa_fk', 'adequado', 'score', 'texto_analise', 'professor_id']
-            for field in required_fields:
-                if field not in analise_data:
-                    print(f"❌ Campo obrigatório '{field}' não encontrado nos dados")
-                    print(f"🔍 [DEBUG] Campos disponíveis: {list(analise_data.keys())}")
-                    return None
-            
-            print(f"🔍 [DEBUG] Todos os campos obrigatórios estão presentes")
-            
-            # Limpar dados antes de inserir (remover campos None ou vazios, mas manter campos opcionais válidos)
-            clean_data = {}
-            for k, v in analise_data.items():
-                # Manter campos obrigatórios mesmo se vazios (exceto None)
-                if k in required_fields:
-                    if v is not None:
-                        clean_data[k] = v
-                # Manter campos opcionais se tiverem valor
-                elif v is not None and v != "":
-                    clean_data[k] = v
+            # Validar e limpar dados obrigatórios
+            clean_data = self._clean_analise_data(analise_data)
+            if clean_data is None:
+                return None
             
-            # Garantir que todos os campos obrigatórios estão presentes
-            for field in required_fields:
-                if field not in clean_data:
-                    print(f"❌ Campo obrigatório '{field}' está faltando após limpeza")
-                    return None
+            # Dados estruturados vão para artefatos_analise (comprimidos, deduplicados)
+            self._store_artifacts(client, [clean_data])
             
             print(f"🔍 [DEBUG] Dados limpos para inserção: {clean_data}")
             
             # Usar cliente apropriado para operações de escrita
             print(f"🔍 [DEBUG] Enviando requisição para Supabase...")
-            response = client.table("analises").insert(clean_data).execute()
+            criadas = self._insert_idempotente(client, "analises", [clean_data])
             
-            print(f"🔍 [DEBUG] Resposta do Supabase: {response}")
-            print(f"🔍 [DEBUG] Dados retornados: {response.data}")
-            print(f"🔍 [DEBUG] Erro (se houver): {getattr(response, 'error', None)}")
+            print(f"🔍 [DEBUG] Dados retornados: {criadas}")
             
-            if response.data and len(response.data) > 0:
-                analise_created = response.data[0]
+            if criadas:
+                analise_created = criadas[0]
                 analise_id = analise_created.get('analise_id')
                 print(f"✅ Análise criada com sucesso! ID: {analise_id}")
                 print(f"   Nome do aluno: {analise_created.get('nome_aluno', 'N/A')}")
@@ -1033,23 +1876,14 @@ class SupabaseDatabase:
                     print(f"   Análise ID: {analise_id}")
                     print(f"   Curso Código: {curso_codigo}")
                     
-                    # Tentar criar relacionamento múltiplas vezes se necessário
-                    relacionamento_success = False
-                    max_retries = 3
-                    for attempt in range(1, max_retries + 1):
-                        print(f"🔍 [DEBUG] Tentativa {attempt}/{max_retries} de criar relacionamento...")
-                        relacionamento_success = self.create_analise_curso_relacionamento(analise_id, curso_codigo)
-                        if relacionamento_success:
-                            break
-                        if attempt < max_retries:
-                            import time
-                            time.sleep(0.5)  # Aguardar um pouco antes de tentar novamente
+                    # Upsert idempotente: a resposta confirma o vínculo, sem novas tentativas nem releitura
+                    analise_created['curso_vinculado'] = self.create_analise_curso_relacionamento(analise_id, curso_codigo)
                     
-                    if relacionamento_success:
+                    if analise_created['curso_vinculado']:
                         print(f"✅ Relacionamento analise_curso criado com sucesso!")
                         print(f"   Análise ID: {analise_id} <-> Curso: {curso_codigo}")
                     else:
-                        print(f"⚠️ Falha ao criar relacionamento após {max_retries} tentativas")
+                        print(f"⚠️ Falha ao criar relacionamento")
                         print(f"   Análise foi salva com ID: {analise_id}")
                         print(f"   Tente criar o relacionamento manualmente se necessário")
                         print(f"   SQL: INSERT INTO analise_curso (analise_fk, curso_fk) VALUES ({analise_id}, '{curso_codigo}');")
@@ -1062,37 +1896,18 @@ class SupabaseDatabase:
                 return analise_created
             else:
                 print("❌ Nenhum dado retornado na criação da análise")
-                print(f"🔍 [DEBUG] Response completa: {response}")
-                if hasattr(response, 'error') and response.error:
-                    print(f"❌ Erro do Supabase: {response.error}")
                 return None
                 
         except Exception as e:
+            clean_data = self._clean_analise_data(analise_data) if self._can_queue(e) else None
+            if clean_data:
+                print(f"⏳ Sem conexão com o Supabase; análise guardada na fila de escritas: {e}")
+                return self.write_queue.enqueue_analises([clean_data], curso_codigo)[0]
             print(f"❌ Erro ao criar análise: {e}")
             import traceback
             print(f"🔍 [DEBUG] Traceback completo: {traceback.format_exc()}")
             return None
     
-    def _create_analise_tinydb(self, analise_data: Dict, curso_codigo: str = None) -> Optional[Dict]:
-        """Cria análise usando TinyDB como fallback"""
-        try:
-            # Adicionar campo prontuario_professor para compatibilidade com TinyDB
-            if 'professor_id' in analise_data:
-                analise_data['prontuario_professor'] = analise_data['professor_id']
-            
-            # Salvar análise no TinyDB
-            analise_id = self.tinydb.analise.insert(analise_data)
-            
-            if analise_id:
-                analise_data['analise_id'] = analise_id
-                return analise_data
-            else:
-                return None
-                
-        except Exception as e:
-            print(f"❌ Erro ao salvar análise no TinyDB: {e}")
-            return None
-    
     def get_analise_complete(self, analise_id: int) -> Optional[Dict]:
         """Busca análise completa com dados da ementa e professor"""
         try:
@@ -1122,6 +1937,12 @@ class SupabaseDatabase:
             bool: True se criou com sucesso, False se já existia ou houve erro
         """
         try:
+            if not self.use_supabase:
+                criado = self.local_db.create_professor_curso_relationship(prontuario_professor, codigo_curso)
+                self.cache.invalidate("professor_cursos")
+                return criado
+
+            self.sync_pending_writes()
             # Verificar se o relacionamento já existe
             existing = self.client.table("professor_curso").select("*").eq(
                 "prontuario_professor", prontuario_professor
@@ -1137,6 +1958,7 @@ class SupabaseDatabase:
                 "prontuario_professor": prontuario_professor,
                 "curso_fk": codigo_curso
             }).execute()
+            self.cache.invalidate("professor_cursos")
             
             if response.data:
                 print(f"✅ Relacionamento criado: Professor {prontuario_professor} associado ao curso {codigo_curso}")
@@ -1146,25 +1968,50 @@ class SupabaseDatabase:
                 return False
                 
         except Exception as e:
+            if self._can_queue(e):
+                self.cache.invalidate("professor_cursos")
+                return self._queue_relationship(
+                    "professor_curso", {'prontuario_professor': prontuario_professor, 'curso_fk': codigo_curso},
+                    "prontuario_professor,curso_fk"
+                )
             print(f"Erro ao criar relacionamento professor-curso: {e}")
             return False
     
     def create_curso_disciplina_relationship(self, codigo_curso: str, id_disciplina: str) -> bool:
         """Cria relacionamento entre curso e disciplina"""
         try:
+            if not self.use_supabase:
+                criado = self.local_db.create_curso_disciplina_relationship(codigo_curso, id_disciplina)
+                self.cache.invalidate("curso_disciplinas")
+                return criado
+
             client = self._get_client(prefer_service_role=True) or self.client
             response = client.table("cursos_disciplina").insert({
                 "curso_fk": codigo_curso,
                 "disciplina_fk": id_disciplina
             }).execute()
+            self.cache.invalidate("curso_disciplinas")
             return len(response.data) > 0
         except Exception as e:
+            if self._can_queue(e):
+                return self._queue_relationship(
+                    "cursos_disciplina", {'curso_fk': codigo_curso, 'disciplina_fk': id_disciplina}, "curso_fk,disciplina_fk"
+                )
             print(f"Erro ao criar relacionamento curso-disciplina: {e}")
             return False
     
     def create_ementa_disciplina_relationship(self, id_ementa: int, id_disciplina: str) -> bool:
         """Cria relacionamento entre ementa e disciplina"""
         try:
+            if not self.use_supabase:
+                return self.local_db.create_ementa_disciplina_relationship(id_ementa, id_disciplina)
+
+            if self._pending_reference({'ementa_fk': id_ementa}):
+                return self._queue_relationship(
+                    "ementa_disciplina", {'ementa_fk': id_ementa, 'disciplina_fk': id_disciplina}, "ementa_fk,disciplina_fk"
+                )
+            id_ementa = self._resolve_references({'ementa_fk': id_ementa})['ementa_fk']
+            
             client = self._get_client(prefer_service_role=True) or self.client
             response = client.table("ementa_disciplina").insert({
                 "ementa_fk": id_ementa,
@@ -1172,6 +2019,10 @@ class SupabaseDatabase:
             }).execute()
             return len(response.data) > 0
         except Exception as e:
+            if self._can_queue(e):
+                return self._queue_relationship(
+                    "ementa_disciplina", {'ementa_fk': id_ementa, 'disciplina_fk': id_disciplina}, "ementa_fk,disciplina_fk"
+                )
             print(f"Erro ao criar relacionamento ementa-disciplina: {e}")
             return False
     
@@ -1180,6 +2031,14 @@ class SupabaseDatabase:
     def update_analise_comentario(self, analise_id: int, comentario: str, professor_id: str) -> bool:
         """Atualiza o comentário de uma análise"""
         try:
+            # Análise ainda na fila de escritas: o comentário também espera (a
+            # reaplicação filtra por professor_id, então a permissão vale no servidor)
+            if self.use_supabase and self._pending_reference({'analise_id': analise_id}):
+                self.write_queue.enqueue_comentario(analise_id, comentario, professor_id)
+                return True
+            if self.use_supabase:
+                analise_id = self._resolve_references({'analise_id': analise_id})['analise_id']
+            
             # Verificar se a análise existe e pertence ao professor
             analise_data = self.get_analise_by_id(analise_id)
             if not analise_data:
@@ -1190,9 +2049,9 @@ class SupabaseDatabase:
                 print(f"❌ Professor não tem permissão para atualizar esta análise")
                 return False
             
-            # Se não estamos usando Supabase, usar TinyDB
+            # Se não estamos usando Supabase, usar o banco local
             if not self.use_supabase:
-                return self._update_analise_comentario_tinydb(analise_id, comentario, professor_id)
+                return self.local_db.update_analise_comentario(analise_id, comentario, professor_id)
             
             # Verificar se algum cliente está disponível
             client = self._get_client(prefer_service_role=True)
@@ -1226,6 +2085,10 @@ class SupabaseDatabase:
                             print(f"   Execute: ALTER TABLE analises ADD COLUMN comentario TEXT;")
                     return False
             except Exception as update_error:
+                if self._can_queue(update_error):
+                    print(f"⏳ Sem conexão com o Supabase; comentário na fila de escritas: {update_error}")
+                    self.write_queue.enqueue_comentario(analise_id, comentario, professor_id)
+                    return True
                 error_msg = str(update_error)
                 if 'column' in error_msg.lower() and 'comentario' in error_msg.lower():
                     print(f"❌ Coluna 'comentario' não existe na tabela 'analises'")
@@ -1241,34 +2104,12 @@ class SupabaseDatabase:
             print(f"🔍 [DEBUG] Traceback completo: {traceback.format_exc()}")
             return False
     
-    def _update_analise_comentario_tinydb(self, analise_id: int, comentario: str, professor_id: str) -> bool:
-        """Atualiza comentário usando TinyDB como fallback"""
-        try:
-            from tinydb import Query
-            analise = Query()
-            
-            # Verificar se a análise existe e pertence ao professor
-            analise_data = self.tinydb.analise.search(
-                (analise.analise_id == analise_id) & 
-                (analise.prontuario_professor == professor_id)
-            )
-            
-            if not analise_data:
-                return False
-            
-            # Atualizar comentário
-            self.tinydb.analise.update(
-                {'comentario': comentario},
-                analise.analise_id == analise_id
-            )
-            return True
-        except Exception as e:
-            print(f"❌ Erro ao atualizar comentário no TinyDB: {e}")
-            return False
-    
     def delete_analise(self, analise_id: int, professor_id: str) -> bool:
         """Deleta uma análise específica, verificando se o professor tem permissão"""
         try:
+            if not self.use_supabase:
+                return self.local_db.delete_analise(analise_id, professor_id)
+
             # Verificar se a análise existe e pertence ao professor
             response = self.client.table("analises").select("*").eq("analise_id", analise_id).eq("professor_id", professor_id).execute()
             
@@ -1285,6 +2126,9 @@ class SupabaseDatabase:
     def delete_ementa(self, id_ementa: int, professor_id: str) -> bool:
         """Deleta uma ementa e todas suas análises relacionadas"""
         try:
+            if not self.use_supabase:
+                return self.local_db.delete_ementa(id_ementa, professor_id)
+
             # Verificar se a ementa existe e pertence ao professor
             response = self.client.table("ementas").select("*").eq("id_ementa", id_ementa).eq("professor_id", professor_id).execute()
             
@@ -1303,30 +2147,68 @@ class SupabaseDatabase:
         except Exception as e:
             print(f"Erro ao deletar ementa: {e}")
             return False
-    
+
+    def cleanup_orphaned_data(self, dry_run: bool = False) -> Dict:
+        """
+        Limpa dados órfãos: disciplinas e tags sem curso, ementas sem disciplinas e sem análises
+
+        No Supabase roda na função cleanup_orphaned_data (anti-joins e um DELETE
+        por tabela no servidor). Ementas com análises nunca são removidas, pois o
+        DELETE levaria as análises junto (ON DELETE CASCADE).
+
+        Args:
+            dry_run: Apenas relata o que seria removido, sem remover
+
+        Returns:
+            Dict com contagem por tabela ('disciplinas_removidas', 'tags_removidas',
+            'ementas_removidas') e os IDs em 'ids'; {} em caso de erro
+        """
+        try:
+            if not self.use_supabase:
+                return self.local_db.cleanup_orphaned_data(dry_run=dry_run)
+
+            # Remoção em massa: requer service role
+            client = self._get_client(prefer_service_role=True)
+            response = client.rpc("cleanup_orphaned_data", {"p_dry_run": dry_run}).execute()
+            resultado = response.data or {}
+
+            if not dry_run:
+                self.cache.invalidate("disciplinas", "disciplina", "curso_disciplinas")
+            total = sum(resultado.get(chave, 0) for chave in ('disciplinas_removidas', 'tags_removidas', 'ementas_removidas'))
+            print(f"{'🔍 Seriam removidos' if dry_run else '🧹 Removidos'} {total} registro(s) órfão(s)")
+            return resultado
+        except Exception as e:
+            if "cleanup_orphaned_data" in str(e) or "PGRST202" in str(e):
+                print("⚠️ Função cleanup_orphaned_data não encontrada; execute a migração 6 do SUPABASE_SCHEMA.md")
+            else:
+                print(f"Erro ao limpar dados órfãos: {e}")
+            return {}
+
     # ==================== FILTRAGEM E BUSCA ====================
     
-    def search_ementas_by_name(self, nome_disciplina: str) -> List[Dict]:
-        """Busca ementas por nome da disciplina"""
+    def search_ementas_by_name(self, nome_disciplina: str, limit: int = 50) -> List[Dict]:
+        """Busca ementas por nome da disciplina (sem acento, mais relevantes primeiro)"""
         try:
-            # Buscar disciplinas que contenham o nome
-            response = self.client.table("disciplinas").select("id_disciplina").ilike("nome", f"%{nome_disciplina}%").execute()
-            disciplina_ids = [disc['id_disciplina'] for disc in response.data]
-            
-            ementas = []
-            for disciplina_id in disciplina_ids:
-                ementas_disciplina = self.filter_ementas_by_disciplina(disciplina_id)
-                ementas.extend(ementas_disciplina)
-            
-            # Remover duplicatas
-            seen = set()
-            unique_ementas = []
-            for ementa in ementas:
-                if ementa['id_ementa'] not in seen:
-                    seen.add(ementa['id_ementa'])
-                    unique_ementas.append(ementa)
-            
-            return unique_ementas
+            if not self.use_supabase:
+                return self.local_db.search_ementas_by_name(nome_disciplina, limit)
+
+            try:
+                response = self.client.rpc("buscar_ementas_por_disciplina", {
+                    "p_termo": nome_disciplina,
+                    "p_limite": limit
+                }).execute()
+                ementa_ids = [row['id_ementa'] for row in response.data or []]
+            except Exception as e:
+                if "buscar_ementas_por_disciplina" not in str(e) and "PGRST202" not in str(e):
+                    raise
+                print("⚠️ Função buscar_ementas_por_disciplina não encontrada; usando ilike")
+                response = self.client.table("disciplinas").select("id_disciplina").ilike("nome", f"%{nome_disciplina}%").execute()
+                disciplina_ids = [disc['id_disciplina'] for disc in response.data]
+                relacoes = self._select_in("ementa_disciplina", "disciplina_fk", disciplina_ids, "ementa_fk")
+                ementa_ids = list(dict.fromkeys(rel['ementa_fk'] for rel in relacoes))[:limit]
+            
+            # Dados das ementas em lote, mantendo a ordem de relevância
+            return self._get_ementas_complete(ementa_ids)
         except Exception as e:
             print(f"Erro ao buscar ementas por nome: {e}")
             return []
@@ -1334,16 +2216,11 @@ class SupabaseDatabase:
     def filter_ementas_by_disciplina(self, id_disciplina: str) -> List[Dict]:
         """Filtra ementas por disciplina"""
         try:
+            if not self.use_supabase:
+                return self.local_db.filter_ementas_by_disciplina(id_disciplina)
+
             response = self.client.table("ementa_disciplina").select("ementa_fk").eq("disciplina_fk", id_disciplina).execute()
-            ementa_ids = [rel['ementa_fk'] for rel in response.data]
-            
-            ementas = []
-            for ementa_id in ementa_ids:
-                ementa_data = self.get_ementa_complete(ementa_id)
-                if ementa_data:
-                    ementas.append(ementa_data)
-            
-            return ementas
+            return self._get_ementas_complete([rel['ementa_fk'] for rel in response.data])
         except Exception as e:
             print(f"Erro ao filtrar ementas por disciplina: {e}")
             return []
@@ -1351,6 +2228,9 @@ class SupabaseDatabase:
     def get_recent_ementas(self, limit: int = 10) -> List[Dict]:
         """Busca ementas mais recentes"""
         try:
+            if not self.use_supabase:
+                return self.local_db.get_recent_ementas(limit)
+
             response = self.client.table("ementas").select("*").order("data_upload", desc=True).limit(limit).execute()
             return response.data
         except Exception as e:
@@ -0,0 +1,227 @@
+"""
+Armazenamento dos arquivos TinyDB com escrita atômica e write-behind
+
+Com o JSONStorage padrão, cada insert/update/remove serializa e regrava o
+arquivo inteiro. Aqui:
+
+- AtomicJSONStorage grava em um arquivo temporário no mesmo diretório e
+  troca com os.replace, então uma falha no meio da escrita nunca deixa um
+  JSON truncado;
+- WriteBehindMiddleware mantém os dados em memória e agrupa as escritas
+  (group commit): o arquivo só é regravado quando acumula `max_pending_writes`
+  alterações, quando passa `flush_interval` segundos da primeira alteração
+  pendente, ao sair de um bloco `transaction()` ou ao encerrar o processo.
+
+shared_write_behind_storage() devolve uma única instância por arquivo, para
+que várias instâncias de AnalyseDatabaseSeparado no mesmo processo (o
+helper.py cria uma por chamada) enxerguem as escritas ainda não gravadas.
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from tinydb.middlewares import Middleware
+from tinydb.storages import Storage, touch
+
+
+class AtomicJSONStorage(Storage):
+    """JSONStorage sem handle aberto, com troca atômica do arquivo na escrita"""
+
+    def __init__(self, path: str, create_dirs: bool = False, encoding: str = 'utf-8', **kwargs):
+        super().__init__()
+        self.path = path
+        self.encoding = encoding
+        self.kwargs = kwargs
+        touch(path, create_dirs=create_dirs)
+
+    def read(self) -> Optional[Dict]:
+        with open(self.path, 'r', encoding=self.encoding) as f:
+            conteudo = f.read()
+        if not conteudo.strip():
+            return None
+        return json.loads(conteudo)
+
+    def write(self, data: Dict):
+        diretorio = os.path.dirname(os.path.abspath(self.path))
+        fd, temporario = tempfile.mkstemp(prefix='.tmp-', suffix='.json', dir=diretorio)
+        try:
+            with os.fdopen(fd, 'w', encoding=self.encoding) as f:
+                f.write(json.dumps(data, **self.kwargs))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporario, self.path)
+        except BaseException:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+
+    def file_version(self) -> Optional[Tuple[int, int]]:
+        """(mtime_ns, tamanho) do arquivo, para detectar escritas de outros processos"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def close(self):
+        pass
+
+
+class WriteBehindMiddleware(Middleware):
+    """
+    Cache de leitura e escrita adiada com group commit
+
+    As tabelas alteram em memória o dicionário devolvido por read(); quem faz
+    read-modify-write deve segurar `lock` durante toda a operação para não
+    concorrer com a gravação disparada pelo temporizador (IndexedTable faz
+    isso em _update_table).
+    """
+
+    def __init__(self, storage_cls=AtomicJSONStorage, flush_interval: float = 1.0, max_pending_writes: int = 100):
+        """
+        Args:
+            storage_cls: Storage real (precisa de file_version() para detectar escritas externas)
+            flush_interval: Segundos entre a primeira escrita pendente e a gravação (0 grava na hora)
+            max_pending_writes: Escritas pendentes que forçam a gravação imediata
+        """
+        super().__init__(storage_cls)
+        self.flush_interval = flush_interval
+        self.max_pending_writes = max_pending_writes
+        self.lock = threading.RLock()
+        # Incrementada a cada alteração do conteúdo em memória (índices comparam com ela)
+        self.generation = 0
+        self._cache: Optional[Dict] = None
+        self._versao_disco = None
+        self._pending = 0
+        self._timer: Optional[threading.Timer] = None
+        self._transaction_depth = 0
+        _instancias.add(self)
+
+    # ==================== LEITURA E ESCRITA ====================
+
+    def _recarregar_se_alterado(self):
+        """Relê o arquivo se ele mudou por fora e não há escritas nossas pendentes"""
+        if self._pending:
+            return
+        versao = self.storage.file_version()
+        if self._cache is None or versao != self._versao_disco:
+            self._cache = self.storage.read() or {}
+            self._versao_disco = versao
+            self.generation += 1
+
+    def read(self) -> Dict:
+        with self.lock:
+            self._recarregar_se_alterado()
+            return self._cache
+
+    def write(self, data: Dict):
+        with self.lock:
+            self._cache = data
+            self._pending += 1
+            self.generation += 1
+            if self._transaction_depth:
+                return
+            if self._pending >= self.max_pending_writes or self.flush_interval <= 0:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def current_version(self) -> int:
+        """Versão do conteúdo (relendo o arquivo antes, se outro processo o alterou)"""
+        with self.lock:
+            self._recarregar_se_alterado()
+            return self.generation
+
+    def flush(self):
+        """Grava as escritas pendentes em uma única regravação do arquivo"""
+        with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+            self.storage.write(self._cache)
+            self._versao_disco = self.storage.file_version()
+            self._pending = 0
+
+    def discard(self):
+        """Descarta as escritas pendentes; a próxima leitura volta ao conteúdo do arquivo"""
+        with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._cache = None
+            self._pending = 0
+            self.generation += 1
+
+    @contextmanager
+    def transaction(self):
+        """
+        Agrupa as escritas do bloco em uma única gravação ao final
+
+        Pendências anteriores são gravadas na entrada; se o bloco levantar
+        exceção, as alterações feitas nele são descartadas. Blocos aninhados
+        participam do bloco mais externo.
+        """
+        with self.lock:
+            if not self._transaction_depth:
+                self.flush()
+            self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            with self.lock:
+                self._transaction_depth -= 1
+                if not self._transaction_depth:
+                    self.discard()
+            raise
+        else:
+            with self.lock:
+                self._transaction_depth -= 1
+                if not self._transaction_depth:
+                    self.flush()
+
+    def close(self):
+        # A instância é compartilhada entre bancos do mesmo arquivo: fechar só grava
+        self.flush()
+
+
+# Instâncias vivas, gravadas ao encerrar o processo
+_instancias = weakref.WeakSet()
+_compartilhadas: Dict[str, WriteBehindMiddleware] = {}
+_compartilhadas_lock = threading.Lock()
+
+
+def shared_write_behind_storage(path: str, flush_interval: float = 1.0, max_pending_writes: int = 100,
+                                **kwargs) -> WriteBehindMiddleware:
+    """
+    Storage para TinyDB(path, storage=shared_write_behind_storage)
+
+    Devolve sempre a mesma instância para o mesmo arquivo dentro do processo.
+    """
+    chave = os.path.abspath(path)
+    with _compartilhadas_lock:
+        storage = _compartilhadas.get(chave)
+        if storage is None:
+            storage = WriteBehindMiddleware(
+                AtomicJSONStorage, flush_interval=flush_interval, max_pending_writes=max_pending_writes
+            )(path, **kwargs)
+            _compartilhadas[chave] = storage
+        return storage
+
+
+@atexit.register
+def flush_all():
+    """Grava as escritas pendentes de todos os arquivos"""
+    for storage in list(_instancias):
+        try:
+            storage.flush()
+        except Exception as e:
+            print(f"Erro ao gravar banco local: {e}")
@@ -0,0 +1,360 @@
+"""
+Fila durável de escritas para o Supabase (write-ahead local)
+
+Quando uma escrita no Supabase falha por problema de rede, a operação é
+gravada em um SQLite local (WRITE_QUEUE_PATH) em vez de se perder e é
+reaplicada em lotes quando a conexão volta (SupabaseDatabase.sync_pending_writes).
+
+- Ementas e análises enfileiradas recebem ids provisórios negativos. Escritas
+  que os referenciam (vínculos, comentários, análises de uma ementa ainda na
+  fila) também entram na fila; na reaplicação os ids provisórios são trocados
+  pelos definitivos (tabela ids_provisorios).
+- A reaplicação é idempotente: ementas e análises levam `chave_idempotencia`
+  (upsert na coluna única, migração 9 do SUPABASE_SCHEMA.md). A chave criada
+  para a primeira tentativa online é mantida, então uma escrita que chegou ao
+  servidor antes do timeout não é duplicada na reaplicação. Vínculos usam
+  upsert ignorando duplicatas e comentários são updates.
+- As entradas são aplicadas em ordem. Erro de rede interrompe a reaplicação;
+  outros erros contam tentativas e, após MAX_TENTATIVAS, a entrada é marcada
+  como falha e a fila segue.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+# Falhas de rede: a escrita vai para a fila em vez de ser perdida
+ERROS_DE_CONEXAO = (httpx.TransportError, ConnectionError, TimeoutError)
+
+MAX_TENTATIVAS = 5
+# Entradas já aplicadas ficam na fila por este tempo (métricas), depois são apagadas
+RETENCAO_APLICADAS = 7 * 24 * 3600
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS fila_escrita (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    operacao TEXT NOT NULL,                      -- ementa | analises | comentario | vinculo
+    payload TEXT NOT NULL,                       -- JSON
+    status TEXT NOT NULL DEFAULT 'pendente',     -- pendente | aplicada | falhou
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    ultimo_erro TEXT,
+    criado_em REAL NOT NULL,
+    aplicado_em REAL
+);
+
+CREATE INDEX IF NOT EXISTS idx_fila_status ON fila_escrita(status, seq);
+
+CREATE TABLE IF NOT EXISTS ids_provisorios (
+    id_provisorio INTEGER PRIMARY KEY AUTOINCREMENT,
+    tabela TEXT NOT NULL,
+    id_definitivo INTEGER
+);
+"""
+
+# Chaves estrangeiras que podem apontar para ementas/análises ainda na fila
+COLUNAS_REMAPEADAS = {'ementa_fk': 'ementas', 'analise_fk': 'analises', 'analise_id': 'analises'}
+
+
+def is_connection_error(erro: Exception) -> bool:
+    """True para falhas de rede/timeout (a escrita pode ser enfileirada)"""
+    return isinstance(erro, ERROS_DE_CONEXAO)
+
+
+class WriteQueue:
+    """Fila de escritas pendentes em SQLite, com remapeamento de ids e métricas de atraso"""
+
+    def __init__(self, db_path: str):
+        if db_path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.executescript(SCHEMA_SQL)
+        self.lock = threading.RLock()
+        self._ultima_sincronizacao: Optional[float] = None
+
+    @contextmanager
+    def _transaction(self):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    # ==================== ENFILEIRAR ====================
+
+    def _novo_id(self, tabela: str) -> int:
+        cursor = self.conn.execute("INSERT INTO ids_provisorios (tabela) VALUES (?)", (tabela,))
+        return -cursor.lastrowid
+
+    def _append(self, operacao: str, payload: Dict):
+        self.conn.execute(
+            "INSERT INTO fila_escrita (operacao, payload, criado_em) VALUES (?, ?, ?)",
+            (operacao, json.dumps(payload, ensure_ascii=False, default=str), time.time())
+        )
+
+    def enqueue_ementa(self, ementa_data: Dict) -> Dict:
+        """Enfileira a criação de uma ementa; devolve a linha com id_ementa provisório (negativo)"""
+        with self._transaction():
+            linha = dict(ementa_data, id_ementa=self._novo_id('ementas'),
+                         chave_idempotencia=ementa_data.get('chave_idempotencia') or str(uuid.uuid4()))
+            self._append('ementa', {'linha': linha})
+        return linha
+
+    def enqueue_analises(self, rows: List[Dict], curso_codigo: str = None) -> List[Dict]:
+        """Enfileira análises (e o vínculo com o curso); devolve as linhas com analise_id provisório"""
+        with self._transaction():
+            linhas = [
+                dict(row, analise_id=self._novo_id('analises'),
+                     chave_idempotencia=row.get('chave_idempotencia') or str(uuid.uuid4()))
+                for row in rows
+            ]
+            self._append('analises', {'linhas': linhas, 'curso_codigo': curso_codigo})
+        return linhas
+
+    def enqueue_comentario(self, analise_id: int, comentario: str, professor_id: str):
+        """Enfileira a atualização do comentário de uma análise"""
+        with self._transaction():
+            self._append('comentario', {'analise_id': analise_id, 'comentario': comentario, 'professor_id': professor_id})
+
+    def enqueue_vinculo(self, tabela: str, dados: Dict, on_conflict: str):
+        """Enfileira um relacionamento (upsert ignorando duplicatas na reaplicação)"""
+        with self._transaction():
+            self._append('vinculo', {'tabela': tabela, 'dados': dados, 'on_conflict': on_conflict})
+
+    # ==================== IDS PROVISÓRIOS ====================
+
+    def resolve_id(self, id_valor: Optional[int]) -> Optional[int]:
+        """Id definitivo de um id provisório (None se ainda não foi reaplicado); outros ids voltam iguais"""
+        if not isinstance(id_valor, int) or id_valor >= 0:
+            return id_valor
+        row = self.conn.execute(
+            "SELECT id_definitivo FROM ids_provisorios WHERE id_provisorio = ?", (-id_valor,)
+        ).fetchone()
+        return row['id_definitivo'] if row else None
+
+    def resolve_row(self, dados: Dict) -> Optional[Dict]:
+        """Cópia de `dados` com as FKs provisórias resolvidas; None se alguma ainda está na fila"""
+        resolvido = dict(dados)
+        for coluna in COLUNAS_REMAPEADAS:
+            if coluna in resolvido:
+                resolvido[coluna] = self.resolve_id(resolvido[coluna])
+                if resolvido[coluna] is None:
+                    return None
+        return resolvido
+
+    def get_pending_ementa(self, id_ementa: int) -> Optional[Dict]:
+        """Ementa ainda na fila com este id provisório"""
+        for row in self.conn.execute(
+            "SELECT payload FROM fila_escrita WHERE operacao = 'ementa' AND status = 'pendente'"
+        ):
+            linha = json.loads(row['payload'])['linha']
+            if linha['id_ementa'] == id_ementa:
+                return linha
+        return None
+
+    def has_pending(self) -> bool:
+        return self.conn.execute("SELECT 1 FROM fila_escrita WHERE status = 'pendente' LIMIT 1").fetchone() is not None
+
+    # ==================== REAPLICAÇÃO ====================
+
+    def replay(self, client, store_artifacts: Callable[[object, List[Dict]], None], batch_size: int = 100) -> Dict:
+        """
+        Reaplica as entradas pendentes no Supabase, em ordem e em lotes
+
+        Entradas consecutivas da mesma operação saem em uma requisição
+        (até `batch_size` linhas). Para no primeiro erro de rede.
+
+        Args:
+            client: Cliente Supabase (service role, de preferência)
+            store_artifacts: Move dados estruturados das análises para artefatos_analise
+
+        Returns:
+            Dict: {'aplicadas', 'falhas', 'pendentes', 'interrompida'}
+        """
+        aplicadas, falhas, interrompida = 0, 0, False
+        tamanho_lote = batch_size
+        with self.lock:
+            while True:
+                lote = self._proximo_lote(tamanho_lote)
+                if not lote:
+                    break
+                operacao = lote[0]['operacao']
+                try:
+                    self._aplicar(client, store_artifacts, operacao, [json.loads(e['payload']) for e in lote])
+                except Exception as e:
+                    if is_connection_error(e):
+                        interrompida = True
+                        break
+                    if len(lote) > 1:
+                        # Isola a entrada com problema: o lote é refeito uma entrada por vez
+                        tamanho_lote = 1
+                        continue
+                    if not self._registrar_falha(lote[0], e):
+                        # Ainda há tentativas: para aqui, preservando a ordem, e tenta na próxima sincronização
+                        interrompida = True
+                        break
+                    falhas += 1
+                    continue
+                tamanho_lote = batch_size
+                self.conn.execute(
+                    f"UPDATE fila_escrita SET status = 'aplicada', aplicado_em = ?, ultimo_erro = NULL "
+                    f"WHERE seq IN ({', '.join('?' for _ in lote)})",
+                    [time.time()] + [entrada['seq'] for entrada in lote]
+                )
+                aplicadas += len(lote)
+            self.conn.execute(
+                "DELETE FROM fila_escrita WHERE status = 'aplicada' AND aplicado_em < ?",
+                (time.time() - RETENCAO_APLICADAS,)
+            )
+            self._ultima_sincronizacao = time.time()
+        return {'aplicadas': aplicadas, 'falhas': falhas, 'pendentes': self.stats()['pendentes'], 'interrompida': interrompida}
+
+    def _proximo_lote(self, batch_size: int) -> List[sqlite3.Row]:
+        """Entradas pendentes consecutivas com a mesma operação (vínculos: mesma tabela)"""
+        entradas = self.conn.execute(
+            "SELECT seq, operacao, payload, tentativas FROM fila_escrita WHERE status = 'pendente' ORDER BY seq LIMIT ?",
+            (batch_size,)
+        ).fetchall()
+        if not entradas:
+            return []
+        # Comentários são updates individuais (valores diferentes por linha)
+        if entradas[0]['operacao'] == 'comentario':
+            return entradas[:1]
+        chave = (entradas[0]['operacao'], json.loads(entradas[0]['payload']).get('tabela'))
+        lote = []
+        for entrada in entradas:
+            if (entrada['operacao'], json.loads(entrada['payload']).get('tabela')) != chave:
+                break
+            lote.append(entrada)
+        return lote
+
+    def _registrar_falha(self, entrada: sqlite3.Row, erro: Exception) -> bool:
+        """Conta a tentativa; True se a entrada esgotou MAX_TENTATIVAS e passou a 'falhou'"""
+        print(f"⚠️ Erro ao reaplicar escrita pendente #{entrada['seq']} ({entrada['operacao']}): {erro}")
+        esgotada = entrada['tentativas'] + 1 >= MAX_TENTATIVAS
+        self.conn.execute(
+            "UPDATE fila_escrita SET tentativas = tentativas + 1, ultimo_erro = ?, status = ? WHERE seq = ?",
+            (str(erro), 'falhou' if esgotada else 'pendente', entrada['seq'])
+        )
+        return esgotada
+
+    def _aplicar(self, client, store_artifacts, operacao: str, payloads: List[Dict]):
+        if operacao == 'ementa':
+            linhas = [payload['linha'] for payload in payloads]
+            self._upsert_com_ids(client, 'ementas', 'id_ementa', linhas)
+        elif operacao == 'analises':
+            linhas = []
+            for payload in payloads:
+                for linha in payload['linhas']:
+                    linhas.append(dict(linha, ementa_fk=self._exigir_id(linha['ementa_fk'])))
+            store_artifacts(client, linhas)
+            criadas = self._upsert_com_ids(client, 'analises', 'analise_id', linhas)
+            vinculos = [
+                {'analise_fk': criadas[linha['analise_id']], 'curso_fk': payload['curso_codigo']}
+                for payload in payloads if payload.get('curso_codigo')
+                for linha in payload['linhas']
+            ]
+            if vinculos:
+                client.table("analise_curso").upsert(
+                    vinculos, on_conflict="analise_fk,curso_fk", ignore_duplicates=True
+                ).execute()
+        elif operacao == 'comentario':
+            payload = payloads[0]
+            client.table("analises").update({
+                'comentario': payload['comentario'] or None,
+                'updated_at': datetime.now().isoformat()
+            }).eq("analise_id", self._exigir_id(payload['analise_id'])).eq(
+                "professor_id", payload['professor_id']
+            ).execute()
+        elif operacao == 'vinculo':
+            dados = [
+                {coluna: self._exigir_id(valor) if coluna in COLUNAS_REMAPEADAS else valor
+                 for coluna, valor in payload['dados'].items()}
+                for payload in payloads
+            ]
+            client.table(payloads[0]['tabela']).upsert(
+                dados, on_conflict=payloads[0]['on_conflict'], ignore_duplicates=True
+            ).execute()
+        else:
+            raise ValueError(f"Operação desconhecida na fila: {operacao}")
+
+    def _exigir_id(self, id_valor):
+        resolvido = self.resolve_id(id_valor)
+        if resolvido is None:
+            raise ValueError(f"Id provisório {id_valor} sem correspondente (escrita de origem falhou)")
+        return resolvido
+
+    def _upsert_com_ids(self, client, tabela: str, coluna_id: str, linhas: List[Dict]) -> Dict[int, int]:
+        """Grava as linhas por chave_idempotencia e registra id provisório -> definitivo"""
+        envio = [{k: v for k, v in linha.items() if k != coluna_id} for linha in linhas]
+        try:
+            response = client.table(tabela).upsert(envio, on_conflict="chave_idempotencia").execute()
+            definitivos = {row['chave_idempotencia']: row[coluna_id] for row in response.data or []}
+        except Exception as e:
+            if is_connection_error(e) or "chave_idempotencia" not in str(e):
+                raise
+            # Banco sem a migração 9: insert simples (uma repetição após falha pode duplicar a linha)
+            print(f"⚠️ Coluna chave_idempotencia não encontrada em {tabela}; reaplicando com insert")
+            response = client.table(tabela).insert(
+                [{k: v for k, v in linha.items() if k != 'chave_idempotencia'} for linha in envio]
+            ).execute()
+            definitivos = {
+                linha['chave_idempotencia']: row[coluna_id] for linha, row in zip(linhas, response.data or [])
+            }
+        mapa = {}
+        for linha in linhas:
+            id_definitivo = definitivos.get(linha['chave_idempotencia'])
+            if id_definitivo is None:
+                raise ValueError(f"{tabela}: linha {linha[coluna_id]} não retornada pelo upsert")
+            mapa[linha[coluna_id]] = id_definitivo
+        self.conn.executemany(
+            "UPDATE ids_provisorios SET id_definitivo = ? WHERE id_provisorio = ?",
+            [(definitivo, -provisorio) for provisorio, definitivo in mapa.items()]
+        )
+        return mapa
+
+    # ==================== MÉTRICAS ====================
+
+    def stats(self) -> Dict:
+        """Pendentes, falhas, aplicadas (janela de retenção) e atraso da entrada mais antiga"""
+        contagens = {
+            row['status']: row['total'] for row in self.conn.execute(
+                "SELECT status, COUNT(*) AS total FROM fila_escrita GROUP BY status"
+            )
+        }
+        mais_antiga = self.conn.execute(
+            "SELECT MIN(criado_em) AS criado_em FROM fila_escrita WHERE status = 'pendente'"
+        ).fetchone()['criado_em']
+        ultimo_erro = self.conn.execute(
+            "SELECT ultimo_erro FROM fila_escrita WHERE ultimo_erro IS NOT NULL ORDER BY seq DESC LIMIT 1"
+        ).fetchone()
+        return {
+            'pendentes': contagens.get('pendente', 0),
+            'falhas': contagens.get('falhou', 0),
+            'aplicadas': contagens.get('aplicada', 0),
+            'atraso_segundos': round(time.time() - mais_antiga, 1) if mais_antiga else 0.0,
+            'ultima_sincronizacao': self._ultima_sincronizacao,
+            'ultimo_erro': ultimo_erro['ultimo_erro'] if ultimo_erro else None
+        }
+
+
+def create_write_queue() -> WriteQueue:
+    """
+    Factory function para a fila de escritas
+
+    Usa WRITE_QUEUE_PATH (padrão: src/data/database/fila_escrita.db).
+    """
+    return WriteQueue(os.getenv("WRITE_QUEUE_PATH", "src/data/database/fila_escrita.db"))
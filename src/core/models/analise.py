@@ -10,6 +10,7 @@ class Analise(BaseModel):
     texto_analise: str  # VARCHAR(255) NOT NULL
     materias_restantes: Optional[str] = None  # VARCHAR(255)
     dados_estruturados_json: Optional[str] = None  # TEXT - Dados estruturados extraídos pelo Docling em JSON
+    artefato_hash: Optional[str] = None  # VARCHAR(64) - FK para artefatos_analise (dados estruturados comprimidos)
     
     class Config:
         from_attributes = True
@@ -5,6 +5,7 @@ from datetime import datetime
 class Ementa(BaseModel):
     id_ementa: Optional[int] = None  # INT AUTO_INCREMENT PRIMARY KEY (gerado pelo Supabase)
     drive_id: Optional[str] = None  # VARCHAR(255)
+    hash_conteudo: Optional[str] = None  # VARCHAR(64) - SHA256 do PDF (detecção de duplicatas)
     data_upload: datetime  # DATETIME NOT NULL DEFAULT GETDATE()
     
     class Config:
@@ -13,6 +14,7 @@ class Ementa(BaseModel):
 class EmentaCreate(BaseModel):
     """Modelo para criação de ementa (sem id_ementa)"""
     drive_id: Optional[str] = None
+    hash_conteudo: Optional[str] = None
     data_upload: datetime
     
     class Config:
@@ -54,24 +54,31 @@ class DoclingExtractor:
             if not os.path.exists(pdf_path):
                 raise FileNotFoundError(f"Arquivo não encontrado: {pdf_path}")
             
-            text = ""
-            metadata = {}
-            
             with fitz.open(pdf_path) as pdf:
                 # Extrair metadados
                 metadata = pdf.metadata
-                
-                # Extrair texto de todas as páginas
-                for page_num in range(len(pdf)):
-                    page = pdf[page_num]
-                    text += page.get_text()
+            
+            # Texto por página; OCR apenas nas páginas escaneadas
+            from .ocr_extractor import create_selective_ocr
+            pages = create_selective_ocr().extract_pages(pdf_path)
+            text = "".join(page.text for page in pages)
+            ocr_pages = sum(1 for page in pages if page.ocr)
+            
+            # Início de cada página no texto concatenado
+            page_offsets, offset = [], 0
+            for page in pages:
+                page_offsets.append(offset)
+                offset += len(page.text)
             
             return {
                 "text": text,
+                "pages": [page.to_dict() for page in pages],
+                "page_offsets": page_offsets,
                 "tables": [],  # PyMuPDF não extrai tabelas automaticamente
                 "metadata": metadata,
                 "sections": [],
-                "extraction_method": "pymupdf_fast"
+                "ocr_pages": ocr_pages,
+                "extraction_method": "pymupdf_ocr" if ocr_pages else "pymupdf_fast"
             }
             
         except Exception as e:
@@ -245,7 +252,27 @@ class DoclingExtractor:
         try:
             document_data = self.extract_from_pdf(pdf_path)
             
-            if ai_client and not self.use_docling:
+            # Ementas de disciplinas não têm dados de aluno: pular estruturação por IA
+            from .document_router import create_document_router
+            route = create_document_router().route(document_data.get("text", ""))
+            
+            if not route.extrair_aluno:
+                structured_data = {
+                    "student_info": {},
+                    "disciplines": self.extract_disciplines(document_data),
+                    "raw_text": document_data.get("text", ""),
+                    "tables": document_data.get("tables", []),
+                    "metadata": document_data.get("metadata", {}),
+                    "sections": document_data.get("sections", []),
+                    "extraction_info": {
+                        "method": "ementa_direct",
+                        "confidence": 1.0,
+                        "detected_format": route.formato.value,
+                        "pipeline": route.pipeline.value,
+                        "timestamp": datetime.now().isoformat()
+                    }
+                }
+            elif ai_client and not self.use_docling:
                 structured_data = self._structure_with_ai(document_data, ai_client)
             else:
                 student_info = self.extract_student_info(document_data)
@@ -266,6 +293,10 @@ class DoclingExtractor:
                     }
                 }
             
+            structured_data.setdefault("extraction_info", {})["ocr_pages"] = document_data.get("ocr_pages", 0)
+            if document_data.get("page_offsets"):
+                structured_data["page_offsets"] = document_data["page_offsets"]
+            
             self._record_extraction_for_learning(structured_data, pdf_path)
             
             return structured_data
@@ -0,0 +1,81 @@
+"""
+Roteamento de documentos entre os pipelines de ementa e de histórico
+
+O formato detectado pelo AdaptiveExtractor decide quais etapas cada documento
+percorre: ementas de disciplinas não têm dados de aluno, então não passam pela
+estruturação por IA nem pela extração de informações do aluno, e usam um
+prompt de resumo próprio e mais curto.
+"""
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, Optional
+
+from .adaptive_extractor import DocumentFormat, create_adaptive_extractor
+
+
+class DocumentPipeline(Enum):
+    """Pipelines de processamento disponíveis"""
+    HISTORICO = "historico"
+    EMENTA = "ementa"
+
+
+@dataclass
+class DocumentRoute:
+    """Decisão de roteamento para um documento"""
+    formato: DocumentFormat
+    pipeline: DocumentPipeline
+    extrair_aluno: bool        # Estruturação por IA + dados do aluno
+    prompt_resumo: str         # Método do GroqClient usado no resumo
+
+
+class DocumentRouter:
+    """Decide o pipeline de cada documento a partir do formato detectado"""
+
+    def __init__(self):
+        self.extractor = create_adaptive_extractor()
+        self.routes = {
+            DocumentFormat.IFSP_EMENTA: DocumentRoute(
+                DocumentFormat.IFSP_EMENTA, DocumentPipeline.EMENTA, False, "resume_ementa_disciplina"
+            ),
+            DocumentFormat.IFSP_HISTORICO: DocumentRoute(
+                DocumentFormat.IFSP_HISTORICO, DocumentPipeline.HISTORICO, True, "resume_ementa"
+            ),
+            DocumentFormat.GENERIC_HISTORICO: DocumentRoute(
+                DocumentFormat.GENERIC_HISTORICO, DocumentPipeline.HISTORICO, True, "resume_ementa"
+            ),
+        }
+        # Formato desconhecido segue o pipeline completo (comportamento anterior)
+        self.default_route = DocumentRoute(
+            DocumentFormat.UNKNOWN, DocumentPipeline.HISTORICO, True, "resume_ementa"
+        )
+
+    def route(self, text: str, structured_data: Optional[Dict] = None) -> DocumentRoute:
+        """
+        Escolhe o pipeline do documento
+
+        Args:
+            text: Texto extraído do PDF
+            structured_data: Dados estruturados já salvos (reaproveita o formato detectado)
+
+        Returns:
+            DocumentRoute: Rota a seguir
+        """
+        detected = (structured_data or {}).get("extraction_info", {}).get("detected_format")
+        try:
+            formato = DocumentFormat(detected)
+        except ValueError:
+            formato = DocumentFormat.UNKNOWN
+
+        if formato == DocumentFormat.UNKNOWN:
+            formato = self.extractor.detect_format(text)
+
+        return self.routes.get(formato, self.default_route)
+
+    def summarize(self, ai_client, route: DocumentRoute, text: str) -> str:
+        """Gera o resumo com o prompt específico do tipo de documento"""
+        return getattr(ai_client, route.prompt_resumo)(text)
+
+
+def create_document_router() -> DocumentRouter:
+    """Factory function para criar roteador de documentos"""
+    return DocumentRouter()
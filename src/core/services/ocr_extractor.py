@@ -0,0 +1,224 @@
+"""
+Detecção de páginas escaneadas e OCR seletivo
+
+Classifica cada página do PDF pela densidade da camada de texto e pela área
+coberta por imagens. Páginas com texto nativo seguem o caminho rápido do
+PyMuPDF; apenas páginas que são só imagem vão para o Tesseract (subprocesso),
+em paralelo, com o resultado em cache pelo hash do conteúdo da página.
+"""
+import hashlib
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    print("⚠️ PyMuPDF não está instalado. Execute: pip install pymupdf")
+
+
+class PageKind(Enum):
+    """Classificação de uma página do PDF"""
+    TEXT = "texto"           # Camada de texto suficiente
+    SCANNED = "escaneada"    # Sem texto, coberta por imagem: precisa de OCR
+    EMPTY = "vazia"          # Sem texto e sem imagem relevante (em branco, assinatura)
+
+
+@dataclass
+class PageText:
+    """Texto de uma página e como ele foi obtido"""
+    number: int
+    text: str
+    kind: PageKind
+    text_chars: int
+    image_coverage: float
+    ocr: bool = False
+
+    def to_dict(self) -> Dict:
+        return {
+            "numero": self.number,
+            "texto": self.text,
+            "tipo": self.kind.value,
+            "ocr": self.ocr
+        }
+
+
+class SelectiveOCR:
+    """Extrai texto página a página, aplicando OCR apenas onde não há camada de texto"""
+
+    _tesseract_warning_shown = False
+
+    def __init__(self, language: str = "por", dpi: int = 300, min_text_chars: int = 50,
+                 min_image_coverage: float = 0.5, max_workers: Optional[int] = None,
+                 cache_dir: str = "src/data/ocr_cache", tesseract_cmd: Optional[str] = None,
+                 timeout: int = 120):
+        """
+        Inicializa o extrator
+
+        Args:
+            language: Idioma(s) do Tesseract (ex.: "por", "por+eng")
+            dpi: Resolução usada para renderizar páginas escaneadas
+            min_text_chars: Abaixo disso a página é considerada sem camada de texto
+            min_image_coverage: Fração mínima da página coberta por imagens para indicar scan
+            max_workers: Processos de OCR simultâneos (padrão: até 4)
+            cache_dir: Diretório do cache de OCR por hash de página
+            tesseract_cmd: Executável do Tesseract (padrão: TESSERACT_CMD ou "tesseract" no PATH)
+            timeout: Tempo máximo (s) de OCR por página
+        """
+        self.language = language
+        self.dpi = dpi
+        self.min_text_chars = min_text_chars
+        self.min_image_coverage = min_image_coverage
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.cache_dir = cache_dir
+        self.tesseract_cmd = tesseract_cmd or os.getenv("TESSERACT_CMD") or shutil.which("tesseract")
+        self.timeout = timeout
+
+    @property
+    def ocr_available(self) -> bool:
+        return bool(self.tesseract_cmd)
+
+    # ==================== CLASSIFICAÇÃO ====================
+
+    def classify_page(self, page) -> Tuple[PageKind, str, float]:
+        """
+        Classifica uma página pelo texto nativo e pela cobertura de imagens
+
+        Returns:
+            Tuple[PageKind, str, float]: Tipo, texto nativo e fração da página coberta por imagens
+        """
+        text = page.get_text()
+        text_chars = len(text.strip())
+        if text_chars >= self.min_text_chars:
+            return PageKind.TEXT, text, 0.0
+
+        page_rect = page.rect
+        page_area = abs(page_rect.width * page_rect.height) or 1.0
+        image_area = 0.0
+        for info in page.get_image_info():
+            bbox = fitz.Rect(info["bbox"]) & page_rect
+            if not bbox.is_empty:
+                image_area += abs(bbox.width * bbox.height)
+        coverage = min(image_area / page_area, 1.0)
+
+        if coverage >= self.min_image_coverage:
+            return PageKind.SCANNED, text, coverage
+        return PageKind.EMPTY, text, coverage
+
+    # ==================== EXTRAÇÃO ====================
+
+    def extract_pages(self, pdf_path: str) -> List[PageText]:
+        """
+        Extrai o texto de cada página, com OCR somente nas páginas escaneadas
+
+        Args:
+            pdf_path: Caminho para o arquivo PDF
+
+        Returns:
+            List[PageText]: Uma entrada por página, na ordem do documento
+        """
+        pages: List[PageText] = []
+        pending: Dict[int, str] = {}      # índice da página -> hash
+        renders: Dict[str, bytes] = {}    # hash -> PNG a enviar ao OCR
+
+        # PyMuPDF não é thread-safe: classificar e renderizar na thread atual
+        with fitz.open(pdf_path) as pdf:
+            for index, page in enumerate(pdf):
+                kind, text, coverage = self.classify_page(page)
+                pages.append(PageText(index + 1, text, kind, len(text.strip()), coverage))
+
+                if kind != PageKind.SCANNED or not self.ocr_available:
+                    continue
+
+                page_hash = self._page_hash(pdf, page)
+                cached = self._read_cache(page_hash)
+                if cached is not None:
+                    pages[-1].text = cached
+                    pages[-1].ocr = True
+                    continue
+
+                pending[index] = page_hash
+                if page_hash not in renders:
+                    renders[page_hash] = page.get_pixmap(dpi=self.dpi).tobytes("png")
+
+        if any(page.kind == PageKind.SCANNED for page in pages) and not self.ocr_available:
+            self._warn_missing_tesseract()
+
+        if renders:
+            # Tesseract roda em subprocessos: as threads apenas aguardam a saída
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = dict(zip(renders.keys(), executor.map(self._run_ocr, renders.values())))
+
+            for index, page_hash in pending.items():
+                text = results.get(page_hash, "")
+                pages[index].text = text
+                pages[index].ocr = True
+                if text:
+                    self._write_cache(page_hash, text)
+
+        return pages
+
+    def extract_text(self, pdf_path: str) -> str:
+        """Texto completo do PDF (páginas concatenadas)"""
+        return "".join(page.text for page in self.extract_pages(pdf_path))
+
+    def _run_ocr(self, png_bytes: bytes) -> str:
+        try:
+            result = subprocess.run(
+                [self.tesseract_cmd, "stdin", "stdout", "-l", self.language, "--dpi", str(self.dpi)],
+                input=png_bytes,
+                capture_output=True,
+                timeout=self.timeout,
+                check=True
+            )
+            return result.stdout.decode("utf-8", errors="replace")
+        except (subprocess.SubprocessError, OSError) as e:
+            print(f"Erro ao executar OCR: {e}")
+            return ""
+
+    # ==================== CACHE ====================
+
+    def _page_hash(self, pdf, page) -> str:
+        """Hash do conteúdo da página (stream de desenho + imagens) e dos parâmetros de OCR"""
+        digest = hashlib.sha256(f"{self.language}:{self.dpi}:".encode())
+        digest.update(page.read_contents())
+        for image in page.get_images(full=True):
+            digest.update(pdf.xref_stream_raw(image[0]) or b"")
+        return digest.hexdigest()
+
+    def _cache_path(self, page_hash: str) -> str:
+        return os.path.join(self.cache_dir, f"{page_hash}.txt")
+
+    def _read_cache(self, page_hash: str) -> Optional[str]:
+        path = self._cache_path(page_hash)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_cache(self, page_hash: str, text: str):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self._cache_path(page_hash), "w", encoding="utf-8") as f:
+                f.write(text)
+        except OSError as e:
+            print(f"Erro ao salvar cache de OCR: {e}")
+
+    @classmethod
+    def _warn_missing_tesseract(cls):
+        if not cls._tesseract_warning_shown:
+            print("⚠️ PDF com páginas escaneadas, mas o Tesseract não foi encontrado. "
+                  "Instale o tesseract-ocr (com o idioma 'por') ou defina TESSERACT_CMD.")
+            cls._tesseract_warning_shown = True
+
+
+def create_selective_ocr() -> SelectiveOCR:
+    """Factory function para criar extrator com OCR seletivo"""
+    return SelectiveOCR()
@@ -0,0 +1,144 @@
+"""
+Filtro de relevância de páginas antes do envio ao LLM
+
+Capas, textos legais e páginas de assinatura não trazem informação curricular,
+mas consomem tokens. Cada página (ou seção, quando não há limites de página)
+recebe uma pontuação pela densidade de termos curriculares e pelos padrões de
+detecção de formato do AdaptiveExtractor; só as relevantes seguem para o LLM.
+"""
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from core.utils.text_normalization import fold_accents
+from .adaptive_extractor import AdaptiveExtractor
+
+# Termos curriculares (já sem acentos, em minúsculas)
+CURRICULAR_KEYWORDS = [
+    "disciplina", "componente curricular", "componentes curriculares", "carga horaria",
+    "nota", "media", "frequencia", "aprovado", "reprovado", "aproveitamento", "situacao",
+    "semestre", "periodo letivo", "creditos", "ementa", "conteudo programatico",
+    "historico escolar", "matriz curricular", "cursada", "dispensa"
+]
+
+# Termos que indicam a página de identificação do aluno
+IDENTITY_KEYWORDS = ["nome", "prontuario", "cpf", "matricula", "ingresso", "aluno"]
+
+# Linhas de tabela de notas: carga horária ("80h", "60 h") e notas ("8,5", "10.0")
+HOURS_PATTERN = re.compile(r"\b\d{2,3}\s?h(?:oras)?\b", re.IGNORECASE)
+GRADE_PATTERN = re.compile(r"\b(?:10|\d)[,.]\d{1,2}\b")
+WORD_PATTERN = re.compile(r"\w+")
+
+
+@dataclass
+class PageScore:
+    """Pontuação de relevância de uma página"""
+    number: int
+    score: float
+    identity: bool
+    chars: int
+
+
+class PageRelevanceScorer:
+    """Seleciona as páginas com informação curricular"""
+
+    def __init__(self, min_density: float = 1.0, chars_per_token: int = 4):
+        """
+        Inicializa o filtro
+
+        Args:
+            min_density: Pontuação mínima (ocorrências ponderadas a cada 100 palavras)
+            chars_per_token: Aproximação de caracteres por token para estimar economia
+        """
+        self.min_density = min_density
+        self.chars_per_token = chars_per_token
+
+        self._keyword_patterns = [
+            re.compile(rf"\b{re.escape(keyword)}s?\b") for keyword in CURRICULAR_KEYWORDS
+        ]
+        self._identity_patterns = [
+            re.compile(rf"\b{re.escape(keyword)}\b") for keyword in IDENTITY_KEYWORDS
+        ]
+        self._format_patterns = [
+            re.compile(pattern, re.IGNORECASE)
+            for patterns in AdaptiveExtractor().detection_patterns.values()
+            for pattern in patterns
+        ]
+
+    def score_page(self, number: int, text: str) -> PageScore:
+        """Pontua uma página pela densidade de termos curriculares"""
+        folded = fold_accents(text.lower())
+        words = len(WORD_PATTERN.findall(folded))
+        if not words:
+            return PageScore(number, 0.0, False, len(text))
+
+        hits = sum(len(pattern.findall(folded)) for pattern in self._keyword_patterns)
+        hits += 0.5 * (len(HOURS_PATTERN.findall(text)) + len(GRADE_PATTERN.findall(text)))
+        # Padrões de formato pesam mais: marcam cabeçalhos de histórico/ementa
+        hits += 3 * sum(1 for pattern in self._format_patterns if pattern.search(text))
+
+        identity = sum(1 for pattern in self._identity_patterns if pattern.search(folded)) >= 2
+        return PageScore(number, 100.0 * hits / words, identity, len(text))
+
+    def select(self, pages: List[str]) -> Tuple[str, Dict]:
+        """
+        Mantém apenas as páginas relevantes
+
+        Sempre preserva a página mais bem pontuada e a primeira página de
+        identificação do aluno (o resumo precisa do nome). Se nenhuma página
+        atingir o limiar, o texto completo é mantido.
+
+        Args:
+            pages: Texto de cada página (ou seção), na ordem do documento
+
+        Returns:
+            Tuple[str, Dict]: Texto a enviar ao LLM e estatísticas da filtragem
+        """
+        scores = [self.score_page(number, text) for number, text in enumerate(pages, start=1)]
+        keep = {s.number for s in scores if s.score >= self.min_density}
+
+        if keep:
+            keep.add(max(scores, key=lambda s: s.score).number)
+            identity_page = next((s.number for s in scores if s.identity), None)
+            if identity_page is not None:
+                keep.add(identity_page)
+        else:
+            keep = {s.number for s in scores}
+
+        selected = "".join(pages[number - 1] for number in sorted(keep))
+        original_tokens = sum(s.chars for s in scores) // self.chars_per_token
+        sent_tokens = len(selected) // self.chars_per_token
+
+        return selected, {
+            "paginas_total": len(pages),
+            "paginas_enviadas": len(keep),
+            "paginas_descartadas": [s.number for s in scores if s.number not in keep],
+            "tokens_originais": original_tokens,
+            "tokens_enviados": sent_tokens,
+            "tokens_economizados": original_tokens - sent_tokens
+        }
+
+
+def split_pages(text: str, page_offsets: Optional[List[int]] = None, section_chars: int = 2000) -> List[str]:
+    """
+    Divide o texto extraído em páginas (pelos offsets gravados na extração)
+    ou, na falta deles, em seções de parágrafos com até `section_chars` caracteres
+    """
+    if page_offsets:
+        bounds = list(page_offsets) + [len(text)]
+        return [text[bounds[i]:bounds[i + 1]] for i in range(len(page_offsets))]
+
+    sections, current = [], ""
+    for paragraph in re.split(r"(?<=\n)\s*\n", text):
+        if current and len(current) + len(paragraph) > section_chars:
+            sections.append(current)
+            current = ""
+        current += paragraph
+    if current:
+        sections.append(current)
+    return sections
+
+
+def create_page_relevance_scorer() -> PageRelevanceScorer:
+    """Factory function para criar filtro de relevância de páginas"""
+    return PageRelevanceScorer()
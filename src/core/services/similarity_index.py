@@ -0,0 +1,344 @@
+"""
+Índice local TF-IDF para triagem entre históricos de alunos e cursos
+
+Roda apenas em CPU e em memória: permite estimar, sem nenhuma chamada de LLM,
+quais cursos do professor combinam melhor com um aluno e quais alunos já
+armazenados combinam melhor com um curso.
+"""
+import json
+import math
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from core.utils.text_normalization import tokenize
+
+COURSE = "curso"
+STUDENT = "aluno"
+
+
+class SimilarityIndex:
+    """Índice TF-IDF esparso (dicionários) com atualização incremental"""
+
+    def __init__(self, idf_refresh_ratio: float = 0.1):
+        """
+        Inicializa o índice
+
+        Args:
+            idf_refresh_ratio: Crescimento relativo do corpus que dispara o recálculo
+                               dos pesos IDF. Entre recálculos, documentos novos usam
+                               o IDF vigente, o que mantém inserções e consultas baratas.
+        """
+        self.idf_refresh_ratio = idf_refresh_ratio
+        self._lock = threading.RLock()
+
+        # Frequência de termo (sublinear) por documento: (tipo, id) -> {termo: tf}
+        self._docs: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self._metadata: Dict[Tuple[str, str], Dict] = {}
+        # Listas invertidas separadas por tipo: tipo -> termo -> {id: tf}
+        self._postings: Dict[str, Dict[str, Dict[str, float]]] = {COURSE: {}, STUDENT: {}}
+        self._df: Counter = Counter()
+
+        # Snapshot de IDF e normas dos documentos
+        self._idf: Dict[str, float] = {}
+        self._idf_corpus_size = 0
+        self._norms: Dict[Tuple[str, str], float] = {}
+
+        # Cargas em segundo plano por professor (load_in_background)
+        self._cargas: Dict[str, threading.Thread] = {}
+
+    # ==================== INSERÇÃO E REMOÇÃO ====================
+
+    def add_course(self, curso: Dict, disciplinas: Optional[List[Dict]] = None):
+        """Indexa um curso (nome + descrição + nomes das disciplinas)"""
+        partes = [curso.get('nome', ''), curso.get('descricao_curso', '')]
+        for disciplina in disciplinas or []:
+            partes.append(disciplina.get('nome', ''))
+
+        self._add_document(COURSE, curso['codigo_curso'], "\n".join(partes), {
+            'codigo_curso': curso['codigo_curso'],
+            'nome': curso.get('nome', '')
+        })
+
+    def add_student(self, aluno_id, texto: str, metadata: Optional[Dict] = None):
+        """Indexa o texto extraído do histórico de um aluno (chave: id da ementa)"""
+        self._add_document(STUDENT, aluno_id, texto, metadata or {})
+
+    def remove(self, tipo: str, doc_id):
+        """Remove um documento do índice"""
+        with self._lock:
+            key = (tipo, str(doc_id))
+            tf = self._docs.pop(key, None)
+            if tf is None:
+                return
+            self._metadata.pop(key, None)
+            self._norms.pop(key, None)
+
+            postings = self._postings[tipo]
+            for term in tf:
+                docs = postings.get(term)
+                if docs is not None:
+                    docs.pop(key[1], None)
+                    if not docs:
+                        del postings[term]
+                self._df[term] -= 1
+                if self._df[term] <= 0:
+                    del self._df[term]
+
+    def has_course(self, codigo_curso: str) -> bool:
+        return (COURSE, str(codigo_curso)) in self._docs
+
+    def has_student(self, aluno_id) -> bool:
+        return (STUDENT, str(aluno_id)) in self._docs
+
+    def _add_document(self, tipo: str, doc_id, texto: str, metadata: Dict):
+        counts = Counter(tokenize(texto))
+        tf = {term: 1.0 + math.log(count) for term, count in counts.items()}
+
+        with self._lock:
+            key = (tipo, str(doc_id))
+            if key in self._docs:
+                self.remove(tipo, doc_id)
+
+            self._docs[key] = tf
+            self._metadata[key] = metadata
+            postings = self._postings[tipo]
+            for term, weight in tf.items():
+                postings.setdefault(term, {})[key[1]] = weight
+                self._df[term] += 1
+
+            if self._idf_is_stale():
+                self._refresh_idf()
+            else:
+                self._norms[key] = self._norm(tf)
+
+    # ==================== PESOS ====================
+
+    def _idf_is_stale(self) -> bool:
+        corpus_size = len(self._docs)
+        if not self._idf_corpus_size:
+            return True
+        growth = abs(corpus_size - self._idf_corpus_size) / self._idf_corpus_size
+        return growth > self.idf_refresh_ratio
+
+    def _refresh_idf(self):
+        """Recalcula IDF e normas de todos os documentos (O(total de termos))"""
+        corpus_size = len(self._docs)
+        self._idf = {
+            term: math.log((1 + corpus_size) / (1 + df)) + 1.0
+            for term, df in self._df.items()
+        }
+        self._idf_corpus_size = corpus_size
+        self._norms = {key: self._norm(tf) for key, tf in self._docs.items()}
+
+    def _term_idf(self, term: str) -> float:
+        idf = self._idf.get(term)
+        if idf is None:
+            # Termo surgiu depois do último recálculo: tratar como raro
+            idf = math.log((1 + self._idf_corpus_size) / (1 + self._df.get(term, 1))) + 1.0
+        return idf
+
+    def _norm(self, tf: Dict[str, float]) -> float:
+        return math.sqrt(sum((weight * self._term_idf(term)) ** 2 for term, weight in tf.items()))
+
+    # ==================== CONSULTAS ====================
+
+    def _rank(self, query_tf: Dict[str, float], alvo: str, permitidos=None, limite: int = 10) -> List[Tuple[str, float]]:
+        query_weights = {term: weight * self._term_idf(term) for term, weight in query_tf.items()}
+        query_norm = math.sqrt(sum(w * w for w in query_weights.values()))
+        if not query_norm:
+            return []
+
+        permitidos = {str(p) for p in permitidos} if permitidos is not None else None
+        postings = self._postings[alvo]
+        scores: Dict[str, float] = {}
+
+        for term, query_weight in query_weights.items():
+            docs = postings.get(term)
+            if not docs:
+                continue
+            idf = self._term_idf(term)
+            for doc_id, weight in docs.items():
+                if permitidos is not None and doc_id not in permitidos:
+                    continue
+                scores[doc_id] = scores.get(doc_id, 0.0) + query_weight * weight * idf
+
+        ranking = []
+        for doc_id, dot in scores.items():
+            doc_norm = self._norms.get((alvo, doc_id))
+            if doc_norm:
+                ranking.append((doc_id, dot / (query_norm * doc_norm)))
+
+        ranking.sort(key=lambda item: item[1], reverse=True)
+        return ranking[:limite]
+
+    def rank_courses_for_student(self, aluno_id=None, texto: Optional[str] = None,
+                                 cursos: Optional[List[str]] = None, limite: int = 5) -> List[Dict]:
+        """
+        Ordena cursos por afinidade com um aluno
+
+        Args:
+            aluno_id: Id de um aluno já indexado (ou use `texto`)
+            texto: Texto do histórico, para alunos ainda não indexados
+            cursos: Códigos permitidos (ex.: apenas os cursos do professor)
+            limite: Quantidade máxima de resultados
+
+        Returns:
+            List[Dict]: [{'codigo_curso', 'nome', 'similaridade'}], do mais ao menos afim
+        """
+        with self._lock:
+            if texto is not None:
+                counts = Counter(tokenize(texto))
+                query_tf = {term: 1.0 + math.log(count) for term, count in counts.items()}
+            else:
+                query_tf = self._docs.get((STUDENT, str(aluno_id)), {})
+
+            ranking = self._rank(query_tf, COURSE, cursos, limite)
+            return [
+                {**self._metadata.get((COURSE, doc_id), {}), 'similaridade': round(score, 4)}
+                for doc_id, score in ranking
+            ]
+
+    def rank_students_for_course(self, codigo_curso: str, alunos: Optional[List] = None,
+                                 limite: int = 10, professor_id: Optional[str] = None) -> List[Dict]:
+        """
+        Ordena alunos já indexados por afinidade com um curso
+
+        Args:
+            codigo_curso: Curso de referência (já indexado)
+            alunos: Ids permitidos (None = todos)
+            limite: Quantidade máxima de resultados
+            professor_id: Restringe aos alunos indexados a partir das ementas deste professor
+
+        Returns:
+            List[Dict]: [{'aluno_id', 'similaridade', ...metadados}], do mais ao menos afim
+        """
+        with self._lock:
+            query_tf = self._docs.get((COURSE, str(codigo_curso)), {})
+            if professor_id is not None:
+                do_professor = {
+                    doc_id for (tipo, doc_id), metadata in self._metadata.items()
+                    if tipo == STUDENT and metadata.get('professor_id') == professor_id
+                }
+                alunos = do_professor if alunos is None else do_professor & {str(a) for a in alunos}
+            ranking = self._rank(query_tf, STUDENT, alunos, limite)
+            return [
+                {'aluno_id': doc_id, **self._metadata.get((STUDENT, doc_id), {}), 'similaridade': round(score, 4)}
+                for doc_id, score in ranking
+            ]
+
+    # ==================== CARGA INICIAL ====================
+
+    def load_from_database(self, database, prontuario: str, page_size: int = 500) -> Dict[str, int]:
+        """
+        Indexa os cursos do professor e os alunos das análises já armazenadas
+
+        As análises vêm em páginas, só com as colunas necessárias (ementa_fk,
+        nome_aluno, artefato_hash), e os artefatos de cada página em uma consulta.
+        Cada página já fica disponível para consulta assim que é indexada.
+
+        Args:
+            database: Instância de SupabaseDatabase (ou backend compatível)
+            prontuario: Prontuário do professor
+            page_size: Análises por página
+
+        Returns:
+            Dict[str, int]: Quantidade de cursos e alunos indexados
+        """
+        stats = {'cursos': 0, 'alunos': 0}
+
+        for curso in database.get_professor_courses(prontuario):
+            if not self.has_course(curso['codigo_curso']):
+                self.add_course(curso, database.get_curso_disciplines(curso['codigo_curso']))
+                stats['cursos'] += 1
+
+        if not hasattr(database, 'list_analises_indexaveis'):
+            # Backends sem paginação (TinyDB): uma única página com todas as análises
+            stats['alunos'] += self._index_analises(database, prontuario, database.get_analises_by_professor(prontuario))
+            return stats
+
+        cursor = None
+        while True:
+            pagina = database.list_analises_indexaveis(prontuario, page_size, cursor)
+            stats['alunos'] += self._index_analises(database, prontuario, pagina['analises'])
+            cursor = pagina['proximo_cursor']
+            if cursor is None:
+                return stats
+
+    def _index_analises(self, database, prontuario: str, analises: List[Dict]) -> int:
+        """Indexa o texto extraído do PDF de cada análise ainda não indexada; retorna quantas entraram"""
+        analises = [
+            analise for analise in analises
+            if analise.get('ementa_fk') is not None and not self.has_student(analise['ementa_fk'])
+        ]
+        # Dados estruturados fora da linha: buscar os artefatos da página de uma vez
+        artefatos = {}
+        if analises and hasattr(database, 'get_artefatos'):
+            artefatos = database.get_artefatos([analise.get('artefato_hash') for analise in analises])
+
+        indexados = 0
+        for analise in analises:
+            ementa_fk = analise['ementa_fk']
+            if self.has_student(ementa_fk):
+                continue
+            structured_data = artefatos.get(analise.get('artefato_hash'))
+            if structured_data is None:
+                try:
+                    structured_data = json.loads(analise.get('dados_estruturados_json') or '{}')
+                except (TypeError, ValueError):
+                    structured_data = {}
+            texto = structured_data.get('raw_text', '')
+            if texto:
+                self.add_student(ementa_fk, texto, {'nome_aluno': analise.get('nome_aluno'), 'professor_id': prontuario})
+                indexados += 1
+        return indexados
+
+    def load_in_background(self, database, prontuario: str) -> bool:
+        """
+        Dispara load_from_database em uma thread daemon, sem bloquear a página
+
+        Sessões do mesmo professor compartilham a carga em andamento.
+
+        Returns:
+            bool: True se uma nova carga foi iniciada
+        """
+        with self._lock:
+            if self.is_loading(prontuario):
+                return False
+            carga = threading.Thread(
+                target=self._load_logged, args=(database, prontuario),
+                name=f"similarity-index-{prontuario}", daemon=True
+            )
+            self._cargas[prontuario] = carga
+            carga.start()
+            return True
+
+    def is_loading(self, prontuario: str) -> bool:
+        """Indica se a carga do professor ainda está em andamento"""
+        carga = self._cargas.get(prontuario)
+        return carga is not None and carga.is_alive()
+
+    def _load_logged(self, database, prontuario: str):
+        try:
+            carga = self.load_from_database(database, prontuario)
+            print(f"📚 Índice de similaridade: {carga['cursos']} curso(s) e {carga['alunos']} aluno(s) indexados")
+        except Exception as e:
+            print(f"⚠️ Erro ao carregar índice de similaridade: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna o tamanho atual do índice"""
+        with self._lock:
+            return {
+                'cursos': sum(1 for tipo, _ in self._docs if tipo == COURSE),
+                'alunos': sum(1 for tipo, _ in self._docs if tipo == STUDENT),
+                'termos': len(self._df)
+            }
+
+
+def create_similarity_index() -> SimilarityIndex:
+    """Factory function para criar índice de similaridade"""
+    return SimilarityIndex()
+
+
+# Instância global compartilhada entre sessões do Streamlit
+similarity_index = create_similarity_index()
@@ -0,0 +1,46 @@
+"""
+Normalização de texto compartilhada pelos índices locais (similaridade e busca)
+"""
+import re
+import unicodedata
+from typing import List
+
+# Palavras muito frequentes em português que não ajudam a diferenciar documentos
+STOPWORDS_PT = frozenset({
+    "a", "ao", "aos", "as", "com", "como", "da", "das", "de", "do", "dos",
+    "e", "em", "entre", "na", "nas", "no", "nos", "o", "os", "ou", "para",
+    "pela", "pelas", "pelo", "pelos", "por", "que", "se", "sem", "sob",
+    "sobre", "um", "uma", "uns", "umas", "the", "of", "and",
+})
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def fold_accents(text: str) -> str:
+    """Remove acentos e converte para minúsculas ("Programação" -> "programacao")"""
+    if not text:
+        return ""
+    normalized = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in normalized if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text: str, min_length: int = 2, keep_numbers: bool = False) -> List[str]:
+    """
+    Quebra o texto em termos normalizados (sem acento, minúsculos, sem stopwords)
+
+    Args:
+        text: Texto de entrada
+        min_length: Tamanho mínimo de um termo
+        keep_numbers: Se False, descarta termos puramente numéricos (notas, anos, códigos)
+
+    Returns:
+        List[str]: Termos na ordem em que aparecem
+    """
+    tokens = []
+    for token in TOKEN_PATTERN.findall(fold_accents(text)):
+        if len(token) < min_length or token in STOPWORDS_PT:
+            continue
+        if not keep_numbers and token.isdigit():
+            continue
+        tokens.append(token)
+    return tokens